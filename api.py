@@ -0,0 +1,159 @@
+# imports
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Body, Cookie, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from starlette import status
+
+import sessions
+from database import db
+from database.async_db import admin_resolve_matches, get_user_by_id, iterate
+
+try:
+    import orjson
+except ImportError:  # optional, the standard json module does the same job a bit slower
+    orjson = None
+
+# JSON API
+# What I need: the kiosk and mobile apps want data, not pages. /api/v1 returns the same lists as the
+# site (same filters, same keyset cursors) as JSON:
+#   - ?fields=a,b,c picks the columns, checked against the schema catalog, and only those are SELECTed
+#   - rows are streamed from the cursor in fetchmany() batches (on the DB thread pool) instead of being
+#     built into one big list first
+#   - orjson does the encoding when it's installed
+# Responses look like {"data": [...], "next": "<cursor or null>"}, pass next back as ?after= for the next page.
+# Login is the same session cookie the site uses.
+router = APIRouter(prefix="/api/v1", tags=["api"])
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
+# cursor columns for each list (same keyset order as the pages)
+POST_KEYS = {'lost': ('date_posted', 'lost_id'), 'found': ('date_posted', 'found_id')}
+MATCH_KEYS = ('date_matched', 'match_id')
+USER_MATCH_KEYS = ('resolved', 'date_matched', 'match_id')
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+
+def _limit(limit) -> int:
+    if not limit:
+        return API_PAGE_SIZE
+    return max(1, min(int(limit), API_MAX_PAGE_SIZE))
+
+
+async def api_user(session: Optional[str]) -> dict:
+    user = await sessions.current_user(session)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not logged in")
+    return user
+
+
+def _columns(table: str, fields: Optional[str], keys: tuple) -> tuple[list, list]:
+    """(columns to select, fields that go in the output). Cursor columns are added at the end if missing."""
+    try:
+        wanted = db.api_columns(table, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return wanted + [k for k in keys if k not in wanted], wanted
+
+
+async def _stream(batches, columns: list, wanted: list, keys: tuple, limit: int):
+    """Encode batches of row tuples as {"data": [...], "next": ...} one batch per chunk."""
+    width = len(wanted)
+    key_idx = [columns.index(k) for k in keys]
+    last, count = None, 0
+    yield b'{"data":['
+    # fetchmany runs on the DB thread pool like every other query, and the connection goes back to the
+    # pool even if the client goes away mid-stream
+    async for batch in iterate(batches):
+        chunk = b",".join(dumps(dict(zip(wanted, row[:width]))) for row in batch)
+        yield (b"," if count else b"") + chunk
+        count += len(batch)
+        last = batch[-1]
+    next_after = db.encode_cursor(*(last[i] for i in key_idx)) if last and count >= limit else None
+    yield b'],"next":' + dumps(next_after) + b"}"
+
+
+def _page(batches, columns, wanted, keys, limit) -> StreamingResponse:
+    return StreamingResponse(_stream(batches, columns, wanted, keys, limit), media_type="application/json")
+
+
+async def _posts(kind: str, status_filter: Optional[str], fields, after, limit, session) -> StreamingResponse:
+    await api_user(session)
+    statuses = db.SEARCH_KINDS[kind][4]
+    if status_filter and status_filter not in statuses:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"status must be one of: {', '.join(statuses)}")
+    limit = _limit(limit)
+    columns, wanted = _columns(db.POST_TABLES[kind][0], fields, POST_KEYS[kind])
+    try:
+        batches = db.stream_posts(kind, columns, status=status_filter, after=after, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _page(batches, columns, wanted, POST_KEYS[kind], limit)
+
+
+@router.get("/lost")
+async def api_lost(status_filter: Optional[str] = 'open', fields: Optional[str] = None,
+                   after: Optional[str] = None, limit: int = API_PAGE_SIZE, session: Optional[str] = Cookie(None)):
+    """Lost posts, newest first (open ones unless ?status_filter= says otherwise)."""
+    return await _posts('lost', status_filter, fields, after, limit, session)
+
+
+@router.get("/found")
+async def api_found(status_filter: Optional[str] = 'available', fields: Optional[str] = None,
+                    after: Optional[str] = None, limit: int = API_PAGE_SIZE, session: Optional[str] = Cookie(None)):
+    """Found posts, newest first (available ones unless ?status_filter= says otherwise)."""
+    return await _posts('found', status_filter, fields, after, limit, session)
+
+
+@router.get("/matches")
+async def api_matches(fields: Optional[str] = None, after: Optional[str] = None, limit: int = API_PAGE_SIZE,
+                      session: Optional[str] = Cookie(None)):
+    """The caller's matches, or every unresolved match for admins (same as the /matches page)."""
+    user = await api_user(session)
+    limit = _limit(limit)
+    keys = MATCH_KEYS if user['role'] == 'admin' else USER_MATCH_KEYS
+    columns, wanted = _columns('Matches', fields, keys)
+    try:
+        batches = db.stream_matches(columns, user_id=None if user['role'] == 'admin' else user['user_id'],
+                                    after=after, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _page(batches, columns, wanted, keys, limit)
+
+
+@router.post("/matches/resolve")
+async def api_resolve_matches(match_ids: list[int] = Body(..., embed=True), session: Optional[str] = Cookie(None)):
+    """Admins: resolve a batch of matches ({"match_ids": [...]}) in one transaction, one result per id."""
+    user = await api_user(session)
+    if user['role'] != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    try:
+        results = await admin_resolve_matches(match_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return Response(dumps({"data": results}), media_type="application/json")
+
+
+@router.get("/users/me")
+async def api_me(fields: Optional[str] = None, session: Optional[str] = Cookie(None)):
+    """The logged in user's profile (never any password column)."""
+    user = await api_user(session)
+    profile = await get_user_by_id(user['user_id'])
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    wanted = list(profile)
+    if fields:
+        wanted = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [f for f in wanted if f not in profile]
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(profile)}")
+    return Response(dumps({"data": {f: profile[f] for f in wanted}}), media_type="application/json")
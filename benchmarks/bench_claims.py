@@ -0,0 +1,219 @@
+# Claim / resolve contention across processes.
+# Every worker process is a separate server process as far as sqlite is concerned (its own pool, its own
+# connections). For each contested found item every worker owns a lost post and tries to claim the found
+# item with it at the same time, so exactly one claim per item may win. Then every worker tries to resolve
+# every new match, so exactly one resolve per match may win. Afterwards the database is checked: no found
+# item in more than one match, and every post's status agrees with the Matches table.
+# Exits 1 if an item was double-matched, a status is off, or a claim failed with an error (e.g. it gave up
+# on a locked database) instead of a clean "already matched".
+#
+#   python -m benchmarks.bench_claims
+#   python -m benchmarks.bench_claims --processes 1 4 16 --items 500 --order same
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import GenerateLAF, db
+
+PREFIX = "bclaim"
+
+
+def database_for(scale: int, seed: int, cache_dir: str) -> str:
+    """Generate (or reuse) a database and return a scratch copy (same cache as bench_suite)."""
+    source = os.path.join(cache_dir, f"laf_{scale}_{seed}.db")
+    if not os.path.exists(source):
+        print(f"generating {scale} posts -> {source}", file=sys.stderr)
+        GenerateLAF.generate(source + ".tmp", scale, seed=seed)
+        os.replace(source + ".tmp", source)
+    target = os.path.join(cache_dir, f"claims_{scale}_{seed}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+    return target
+
+
+def prepare(run: str, items: int, processes: int) -> list:
+    """Contested found items, each with one open lost post per worker. Returns [(found_id, [lost_id per worker])]."""
+    today = date.today().isoformat()
+    contested = []
+    for i in range(items):
+        found_id = f"{PREFIX}{run}f{i:05d}"
+        db.add_found_post(found_id, GenerateLAF.user_id(0), "Bench phone", "Electronics", "Contested phone",
+                          today, "Library 3rd floor", "Campus Security Office")
+        lost_ids = []
+        for w in range(processes):
+            lost_id = f"{PREFIX}{run}l{i:05d}w{w:03d}"
+            db.add_lost_post(lost_id, GenerateLAF.user_id(w), "Bench phone", "Electronics", "My phone", today,
+                             "Library 3rd floor")
+            lost_ids.append(lost_id)
+        contested.append((found_id, lost_ids))
+    return contested
+
+
+# --- WORKERS (separate processes) ---
+
+def claim_worker(path: str, worker: int, contested: list, order: str, barrier, results):
+    db.DB = path
+    claims = [(lost_ids[worker], found_id) for found_id, lost_ids in contested]
+    if order == "shuffled":
+        random.Random(worker).shuffle(claims)
+    claimant = GenerateLAF.user_id(worker)
+    _race(barrier, results, worker, [lambda l=l, f=f: db.claim_item(l, f, claimant) for l, f in claims])
+
+
+def resolve_worker(path: str, worker: int, match_ids: list, order: str, barrier, results):
+    db.DB = path
+    match_ids = list(match_ids)
+    if order == "shuffled":
+        random.Random(worker).shuffle(match_ids)
+    _race(barrier, results, worker, [lambda m=m: db.admin_resolve_match(m) for m in match_ids])
+
+
+def _race(barrier, results, worker: int, calls: list):
+    db.get_connection().close()  # open the pool before the clock starts
+    latencies, won, rejected, errors = [], 0, 0, []
+    barrier.wait()
+    start = time.perf_counter()
+    for call in calls:
+        t = time.perf_counter()
+        ok, message = call()
+        latencies.append(time.perf_counter() - t)
+        if ok:
+            won += 1
+        elif message.startswith("Error"):
+            errors.append(message)
+        else:
+            rejected += 1
+    elapsed = time.perf_counter() - start
+    results.put({"worker": worker, "elapsed": elapsed, "latencies": latencies, "won": won, "rejected": rejected,
+                 "errors": errors, **db.contention_stats()})
+
+
+def race(target, path: str, work, processes: int, order: str) -> dict:
+    ctx = multiprocessing.get_context("spawn")  # fresh interpreters, no pool/threads copied from this one
+    barrier, results = ctx.Barrier(processes), ctx.Queue()
+    workers = [ctx.Process(target=target, args=(path, w, work, order, barrier, results)) for w in range(processes)]
+    for p in workers:
+        p.start()
+    outs = [results.get() for _ in workers]
+    for p in workers:
+        p.join()
+
+    latencies = sorted(x for out in outs for x in out["latencies"])
+    wall = max(out["elapsed"] for out in outs)
+    return {
+        "attempts": len(latencies),
+        "won": sum(out["won"] for out in outs),
+        "rejected": sum(out["rejected"] for out in outs),
+        "errors": [e for out in outs for e in out["errors"]],
+        "busy_retries": sum(out["busy_retries"] for out in outs),
+        "busy_failures": sum(out["busy_failures"] for out in outs),
+        "wall": wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+# --- CHECKS ---
+
+def check(path: str, contested: list, resolved: bool) -> list:
+    """Everything wrong with the contested items, as messages (empty = fine)."""
+    problems = []
+    conn = sqlite3.connect(path)
+    try:
+        for found_id, lost_ids in contested:
+            matches = conn.execute("SELECT lost_id, resolved FROM Matches WHERE found_id = ?", (found_id,)).fetchall()
+            found_status = conn.execute("SELECT status FROM FoundPosts WHERE found_id = ?", (found_id,)).fetchone()[0]
+            marks = ",".join("?" * len(lost_ids))
+            lost = dict(conn.execute(f"SELECT lost_id, status FROM LostPosts WHERE lost_id IN ({marks})", lost_ids))
+            if len(matches) != 1:
+                problems.append(f"{found_id}: {len(matches)} matches")
+                continue
+            winner, match_resolved = matches[0]
+            want_found, want_lost = ("returned", "closed") if resolved else ("matched", "matched")
+            if match_resolved != int(resolved):
+                problems.append(f"{found_id}: match resolved={match_resolved}")
+            if found_status != want_found:
+                problems.append(f"{found_id}: status {found_status}, expected {want_found}")
+            if lost.get(winner) != want_lost:
+                problems.append(f"{winner}: status {lost.get(winner)}, expected {want_lost}")
+            losers = [lost_id for lost_id, status in lost.items() if lost_id != winner and status != "open"]
+            if losers:
+                problems.append(f"{found_id}: losing lost posts not open: {losers}")
+    finally:
+        conn.close()
+    return problems
+
+
+def report(phase: str, processes: int, r: dict, expected: int):
+    print(f"{phase:<8} {processes:>5} {r['attempts']:>8} {r['won']:>5}/{expected:<5} {r['rejected']:>8} "
+          f"{len(r['errors']):>6} {r['attempts'] / r['wall']:>10.0f} {r['won'] / r['wall']:>8.0f} "
+          f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['busy_retries']:>7} {r['busy_failures']:>6}")
+
+
+def main(args) -> int:
+    os.makedirs(args.cache_dir, exist_ok=True)
+    path = database_for(args.scale, args.seed, args.cache_dir)
+    db.DB = path
+    failed = False
+    print(f"{args.items} contested items per level, {args.order} order, {os.cpu_count()} cpu(s), {path}\n")
+    print(f"{'phase':<8} {'procs':>5} {'attempts':>8} {'won':>11} {'rejected':>8} {'errors':>6} "
+          f"{'attempt/s':>10} {'won/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'retries':>7} {'gaveup':>6}")
+    for level, processes in enumerate(args.processes):
+        contested = prepare(str(level), args.items, processes)
+
+        claims = race(claim_worker, path, contested, processes, args.order)
+        report("claim", processes, claims, args.items)
+        problems = check(path, contested, resolved=False)
+
+        conn = sqlite3.connect(path)
+        marks = ",".join("?" * len(contested))
+        match_ids = [r[0] for r in conn.execute(f"SELECT match_id FROM Matches WHERE found_id IN ({marks})",
+                                                [found_id for found_id, _ in contested])]
+        conn.close()
+        resolves = race(resolve_worker, path, match_ids, processes, args.order)
+        report("resolve", processes, resolves, len(match_ids))
+        problems += check(path, contested, resolved=True)
+
+        for phase, r in (("claim", claims), ("resolve", resolves)):
+            for error in sorted(set(r["errors"]))[:5]:
+                problems.append(f"{phase} error: {error}")
+        if problems:
+            failed = True
+            print(f"  {len(problems)} problem(s):")
+            for problem in problems[:20]:
+                print(f"    {problem}")
+
+    db.write_batcher.stop()
+    print("\nFAILED: see the problems above" if failed else "\nOK: no item double-matched, all statuses consistent")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Claim/resolve throughput and correctness across processes")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--items", type=int, default=200, help="contested found items per level")
+    parser.add_argument("--order", choices=("shuffled", "same"), default="shuffled",
+                        help="same = every worker goes through the items in the same order (worst contention)")
+    parser.add_argument("--scale", type=int, default=10000, help="posts in the generated database")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "laf_bench"),
+                        help="where generated databases are kept between runs")
+    sys.exit(main(parser.parse_args()))
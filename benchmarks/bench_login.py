@@ -0,0 +1,95 @@
+# Login throughput vs concurrency.
+# Copies the database to a temp file, points database.db at it and drives POST /login through the
+# app in-process (httpx + ASGITransport, no server needed). Alongside it a ticker task measures how
+# late the event loop wakes up, which is what password hashing on the loop would blow up.
+#
+#   python -m benchmarks.bench_login
+#   python -m benchmarks.bench_login --logins 400 --concurrency 1 4 16 64
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # main.py mounts static/ and templates/ relative to the repo root
+
+import httpx
+
+from database import db
+from database.migrations import migrate
+
+USER = "950000001"
+PASSWORD = "password123"
+
+
+async def _ticker(lags: list, stop: asyncio.Event, interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+async def run_level(client, logins: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            r = await client.post("/login", data={"user_id_or_email": USER, "password": PASSWORD})
+            latencies.append(time.perf_counter() - start)
+            assert r.status_code == 303, f"login failed: {r.status_code}"
+
+    lags = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "logins_per_s": logins / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_loop_lag_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+async def main(logins: int, levels: list):
+    import main as app_module
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # first login upgrades the plain text seed password to a real hash
+        await client.post("/login", data={"user_id_or_email": USER, "password": PASSWORD})
+        print(f"{'conc':>5} {'logins/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'loop lag ms':>12}")
+        for level in levels:
+            r = await run_level(client, logins, level)
+            print(f"{r['concurrency']:>5} {r['logins_per_s']:>10.1f} {r['p50_ms']:>8.1f} "
+                  f"{r['p95_ms']:>8.1f} {r['max_loop_lag_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login throughput vs concurrency")
+    parser.add_argument("--logins", type=int, default=200, help="logins per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db.DB = os.path.join(tmp, "bench.db")
+    shutil.copy(os.path.join(os.path.dirname(db.__file__), "lost_and_found.db"), db.DB)
+    migrate()
+    try:
+        asyncio.run(main(args.logins, args.concurrency))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,487 @@
+# Scale benchmark for database.db and the routes in main.py.
+# For each --scales N a database with N posts is generated (database/GenerateLAF.py, kept in --cache-dir so
+# the next run skips it), the app is started the way uvicorn would (lifespan: migrations, matcher rebuild)
+# and then every case below runs at each --concurrency level:
+#   - db.*  calls the database.db function on the DB thread pool, like the routes do
+#   - GET / POST ...  requests the route through the app in-process (httpx + ASGITransport, no server)
+# Writes get fresh rows prepared before the clock starts (a claim needs an open lost post and an available
+# found post, a delete needs something to delete), so every timed call does the real work once.
+# Prints p50/p95/p99 latency and throughput per case. --save-baseline writes the numbers to JSON,
+# --baseline compares a run against that file and exits 1 if any p95 got more than --tolerance worse.
+#
+#   python -m benchmarks.bench_suite
+#   python -m benchmarks.bench_suite --scales 10000 100000 1000000 --concurrency 1 8 32
+#   python -m benchmarks.bench_suite --save-baseline benchmarks/baseline.json
+#   python -m benchmarks.bench_suite --baseline benchmarks/baseline.json --only "GET /|db.get_"
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # main.py mounts static/ and templates/ relative to the repo root
+
+import httpx
+
+import sessions
+from database import ArchiveLAF, GenerateLAF, RollupLAF, db
+from database.async_db import run_db
+from database.passwords import hash_password
+from fragments import fragment_cache
+
+STUDENT = "950000001"  # the busiest poster in a generated database
+ADMIN = GenerateLAF.ADMIN_ID
+PASSWORD = GenerateLAF.PASSWORD
+SAMPLE = 2000
+SEARCH_TERMS = ["iphone", "black wallet", "keys", "textbook", "hoodie", "water bottle", "charger", "student id"]
+# a p95 has to be this many ms worse too before it counts as a regression (sub-millisecond noise isn't one)
+NOISE_MS = 1.0
+
+
+class Case:
+    """
+    One thing to time. call(arg) is awaited once per request, prepare(n) (optional, untimed) returns the n
+    args for a level, otherwise the args are just 0..n-1. share scales --requests down for slow cases.
+    """
+
+    def __init__(self, name, call, prepare=None, share=1.0, heavy=False):
+        self.name = name
+        self.call = call
+        self.prepare = prepare
+        self.share = share
+        self.heavy = heavy
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def _failed(result) -> bool:
+    # db functions report problems as (False, message), routes as 4xx/5xx or a redirect to /error or /login
+    if isinstance(result, httpx.Response):
+        location = result.headers.get("location", "")
+        return result.status_code >= 400 or location.startswith(("/error", "/login"))
+    return isinstance(result, tuple) and len(result) == 2 and result[0] is False
+
+
+async def run_level(case: Case, requests: int, concurrency: int) -> dict:
+    args = case.prepare(requests) if case.prepare else list(range(requests))
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(arg):
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            try:
+                result = await case.call(arg)
+            except Exception:
+                result = (False, "exception")
+            latencies.append(time.perf_counter() - start)
+            errors += _failed(result)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(arg) for arg in args))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(args),
+        "ops_s": round(len(args) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "errors": errors,
+    }
+
+
+# --- SAMPLE DATA ---
+# ids, cursors and matches to point the cases at, picked at random from the generated database
+
+def sample_data(rng: random.Random) -> dict:
+    conn = sqlite3.connect(db.DB)
+    try:
+        def ids(query, *params):
+            rows = [r[0] for r in conn.execute(query, params)]
+            return rng.sample(rows, min(SAMPLE, len(rows)))
+
+        def cursors(table, id_col, status):
+            rows = conn.execute(f"SELECT date_posted, {id_col} FROM {table} WHERE status = ? "
+                                f"AND rowid % 97 = 0 LIMIT {SAMPLE}", (status,)).fetchall()
+            return [db.encode_cursor(*r) for r in rows] or [None]
+
+        max_lost = conn.execute("SELECT max(rowid) FROM LostPosts").fetchone()[0] or 1
+        max_found = conn.execute("SELECT max(rowid) FROM FoundPosts").fetchone()[0] or 1
+        lost_rowids = rng.sample(range(1, max_lost + 1), min(SAMPLE, max_lost))
+        found_rowids = rng.sample(range(1, max_found + 1), min(SAMPLE, max_found))
+        marks = lambda rowids: ",".join(map(str, rowids))
+        return {
+            "lost": [r[0] for r in conn.execute(f"SELECT lost_id FROM LostPosts WHERE rowid IN ({marks(lost_rowids)})")],
+            "found": [r[0] for r in conn.execute(f"SELECT found_id FROM FoundPosts WHERE rowid IN ({marks(found_rowids)})")],
+            "users": ids("SELECT user_id FROM Users WHERE role = 'student' AND user_id != ? LIMIT 20000", STUDENT),
+            "lost_cursors": cursors("LostPosts", "lost_id", "open"),
+            "found_cursors": cursors("FoundPosts", "found_id", "available"),
+            "week_ago": (date.today() - timedelta(days=7)).isoformat(),
+            "year_ago": (date.today() - timedelta(days=365)).isoformat(),
+        }
+    finally:
+        conn.close()
+
+
+def new_id(prefix: str) -> str:
+    return prefix + uuid.uuid4().hex[:8]
+
+
+def make_lost(user_id: str, n: int) -> list:
+    ids = [new_id("lost") for _ in range(n)]
+    for lost_id in ids:
+        db.add_lost_post(lost_id, user_id, "Bench umbrella", "Accessories", "Black umbrella, bench row",
+                         date.today().isoformat(), "Library 3rd floor")
+    return ids
+
+
+def make_found(user_id: str, n: int) -> list:
+    ids = [new_id("found") for _ in range(n)]
+    for found_id in ids:
+        db.add_found_post(found_id, user_id, "Bench umbrella", "Accessories", "Black umbrella, bench row",
+                          date.today().isoformat(), "Library 3rd floor", "Campus Security Office")
+    return ids
+
+
+def make_pairs(n: int) -> list:
+    return list(zip(make_lost(STUDENT, n), make_found(ADMIN, n)))
+
+
+def make_matches(n: int) -> list:
+    pairs = make_pairs(n)
+    conn = sqlite3.connect(db.DB)
+    try:
+        for lost_id, found_id in pairs:
+            db.claim_item(lost_id, found_id, STUDENT)
+        marks = ",".join("?" * len(pairs))
+        return [r[0] for r in conn.execute(f"SELECT match_id FROM Matches WHERE lost_id IN ({marks})",
+                                           [p[0] for p in pairs])]
+    finally:
+        conn.close()
+
+
+def make_match_batches(size: int):
+    """prepare() for the batch resolve cases: n lists of `size` fresh unresolved match ids."""
+    def prepare(n: int) -> list:
+        ids = make_matches(n * size)
+        return [ids[i:i + size] for i in range(0, len(ids), size)]
+    return prepare
+
+
+def make_users(n: int) -> list:
+    password_hash = hash_password(PASSWORD)
+    ids = [new_id("b") for _ in range(n)]
+    for user_id in ids:
+        db.add_user(user_id, "Bench User", f"{user_id}@bench.edu", password_hash, password_is_hashed=True)
+    return ids
+
+
+def import_csv(rows: int) -> bytes:
+    lines = ["item_name,category,description,date_found,found_location"]
+    lines += [f"Bench mug {i},Other,White mug,{date.today().isoformat()},Cafeteria" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def import_records(rows: int):
+    return [(i + 2, {"item_name": f"Bench mug {i}", "category": "Other", "description": "White mug",
+                     "date_found": date.today().isoformat(), "found_location": "Cafeteria"}) for i in range(rows)]
+
+
+# --- CASES ---
+
+def db_cases(s: dict, rng: random.Random) -> list:
+    pick = rng.choice
+
+    def case(name, fn, prepare=None, share=1.0, heavy=False):
+        async def call(arg):
+            return await run_db(fn, arg)
+        return Case(f"db.{name}", call, prepare, share, heavy)
+
+    lost_cols = db.api_columns("LostPosts")
+    match_cols = db.api_columns("Matches")
+    return [
+        # reads
+        case("get_lost_posts", lambda _: db.get_lost_posts(limit=db.PAGE_SIZE)),
+        case("get_lost_posts (deep page)", lambda _: db.get_lost_posts(after=pick(s["lost_cursors"]), limit=db.PAGE_SIZE)),
+        case("get_found_posts", lambda _: db.get_found_posts(limit=db.PAGE_SIZE)),
+        case("get_found_posts (deep page)", lambda _: db.get_found_posts(after=pick(s["found_cursors"]), limit=db.PAGE_SIZE)),
+        case("get_lost_post", lambda _: db.get_lost_post(pick(s["lost"]))),
+        case("get_found_post", lambda _: db.get_found_post(pick(s["found"]))),
+        case("get_lost_posts_by_user", lambda _: db.get_lost_posts_by_user(STUDENT, limit=db.PAGE_SIZE)),
+        case("get_matches_by_user", lambda _: db.get_matches_by_user(STUDENT, limit=db.PAGE_SIZE)),
+        case("get_all_unresolved_matches", lambda _: db.get_all_unresolved_matches(limit=db.PAGE_SIZE)),
+        case("search_posts", lambda _: db.search_posts(pick(SEARCH_TERMS))),
+        case("get_suggestions_for_lost", lambda _: db.get_suggestions_for_lost(pick(s["lost"]))),
+        case("get_suggestions_for_found", lambda _: db.get_suggestions_for_found(pick(s["found"]))),
+        case("get_user_by_id", lambda _: db.get_user_by_id(pick(s["users"]))),
+        case("get_login_user", lambda _: db.get_login_user(pick(s["users"]))),
+        case("get_data_versions", lambda _: db.get_data_versions()),
+        case("get_post_version", lambda _: db.get_post_version("lost", pick(s["lost"]))),
+        case("get_session_revocations", lambda _: db.get_session_revocations(since=time.time() - 60)),
+        case("stream_posts (500 rows)", lambda _: sum(map(len, db.stream_posts("lost", lost_cols, status="open", limit=500)))),
+        case("stream_matches (500 rows)", lambda _: sum(map(len, db.stream_matches(match_cols, limit=500)))),
+        case("get_report (year)", lambda _: db.get_report(s["year_ago"], date.today().isoformat())),
+        case("stream_export (last week)", lambda _: sum(map(len, db.stream_export("lost", lost_cols, date_from=s["week_ago"]))),
+             share=0.1),
+        case("verify_login", lambda _: db.verify_login(STUDENT, PASSWORD), share=0.1),
+        case("get_match_candidates", lambda _: len(db.get_match_candidates()[0]), share=0.02, heavy=True),
+        # writes
+        case("add_lost_post", lambda lost_id: db.add_lost_post(
+            lost_id, STUDENT, "Bench umbrella", "Accessories", "Black umbrella", date.today().isoformat(), "Gym"),
+             prepare=lambda n: [new_id("lost") for _ in range(n)]),
+        case("add_found_post", lambda found_id: db.add_found_post(
+            found_id, ADMIN, "Bench umbrella", "Accessories", "Black umbrella", date.today().isoformat(), "Gym",
+            "Campus Security Office"), prepare=lambda n: [new_id("found") for _ in range(n)]),
+        case("delete_lost_post", db.delete_lost_post, prepare=lambda n: make_lost(STUDENT, n)),
+        case("delete_found_post", db.delete_found_post, prepare=lambda n: make_found(ADMIN, n)),
+        case("claim_item", lambda pair: db.claim_item(pair[0], pair[1], STUDENT), prepare=make_pairs),
+        case("admin_resolve_match", db.admin_resolve_match, prepare=make_matches),
+        case("admin_resolve_matches (100 ids)", db.admin_resolve_matches, prepare=make_match_batches(100), share=0.1),
+        case("import_found_posts (1000 rows)", lambda _: db.import_found_posts(import_records(1000), ADMIN), share=0.1),
+        case("add_match_suggestions (100 rows)", lambda _: db.add_match_suggestions(
+            [(pick(s["lost"]), pick(s["found"]), rng.random()) for _ in range(100)])),
+        case("add_user", lambda user_id: db.add_user(user_id, "Bench User", f"{user_id}@bench.edu", "x",
+                                                     password_is_hashed=True),
+             prepare=lambda n: [new_id("b") for _ in range(n)]),
+        case("update_user_role", lambda user_id: db.update_user_role(user_id, pick(("student", "staff"))),
+             prepare=lambda n: [pick(s["users"]) for _ in range(n)]),
+        case("delete_user", db.delete_user, prepare=make_users, share=0.2),
+        case("add_session_revocation", lambda _: db.add_session_revocation("token", uuid.uuid4().hex, time.time() + 60)),
+    ]
+
+
+def route_cases(student: httpx.AsyncClient, admin: httpx.AsyncClient, anon: httpx.AsyncClient,
+                s: dict, rng: random.Random) -> list:
+    pick = rng.choice
+
+    def get(name, client, url, share=1.0, heavy=False):
+        async def call(_):
+            return await client.get(url() if callable(url) else url)
+        return Case(name, call, share=share, heavy=heavy)
+
+    def post(name, client, url, data=None, prepare=None, share=1.0, heavy=False, files=None):
+        async def call(arg):
+            return await client.post(url(arg) if callable(url) else url,
+                                     data=data(arg) if callable(data) else data,
+                                     files=files(arg) if callable(files) else files)
+        return Case(name, call, prepare, share, heavy)
+
+    today = date.today().isoformat()
+    lost_form = {"item_name": "Bench umbrella", "category": "Accessories", "description": "Black umbrella",
+                 "date_lost": today, "last_seen_location": "Gym"}
+    found_form = {"item_name": "Bench umbrella", "category": "Accessories", "description": "Black umbrella",
+                  "date_found": today, "found_location": "Gym", "storage_location": "Campus Security Office"}
+    return [
+        get("GET /login", anon, "/login"),
+        get("GET /register", anon, "/register"),
+        get("GET /", student, "/"),
+        get("GET / (deep page)", student, lambda: f"/?lost_after={pick(s['lost_cursors'])}"
+                                                  f"&found_after={pick(s['found_cursors'])}"),
+        get("GET /lost/{id}", student, lambda: f"/lost/{pick(s['lost'])}"),
+        get("GET /found/{id}", student, lambda: f"/found/{pick(s['found'])}"),
+        get("GET /matches", student, "/matches"),
+        get("GET /matches (admin)", admin, "/matches"),
+        get("GET /search", student, lambda: f"/search?q={pick(SEARCH_TERMS)}"),
+        get("GET /add-lost", student, "/add-lost"),
+        get("GET /add-found", student, "/add-found"),
+        get("GET /error", student, "/error?msg=bench"),
+        get("GET /api/v1/lost", student, "/api/v1/lost"),
+        get("GET /api/v1/found (fields, 500)", student, "/api/v1/found?fields=found_id,item_name&limit=500"),
+        get("GET /api/v1/matches", student, "/api/v1/matches"),
+        get("GET /api/v1/users/me", student, "/api/v1/users/me"),
+        get("GET /admin/import", admin, "/admin/import"),
+        get("GET /admin/export", admin, "/admin/export"),
+        get("GET /admin/reports (year)", admin, "/admin/reports"),
+        get("GET /admin/export/lost (last week)", admin, f"/admin/export/lost?date_from={s['week_ago']}", share=0.1),
+        post("POST /login", anon, "/login", {"user_id_or_email": STUDENT, "password": PASSWORD}, share=0.1),
+        post("POST /register", anon, "/register", lambda user_id: {
+            "name": "Bench User", "email": f"{user_id}@bench.edu", "password": PASSWORD},
+             prepare=lambda n: [new_id("b") for _ in range(n)], share=0.1),
+        post("POST /add-lost", student, "/add-lost", lost_form),
+        post("POST /add-found", student, "/add-found", found_form),
+        post("POST /delete-lost/{id}", student, lambda lost_id: f"/delete-lost/{lost_id}",
+             prepare=lambda n: make_lost(STUDENT, n)),
+        post("POST /delete-found/{id}", admin, lambda found_id: f"/delete-found/{found_id}",
+             prepare=lambda n: make_found(ADMIN, n)),
+        post("POST /claim/{id}", student, lambda pair: f"/claim/{pair[1]}", lambda pair: {"lost_id": pair[0]},
+             prepare=make_pairs),
+        post("POST /admin/resolve/{id}", admin, lambda match_id: f"/admin/resolve/{match_id}", prepare=make_matches),
+        post("POST /admin/resolve (100 ids)", admin, "/admin/resolve", lambda ids: {"match_ids": ids},
+             prepare=make_match_batches(100), share=0.1),
+        post("POST /admin/import (100 rows)", admin, "/admin/import",
+             files={"file": ("bench.csv", import_csv(100), "text/csv")}, share=0.1),
+        post("POST /admin/rescore-matches", admin, "/admin/rescore-matches", share=0.02, heavy=True),
+    ]
+
+
+# --- RUNNING ---
+
+def database_for(scale: int, seed: int, cache_dir: str) -> str:
+    """Generate (or reuse) the database for a scale and return a scratch copy to run against."""
+    source = os.path.join(cache_dir, f"laf_{scale}_{seed}.db")
+    if not os.path.exists(source):
+        print(f"generating {scale} posts -> {source}", file=sys.stderr)
+        GenerateLAF.generate(source + ".tmp", scale, seed=seed)
+        os.replace(source + ".tmp", source)
+    # the cases write, so work on a copy (sqlite's backup API copies a live WAL database safely)
+    target = os.path.join(cache_dir, f"run_{scale}_{seed}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+    return target
+
+
+async def login(client: httpx.AsyncClient, user_id: str):
+    r = await client.post("/login", data={"user_id_or_email": user_id, "password": PASSWORD})
+    assert r.status_code == 303, f"login as {user_id} failed: {r.status_code}"
+
+
+async def run_scale(scale: int, args, only) -> dict:
+    import main as app_module
+
+    rng = random.Random(args.seed)
+    db.DB = database_for(scale, args.seed, args.cache_dir)
+    # nothing cached from the previous scale's database may leak into this one
+    fragment_cache.clear()
+    sessions.revocations.reset()
+
+    # the background archiver would move rows around mid-run, --archive runs it once up front instead
+    ArchiveLAF.ARCHIVE_INTERVAL = 0
+    # same for the report rollups, they're brought up to date once up front so the report cases have data
+    RollupLAF.ROLLUP_INTERVAL = 0
+
+    results = {}
+    started = time.perf_counter()
+    async with app_module.app.router.lifespan_context(app_module.app):
+        startup = time.perf_counter() - started
+        results[f"{scale}/startup"] = {"seconds": round(startup, 2)}
+        print(f"\n== {scale} posts (startup {startup:.1f}s) ==")
+        if args.archive:
+            totals = await ArchiveLAF.archive_once(pause=0)
+            print(f"archived {totals['matches']} matches, {totals['lost']} lost and {totals['found']} found posts")
+        totals = await RollupLAF.rollup_once()
+        if any(totals.values()):
+            print(f"rolled up {totals['lost']} lost, {totals['found']} found posts and "
+                  f"{totals['resolutions']} resolutions")
+
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as student, \
+                httpx.AsyncClient(transport=transport, base_url="http://bench") as admin, \
+                httpx.AsyncClient(transport=transport, base_url="http://bench") as anon:
+            await login(student, STUDENT)
+            await login(admin, ADMIN)
+            data = sample_data(rng)
+            cases = db_cases(data, rng) + route_cases(student, admin, anon, data, rng)
+
+            print(f"{'case':<40} {'conc':>4} {'req':>5} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+                  f"{'p99 ms':>9} {'err':>4} {'vs base':>8}")
+            for case in cases:
+                if (case.heavy and not args.heavy) or (only and not only.search(case.name)):
+                    continue
+                requests = max(3, int(args.requests * case.share))
+                for level in args.concurrency:
+                    r = await run_level(case, requests, level)
+                    key = f"{scale}/{case.name}/c{level}"
+                    results[key] = r
+                    print(f"{case.name:<40} {level:>4} {r['requests']:>5} {r['ops_s']:>9.1f} {r['p50_ms']:>9.2f} "
+                          f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>4} "
+                          f"{compare(r, args.baseline_results.get(key)):>8}")
+    return results
+
+
+def compare(result: dict, base: dict) -> str:
+    if not base:
+        return ""
+    change = (result["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100 if base["p95_ms"] else 0.0
+    return f"{change:+.0f}%"
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    found = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if not base or "p95_ms" not in r:
+            continue
+        if r["p95_ms"] > base["p95_ms"] * (1 + tolerance) and r["p95_ms"] - base["p95_ms"] > NOISE_MS:
+            found.append((key, base["p95_ms"], r["p95_ms"]))
+    return found
+
+
+async def main(args):
+    only = re.compile(args.only) if args.only else None
+    results = {}
+    for scale in args.scales:
+        results.update(await run_scale(scale, args, only))
+
+    if args.save_baseline:
+        meta = {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "requests": args.requests,
+        }
+        with open(args.save_baseline, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=1, sort_keys=True)
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        slower = regressions(results, args.baseline_results, args.tolerance)
+        if slower:
+            print(f"\n{len(slower)} regression(s), p95 more than {args.tolerance:.0%} slower than the baseline:")
+            for key, before, after in slower:
+                print(f"  {key}: {before:.2f} ms -> {after:.2f} ms")
+            return 1
+        print(f"\nNo p95 regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark database.db functions and routes at several scales")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10000, 100000], help="posts per database")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=200, help="calls per case and concurrency level")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="regex, run only the cases whose name matches")
+    parser.add_argument("--heavy", action="store_true", help="also run full-table cases (rescore, candidates)")
+    parser.add_argument("--archive", action="store_true",
+                        help="archive resolved matches/posts before timing (what the running app does)")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "laf_bench"),
+                        help="where generated databases are kept between runs")
+    parser.add_argument("--baseline", help="JSON from --save-baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", help="write this run's numbers to a JSON file")
+    args = parser.parse_args()
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    args.baseline_results = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            args.baseline_results = json.load(f)["results"]
+    sys.exit(asyncio.run(main(args)))
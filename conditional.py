@@ -0,0 +1,76 @@
+# imports
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from starlette import status
+
+# CONDITIONAL GETS
+# What I need: a browser that already has a page shouldn't make us run the queries and render it again.
+# Routes look up a cheap version first (db.get_post_version / db.get_data_versions), turn it into an
+# ETag + Last-Modified, and answer If-None-Match / If-Modified-Since with an empty 304 when nothing changed.
+# Pages differ per user (name in the nav, owner/admin buttons), so:
+#   - the user is part of the ETag
+#   - Last-Modified is never older than the login, so a page cached by someone else on the same
+#     browser is never "still fresh" for the next person
+#   - responses are Cache-Control: private, no-cache (the browser may keep them but must check first)
+CACHE_CONTROL = "private, no-cache"
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    # database timestamps are 'YYYY-MM-DD HH:MM:SS' in UTC
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def validators(current_user: dict, version, updated_at, *extra) -> tuple[str, datetime]:
+    """
+    (ETag, Last-Modified) for a page from its data version, when that data last changed, the user and
+    anything else that changes the HTML (query params).
+    """
+    parts = [version, current_user['user_id'], current_user['role'], current_user['name'], *extra]
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    # HTTP dates have whole seconds only
+    login = datetime.fromtimestamp(int(current_user.get('issued_at', 0)) + 1, timezone.utc)
+    modified = _parse_timestamp(updated_at)
+    return f'W/"{digest}"', max(modified, login) if modified else login
+
+
+def _headers(etag: str, last_modified: datetime) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+
+def not_modified(request: Request, etag: str, last_modified: datetime) -> Optional[Response]:
+    """A 304 response if the request's validators still match, otherwise None."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since, and weak comparison is fine for GET
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        if "*" in tags or etag.removeprefix("W/") in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_headers(etag, last_modified))
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo and last_modified <= since:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_headers(etag, last_modified))
+    return None
+
+
+def add_validators(response: Response, etag: str, last_modified: datetime) -> Response:
+    response.headers.update(_headers(etag, last_modified))
+    return response
@@ -0,0 +1,82 @@
+#imports
+import argparse
+import asyncio
+import logging
+import os
+
+from database import db
+from database.async_db import run_db
+
+# ARCHIVING
+# Moves resolved matches and closed/returned posts into the Archived* tables (see ARCHIVE in db.py).
+# The app runs it in the background every LAF_ARCHIVE_INTERVAL seconds (0 turns it off), one small
+# transaction per batch with a pause in between. It can also be run by hand:
+#
+#   python -m database.ArchiveLAF
+#   python -m database.ArchiveLAF --days 0 --batch 500     # everything resolved so far
+ARCHIVE_INTERVAL = float(os.environ.get("LAF_ARCHIVE_INTERVAL", "3600"))
+
+log = logging.getLogger("laf.archive")
+
+
+async def archive_once(older_than_days: float = db.ARCHIVE_AFTER_DAYS, batch: int = db.ARCHIVE_BATCH,
+                       pause: float = db.ARCHIVE_PAUSE) -> dict:
+    """Same as db.archive_resolved, but the pauses between batches don't hold a DB thread."""
+    cutoff = db.archive_cutoff(older_than_days)
+    totals = {'matches': 0, 'lost': 0, 'found': 0, 'batches': 0}
+    while True:
+        moved = await run_db(db.archive_batch, cutoff, batch)
+        if not any(moved.values()):
+            return totals
+        totals['batches'] += 1
+        for key, count in moved.items():
+            totals[key] += count
+        await asyncio.sleep(pause)
+
+
+async def archive_loop(interval: float = ARCHIVE_INTERVAL):
+    while True:
+        try:
+            totals = await archive_once()
+            if totals['batches']:
+                log.info("archived %(matches)s matches, %(lost)s lost and %(found)s found posts "
+                         "in %(batches)s batches", totals)
+        except Exception:
+            # try again next time, a failed batch was rolled back
+            log.exception("archiving failed")
+        await asyncio.sleep(interval)
+
+
+def start():
+    """Start the background archiver (main.py's lifespan), returns the task or None if it's turned off."""
+    if ARCHIVE_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(archive_loop())
+
+
+async def stop(task):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move resolved matches and closed/returned posts to the archive")
+    parser.add_argument("--days", type=float, default=db.ARCHIVE_AFTER_DAYS,
+                        help="only what was resolved more than this many days ago")
+    parser.add_argument("--batch", type=int, default=db.ARCHIVE_BATCH, help="matches per transaction")
+    args = parser.parse_args()
+
+    from database.migrations import migrate
+    migrate()
+    totals = db.archive_resolved(args.days, args.batch)
+    print(f"Archived {totals['matches']} matches, {totals['lost']} lost posts and {totals['found']} found posts "
+          f"in {totals['batches']} batches. Archive now holds {db.archive_counts()}.")
+
+
+if __name__ == "__main__":
+    main()
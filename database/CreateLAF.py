@@ -10,10 +10,18 @@ cur = conn.cursor()
 cur.execute("PRAGMA foreign_keys = ON;")
 
 # DROP TABLES needed (for a clean rebuild)
+# tables added by migrations go first (they point at the posts)
+for table in ("MatchSuggestions", "DataVersions", "SessionRevocations", "LostPostsFTS", "FoundPostsFTS",
+              "ArchivedMatches", "ArchivedLostPosts", "ArchivedFoundPosts", "Stats",
+              "DailyPosts", "DailyLocations", "DailyResolutions", "RollupWatermarks"):
+    cur.execute(f"DROP TABLE IF EXISTS {table}")
 cur.execute("DROP TABLE IF EXISTS Matches")
 cur.execute("DROP TABLE IF EXISTS FoundPosts")
 cur.execute("DROP TABLE IF EXISTS LostPosts")
 cur.execute("DROP TABLE IF EXISTS Users")
+# reset the schema version too so database/migrations.py re-applies everything on the next startup
+cur.execute("DROP TABLE IF EXISTS SchemaMigrations")
+cur.execute("PRAGMA user_version = 0")
 
 # USERS TABLE - NOW WITH PASSWORD
 cur.execute("""
@@ -0,0 +1,77 @@
+#imports
+import argparse
+import csv
+import io
+import json
+import sys
+
+from database import db
+
+# EXPORTS
+# Dumps LostPosts, FoundPosts or Matches as CSV or JSONL, one fetchmany() batch at a time (memory stays
+# flat no matter how many rows there are). /admin/export in main.py uses the same encoders.
+#
+#   python -m database.ExportLAF lost --format csv --status open -o lost.csv
+#   python -m database.ExportLAF matches --format jsonl --from 2025-01-01 --to 2025-06-30
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+EXPORT_TABLES = {'lost': 'LostPosts', 'found': 'FoundPosts', 'matches': 'Matches'}
+
+
+def export_columns(kind: str) -> list:
+    """Every column the export writes (same visibility rules as the JSON API)."""
+    return db.api_columns(EXPORT_TABLES[kind])
+
+
+def csv_header(columns: list) -> str:
+    out = io.StringIO()
+    csv.writer(out).writerow(columns)
+    return out.getvalue()
+
+
+def encode_batch(fmt: str, columns: list, batch: list) -> str:
+    """One batch of row tuples as CSV lines or JSON lines."""
+    if fmt == 'jsonl':
+        return "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in batch)
+    out = io.StringIO()
+    csv.writer(out).writerows(batch)
+    return out.getvalue()
+
+
+def export(kind: str, fmt: str, out, **filters) -> int:
+    """Write an export to a text file object, returns the number of rows."""
+    columns = export_columns(kind)
+    batches = db.stream_export(kind, columns, **filters)
+    if fmt == 'csv':
+        out.write(csv_header(columns))
+    count = 0
+    for batch in batches:
+        out.write(encode_batch(fmt, columns, batch))
+        count += len(batch)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export lost posts, found posts or matches as CSV or JSONL")
+    parser.add_argument("kind", choices=tuple(EXPORT_TABLES))
+    parser.add_argument("--format", choices=tuple(FORMATS), default="csv")
+    parser.add_argument("--status", help="open/matched/closed, available/matched/returned or resolved/unresolved")
+    parser.add_argument("--category", choices=db.VALID_CATEGORIES)
+    parser.add_argument("--from", dest="date_from", help="YYYY-MM-DD, inclusive (date posted / date matched)")
+    parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD, inclusive")
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    filters = dict(status=args.status, category=args.category, date_from=args.date_from, date_to=args.date_to)
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        count = export(args.kind, args.format, out, **filters)
+    except ValueError as e:
+        sys.exit(str(e))
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {count} rows.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
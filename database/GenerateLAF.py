@@ -0,0 +1,284 @@
+#imports
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+from database.migrations import migrate
+from database.passwords import hash_password
+
+# SYNTHETIC DATA
+# InsertsLAF.py seeds ~20 users and a few dozen posts, which tells us nothing about how the queries behave
+# once the tables are big. This builds a fresh database of any size (10^4 to 10^7 posts) with made-up but
+# realistic data, the same every time for the same --seed:
+#   - categories are skewed (lots of electronics and clothing, few "Other")
+#   - a few users post a lot and most post once or twice
+#   - posts are spread over the last two years, heavier towards today
+#   - about a third of lost posts got matched to a found post of the same category, most of the older
+#     matches are resolved (closed/returned), the newer ones are still waiting on an admin
+#   - everything else is open/available
+# Users 950000001 (student) and 950000004 (admin) exist like in the seed data, password is password123.
+#
+#   python -m database.GenerateLAF --posts 100000 -o /tmp/laf_100k.db
+#   python -m database.GenerateLAF --posts 10000000 --seed 7 -o /tmp/laf_10m.db
+CHUNK = 50000
+SPAN_DAYS = 730
+LOST_SHARE = 0.45
+MATCH_RATE = 0.35
+RESOLVE_AFTER_DAYS = 14
+PASSWORD = "password123"
+ADMIN_ID = "950000004"
+
+CATEGORY_WEIGHTS = {
+    'Electronics': 28, 'Clothing': 18, 'Accessories': 16, 'Keys': 14, 'Documents': 10, 'Books': 9, 'Other': 5,
+}
+ITEMS = {
+    'Electronics': ["iPhone", "AirPods", "Laptop charger", "Calculator", "Kindle", "USB drive", "Headphones",
+                    "iPad", "Phone charger", "Smart watch", "Earbuds", "MacBook"],
+    'Clothing': ["Hoodie", "Rain jacket", "Winter hat", "Scarf", "Gloves", "Fleece", "Beanie", "Sweater",
+                 "Baseball cap", "Sneakers"],
+    'Accessories': ["Water bottle", "Sunglasses", "Umbrella", "Backpack", "Wallet", "Watch", "Tote bag",
+                    "Glasses", "Ring", "Lanyard"],
+    'Documents': ["Student ID card", "Driver's license", "Passport", "Lab notebook", "Access badge",
+                  "Credit card", "Bus pass"],
+    'Keys': ["Dorm key", "Car keys", "Key ring", "Bike lock", "Key card", "House keys"],
+    'Books': ["Calculus textbook", "Chemistry textbook", "Novel", "Notebook", "Planner", "Lab manual",
+              "Sketchbook"],
+    'Other': ["Skateboard", "Yoga mat", "Lunch box", "Tennis racket", "Bike helmet", "Hydro Flask"],
+}
+COLORS = ["black", "blue", "red", "green", "gray", "white", "silver", "pink", "brown", "navy", "yellow", "purple"]
+DETAILS = ["sticker on the back", "name written inside", "slightly scratched", "in a case", "keychain attached",
+           "pretty new", "well worn", "initials on the tag", "cracked corner", "with a lanyard"]
+LOCATIONS = ["Library 3rd floor", "Library 2nd floor", "Gym locker room", "Cafeteria", "Parking Lot A",
+             "Parking Lot B", "Student Union", "Science Building", "Math Building", "Computer lab", "Lecture Hall B",
+             "Outdoor quad", "Bus stop", "Athletic field", "Theatre building", "Bookstore", "Dorm lounge",
+             "Basketball court", "Administration building", "Bike rack near dorms"]
+STORAGE = ["Campus Security Office", "Student Union Info Desk", "Library Circulation Desk", "Residence Hall Front Desk"]
+FIRST_NAMES = ["Alex", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Avery", "Quinn", "Parker", "Skylar",
+               "Reese", "Cameron", "Dakota", "Sage", "River", "Phoenix", "Rowan", "Jamie", "Drew", "Emerson"]
+LAST_NAMES = ["Johnson", "Carter", "Lopez", "Nguyen", "Smith", "Brown", "Davis", "Wilson", "Martinez", "Garcia",
+              "Rodriguez", "Lee", "White", "Harris", "Clark", "Lewis", "Walker", "Hall", "Allen", "Young"]
+
+USER_SQL = """INSERT INTO Users (user_id, name, email, phone, password_hash, role, date_joined)
+              VALUES (?, ?, ?, ?, ?, ?, ?)"""
+LOST_SQL = """INSERT INTO LostPosts (lost_id, user_id, item_name, category, description, date_lost,
+                                     last_seen_location, date_posted, status)
+              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+FOUND_SQL = """INSERT INTO FoundPosts (found_id, user_id, item_name, category, description, date_found,
+                                       found_location, storage_location, date_posted, status)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+MATCH_SQL = """INSERT INTO Matches (lost_id, found_id, matched_by_user_id, date_matched, resolved, notes)
+               VALUES (?, ?, ?, ?, ?, ?)"""
+
+
+def user_id(n: int) -> str:
+    return str(950000001 + n)
+
+
+# the site makes ids like lost1a2b3c4d (8 hex chars), a 'g' is never hex so these can't collide with new posts
+def lost_id(n: int) -> str:
+    return f"lostg{n:07x}"
+
+
+def found_id(n: int) -> str:
+    return f"foundg{n:07x}"
+
+
+class Generator:
+    """Draws rows from the distributions above. All randomness goes through one seeded Random."""
+
+    def __init__(self, posts: int, users: int, seed: int, today: date):
+        self.rng = random.Random(seed)
+        self.posts = posts
+        self.users = users
+        self.today = today
+        self.categories = list(CATEGORY_WEIGHTS)
+        self.category_cum = list(accumulate(CATEGORY_WEIGHTS.values()))
+        self.user_ids = [user_id(n) for n in range(users)]
+        # Zipf-ish: user n posts about 1/(n+1)^0.7 as often as the first one
+        self.user_cum = list(accumulate(1 / (n + 1) ** 0.7 for n in range(users)))
+        self.days = [(today - timedelta(days=d)).isoformat() for d in range(SPAN_DAYS + 60)]
+
+    def day(self, days_ago: int) -> str:
+        return self.days[max(0, min(days_ago, len(self.days) - 1))]
+
+    def stamp(self, days_ago: int) -> str:
+        seconds = self.rng.randrange(8 * 3600, 22 * 3600)
+        return f"{self.day(days_ago)} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+    def posted_days_ago(self) -> int:
+        # more posts recently than two years ago
+        return int(SPAN_DAYS * self.rng.random() ** 1.6)
+
+    def owner(self) -> str:
+        return self.rng.choices(self.user_ids, cum_weights=self.user_cum)[0]
+
+    def item(self, category: str = None) -> tuple:
+        rng = self.rng
+        category = category or rng.choices(self.categories, cum_weights=self.category_cum)[0]
+        name = rng.choice(ITEMS[category])
+        description = f"{rng.choice(COLORS).capitalize()} {name.lower()}, {rng.choice(DETAILS)}"
+        return name, category, description
+
+    def users_rows(self, password_hash: str):
+        rng = self.rng
+        for n, uid in enumerate(self.user_ids):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            if uid == ADMIN_ID:
+                role = 'admin'
+            elif n == 0:
+                role = 'student'
+            else:
+                role = rng.choices(('student', 'staff', 'admin'), cum_weights=(88, 99, 100))[0]
+            yield (uid, f"{first} {last}", f"{first}.{last}.{n}@college.edu".lower(), f"555-{n % 10000:04d}",
+                   password_hash, role, self.stamp(SPAN_DAYS + rng.randrange(60)))
+
+    def lost_and_matches(self, n_lost: int):
+        """
+        Yield (lost row, found row or None, match row or None). Matched lost posts bring their found post
+        along so the pair shares a category and the dates line up (lost, then found, then claimed).
+        """
+        rng = self.rng
+        found_n = 0
+        for n in range(n_lost):
+            owner = self.owner()
+            name, category, description = self.item()
+            posted = self.posted_days_ago()
+            lost_day = posted + int(rng.expovariate(1 / 1.5))
+            lost = [lost_id(n), owner, name, category, description, self.day(lost_day), rng.choice(LOCATIONS),
+                    self.stamp(posted), 'open']
+            if rng.random() >= MATCH_RATE:
+                yield lost, None, None
+                continue
+
+            found_day = max(0, lost_day - int(rng.expovariate(1 / 2)))
+            found_posted = max(0, found_day - int(rng.expovariate(1)))
+            matched = max(0, min(posted, found_posted) - int(rng.expovariate(1 / 3)))
+            resolved = rng.random() < (0.9 if matched > RESOLVE_AFTER_DAYS else 0.3)
+            f_name, _, f_description = self.item(category)
+            found = [found_id(found_n), self.owner(), f_name, category, f_description, self.day(found_day),
+                     rng.choice(LOCATIONS), rng.choice(STORAGE), self.stamp(found_posted),
+                     'returned' if resolved else 'matched']
+            lost[-1] = 'closed' if resolved else 'matched'
+            notes = "Match successfully resolved by admin. Item returned." if resolved else "Item claimed by owner."
+            match = (lost[0], found[0], owner, self.stamp(matched), int(resolved), notes)
+            found_n += 1
+            yield lost, found, match
+        self.paired_found = found_n
+
+    def unmatched_found(self, start: int, count: int):
+        rng = self.rng
+        for n in range(start, start + count):
+            name, category, description = self.item()
+            posted = self.posted_days_ago()
+            found_day = posted + int(rng.expovariate(1))
+            yield (found_id(n), self.owner(), name, category, description, self.day(found_day),
+                   rng.choice(LOCATIONS), rng.choice(STORAGE), self.stamp(posted), 'available')
+
+
+def _flush(conn, sql_rows: dict):
+    conn.execute("BEGIN")
+    for query, rows in sql_rows.items():
+        if rows:
+            conn.executemany(query, rows)
+            rows.clear()
+    conn.execute("COMMIT")
+
+
+def generate(path: str, posts: int, users: int = None, seed: int = 42, today: date = None, quiet: bool = False) -> dict:
+    """
+    Build a new database at path with about `posts` posts (lost + found). Rows go into bare tables first
+    (migration 1 only) and the rest of the migrations run afterwards, so the pagination indexes and the
+    full-text index are built once in bulk instead of row by row through the triggers.
+    """
+    started = time.perf_counter()
+    users = users or max(50, posts // 25)
+    gen = Generator(posts, users, seed, today or date.today())
+
+    def say(message):
+        if not quiet:
+            print(f"[{time.perf_counter() - started:7.1f}s] {message}", file=sys.stderr)
+
+    migrate(path, target=1)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -200000")
+    try:
+        # one real hash shared by every generated user, hashing 400k passwords would take hours
+        password_hash = hash_password(PASSWORD)
+        rows = list(gen.users_rows(password_hash))
+        _flush(conn, {USER_SQL: rows})
+        say(f"{users} users")
+
+        n_lost = round(posts * LOST_SHARE)
+        pending = {LOST_SQL: [], FOUND_SQL: [], MATCH_SQL: []}
+        matches = 0
+        for n, (lost, found, match) in enumerate(gen.lost_and_matches(n_lost), start=1):
+            pending[LOST_SQL].append(lost)
+            if found:
+                pending[FOUND_SQL].append(found)
+                pending[MATCH_SQL].append(match)
+                matches += 1
+            if n % CHUNK == 0:
+                _flush(conn, pending)
+                say(f"{n} lost posts")
+        _flush(conn, pending)
+
+        n_found = max(0, posts - n_lost - gen.paired_found)
+        for n, found in enumerate(gen.unmatched_found(gen.paired_found, n_found), start=1):
+            pending[FOUND_SQL].append(found)
+            if n % CHUNK == 0:
+                _flush(conn, pending)
+                say(f"{n} unmatched found posts")
+        _flush(conn, pending)
+    finally:
+        conn.close()
+
+    say("building indexes, full-text search and version columns")
+    migrate(path)
+    # the migration can only guess when a match was resolved, give each one a pickup 1-96 hours after
+    # the claim instead (spread by match_id so it stays the same for a seed), never in the future
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("""
+            UPDATE Matches SET date_resolved = min(strftime('%Y-%m-%d %H:%M:%S', 'now'),
+                datetime(date_matched, '+' || (1 + match_id * 7919 % 96) || ' hours'))
+            WHERE resolved = 1
+        """)
+    conn.close()
+    return {
+        "users": users,
+        "lost": n_lost,
+        "found": gen.paired_found + n_found,
+        "matches": matches,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic lost and found database")
+    parser.add_argument("-o", "--output", required=True, help="database file to create")
+    parser.add_argument("--posts", type=int, default=100000, help="lost + found posts (10^4 to 10^7)")
+    parser.add_argument("--users", type=int, help="default: posts / 25")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", type=date.fromisoformat, help="YYYY-MM-DD the data ends at (default: today)")
+    parser.add_argument("--force", action="store_true", help="overwrite the output file")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        if not args.force:
+            sys.exit(f"{args.output} already exists (use --force to overwrite)")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.output + suffix):
+                os.remove(args.output + suffix)
+    counts = generate(args.output, args.posts, args.users, args.seed, args.today)
+    print(f"Generated {counts['users']} users, {counts['lost']} lost posts, {counts['found']} found posts "
+          f"and {counts['matches']} matches in {counts['seconds']}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#imports
+import argparse
+import csv
+import json
+import sys
+
+from database import db
+
+# BULK IMPORT OF FOUND ITEMS
+# Unlike InsertsLAF.py this never clears anything, it only adds found posts.
+# Reads CSV (header row with item_name, category, description, date_found, found_location and optionally
+# storage_location / found_id) or JSONL (one object per line with the same keys) and streams the rows
+# into db.import_found_posts, which inserts them in chunked transactions and reports bad rows.
+#
+#   python -m database.ImportLAF turned_in.csv --user-id 950000004
+#   python -m database.ImportLAF turned_in.jsonl --user-id 950000004 --format jsonl
+FORMATS = ('csv', 'jsonl')
+
+
+def guess_format(filename: str) -> str:
+    return 'jsonl' if filename and filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def iter_records(stream, fmt: str):
+    """
+    Yield (line number, record) from a text stream without reading it all in. A line that can't be
+    parsed is yielded as (line number, ValueError) so it ends up in the error report. A file that isn't
+    UTF-8 or isn't valid CSV can't be read past the bad spot, that's reported the same way and reading stops
+    (rows before it still get imported).
+    """
+    line_no = 0
+    try:
+        if fmt == 'jsonl':
+            for line_no, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, ValueError(f"bad JSON: {e}")
+        else:
+            reader = csv.DictReader(stream)
+            for record in reader:
+                # line_num is the reader's line (header is line 1), so it matches what a spreadsheet shows
+                line_no = reader.line_num
+                yield line_no, record
+    except UnicodeDecodeError:
+        yield line_no + 1, ValueError("not UTF-8 text, stopped reading the file here")
+    except csv.Error as e:
+        yield line_no + 1, ValueError(f"bad CSV ({e}), stopped reading the file here")
+
+
+def text_stream(binary):
+    """
+    Read an uploaded/opened binary file as lines of text for csv/json (utf-8, a BOM is fine). Decoded a line
+    at a time, so a byte that isn't utf-8 is reported on its own line instead of somewhere in a block.
+    """
+    for line_no, line in enumerate(binary):
+        yield line.decode("utf-8-sig" if line_no == 0 else "utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import found items from CSV or JSONL")
+    parser.add_argument("path", help="file to import")
+    parser.add_argument("--user-id", required=True, help="user the posts are filed under (e.g. the Campus Security account)")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--chunk", type=int, default=db.IMPORT_CHUNK, help="rows per transaction")
+    args = parser.parse_args()
+
+    if not db.get_user_by_id(args.user_id):
+        sys.exit(f"No user {args.user_id}")
+    with open(args.path, "rb") as f:
+        report = db.import_found_posts(iter_records(text_stream(f), args.format or guess_format(args.path)),
+                                       args.user_id, chunk_size=args.chunk)
+    print(f"Inserted {report['inserted']} found posts in {report['seconds']}s, {report['failed']} rows failed.")
+    for line, message in report['errors']:
+        print(f"  line {line}: {message}")
+
+
+if __name__ == "__main__":
+    main()
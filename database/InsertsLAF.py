@@ -1,16 +1,12 @@
 #imports
 import sqlite3
+from database.db import SchemaCatalog, hash_password
 
 DB = "lost_and_found.db"
 
 def get_password_column(cur):
-    cur.execute("PRAGMA table_info(Users)")
-    cols = [r[1] for r in cur.fetchall()]
-    if "password" in cols:
-        return "password"
-    if "password_hash" in cols:
-        return "password_hash"
-    return None
+    # same schema catalog db.py uses for add_user / verify_login
+    return SchemaCatalog().load(cur.connection).password_column()
 
 def main():
     conn = sqlite3.connect(DB)
@@ -58,7 +54,7 @@ def main():
     else:
         insert_sql = "INSERT INTO Users (user_id, name, email, phone, password_hash, role) VALUES (?, ?, ?, ?, ?, ?)"
 
-    users = [(u[0], u[1], u[2], u[3], u[4], u[5]) for u in users_raw]
+    users = [(u[0], u[1], u[2], u[3], hash_password(u[4]), u[5]) for u in users_raw]
 
     for u in users:
         try:
@@ -0,0 +1,79 @@
+#imports
+import argparse
+import asyncio
+import logging
+import os
+
+from database import db
+from database.async_db import run_db
+
+# REPORT ROLLUPS
+# Keeps the Daily* tables behind /admin/reports up to date (see REPORT ROLLUPS in db.py).
+# The app runs it in the background every LAF_ROLLUP_INTERVAL seconds (0 turns it off), one small
+# transaction per chunk of new rows, so only what was posted/resolved since the last run is read.
+# It can also be run by hand (the first run on an old database rolls up everything):
+#
+#   python -m database.RollupLAF
+#   python -m database.RollupLAF --chunk 20000
+ROLLUP_INTERVAL = float(os.environ.get("LAF_ROLLUP_INTERVAL", "300"))
+
+log = logging.getLogger("laf.rollup")
+
+
+async def rollup_once(chunk: int = db.ROLLUP_CHUNK) -> dict:
+    """Same as db.rollup_reports, but each chunk is its own run_db call so requests get a turn in between."""
+    high = db.rollup_high_mark()
+    totals = {}
+    for name in db.ROLLUPS:
+        totals[name] = 0
+        done = False
+        while not done:
+            rows, done = await run_db(db.rollup_step, name, high, chunk)
+            totals[name] += rows
+    return totals
+
+
+async def rollup_loop(interval: float = ROLLUP_INTERVAL):
+    while True:
+        try:
+            totals = await rollup_once()
+            if any(totals.values()):
+                log.info("rolled up %(lost)s lost posts, %(found)s found posts and %(resolutions)s resolutions",
+                         totals)
+        except Exception:
+            # try again next time, a failed chunk was rolled back with its watermark
+            log.exception("report rollup failed")
+        await asyncio.sleep(interval)
+
+
+def start():
+    """Start the background rollup (main.py's lifespan), returns the task or None if it's turned off."""
+    if ROLLUP_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(rollup_loop())
+
+
+async def stop(task):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bring the daily report rollups up to date")
+    parser.add_argument("--chunk", type=int, default=db.ROLLUP_CHUNK, help="source rows per transaction")
+    args = parser.parse_args()
+
+    from database.migrations import migrate
+    migrate()
+    totals = db.rollup_reports(args.chunk)
+    print(f"Rolled up {totals['lost']} lost posts, {totals['found']} found posts and "
+          f"{totals['resolutions']} resolutions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# imports
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from database import db
+from database.passwords import hash_password_async
+
+# ASYNC DATA ACCESS
+# What I need: the routes in main.py are async, so they can't call the db.py functions directly
+# without freezing the event loop while sqlite works. Every function here runs the matching db.py
+# function on its own thread pool. The pool is the same size as the connection pool so a thread
+# never sits around waiting for a connection.
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the DB thread pool, starting it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=db.POOL_SIZE, thread_name_prefix="laf-db")
+    return _executor
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking db function on the DB thread pool and await the result."""
+    loop = asyncio.get_running_loop()
+    # copy the context so anything request-scoped (contextvars) is still visible in the worker thread
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+async def iterate(batches):
+    """
+    Async iterate a db.py batch generator (iter_query and friends), each fetch runs on the DB thread pool.
+    The generator is closed (so its connection goes back to the pool) even if the caller stops early.
+    """
+    try:
+        while True:
+            batch = await run_db(next, batches, None)
+            if batch is None:
+                break
+            yield batch
+    finally:
+        await run_db(batches.close)
+
+
+def _make_async(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_db(fn, *args, **kwargs)
+    return wrapper
+
+
+def _make_queued(submit):
+    """
+    Async version of a group-committed write (see GROUP COMMIT in db.py): await the writer's Future
+    directly, so a burst of inserts doesn't tie up one DB thread each while they wait for their batch.
+    """
+    @functools.wraps(submit)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.wrap_future(submit(*args, **kwargs))
+    return wrapper
+
+
+def shutdown():
+    """Stop the worker threads and close the pooled connections (called when the app shuts down)."""
+    global _executor
+    db.write_batcher.stop()
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    db.close_pool()
+
+
+# --- DATA VERSIONS ---
+get_data_version = _make_async(db.get_data_version)
+get_data_versions = _make_async(db.get_data_versions)
+get_post_version = _make_async(db.get_post_version)
+get_dashboard_stats = _make_async(db.get_dashboard_stats)
+get_report = _make_async(db.get_report)
+
+
+# --- USERS/AUTH ---
+async def add_user(user_id: str, name: str, email: str, password: str, phone: str = None, role: str = "student",
+                   password_is_hashed: bool = False):
+    if not password_is_hashed:
+        password = await hash_password_async(password)
+    return await asyncio.wrap_future(db.submit_user(user_id, name, email, password, phone, role))
+
+
+verify_login = _make_async(db.verify_login)
+get_login_user = _make_async(db.get_login_user)
+set_password_hash = _make_async(db.set_password_hash)
+get_user_by_id = _make_async(db.get_user_by_id)
+update_user_role = _make_async(db.update_user_role)
+delete_user = _make_async(db.delete_user)
+
+# --- LOST POSTS ---
+get_lost_posts = _make_async(db.get_lost_posts)
+get_lost_posts_by_user = _make_async(db.get_lost_posts_by_user)
+get_lost_post = _make_async(db.get_lost_post)
+add_lost_post = _make_queued(db.submit_lost_post)
+delete_lost_post = _make_async(db.delete_lost_post)
+
+# --- FOUND POSTS ---
+get_found_posts = _make_async(db.get_found_posts)
+get_found_post = _make_async(db.get_found_post)
+add_found_post = _make_queued(db.submit_found_post)
+delete_found_post = _make_async(db.delete_found_post)
+import_found_posts = _make_async(db.import_found_posts)
+
+# --- SEARCH ---
+search_posts = _make_async(db.search_posts)
+
+# --- MATCHES ---
+get_all_unresolved_matches = _make_async(db.get_all_unresolved_matches)
+get_matches_by_user = _make_async(db.get_matches_by_user)
+claim_item = _make_async(db.claim_item)
+admin_resolve_match = _make_async(db.admin_resolve_match)
+admin_resolve_matches = _make_async(db.admin_resolve_matches)
+get_suggestions_for_lost = _make_async(db.get_suggestions_for_lost)
+get_suggestions_for_found = _make_async(db.get_suggestions_for_found)
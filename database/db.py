@@ -1,64 +1,929 @@
 # imports
 import sqlite3 as sql
 import os
+import threading
+import contextvars
+import logging
+import queue
+import time
+import json
+import base64
+import re
+import secrets
+import random
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date
+from pathlib import Path
+
+from database.passwords import hash_password, verify_password
 
 #pathing to the database
 DB = os.path.join(os.path.dirname(__file__), "lost_and_found.db")
 
+# CONNECTION POOL SETTINGS (can be overridden with env vars when running the server)
+POOL_SIZE = int(os.environ.get("LAF_POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.environ.get("LAF_POOL_TIMEOUT", "5"))
+STATEMENT_CACHE_SIZE = 256
+
+# GROUP COMMIT SETTINGS
+WRITE_BATCH_MAX = int(os.environ.get("LAF_WRITE_BATCH_MAX", "256"))
+# extra wait for more writes before committing, 0 = take whatever queued up while the last batch ran
+WRITE_BATCH_WINDOW = float(os.environ.get("LAF_WRITE_BATCH_MS", "0")) / 1000
+
+# CONTENDED WRITE SETTINGS (claims and resolves)
+BUSY_RETRIES = int(os.environ.get("LAF_BUSY_RETRIES", "5"))
+BUSY_WAIT_MS = int(os.environ.get("LAF_BUSY_WAIT_MS", "100"))     # sqlite's own busy wait per attempt
+BUSY_BACKOFF = float(os.environ.get("LAF_BUSY_BACKOFF_MS", "10")) / 1000  # jittered, doubles every retry
+
+# ARCHIVE SETTINGS (see ARCHIVE below and database/ArchiveLAF.py)
+ARCHIVE_AFTER_DAYS = float(os.environ.get("LAF_ARCHIVE_AFTER_DAYS", "30"))  # resolved this long ago -> archive
+ARCHIVE_BATCH = int(os.environ.get("LAF_ARCHIVE_BATCH", "200"))              # matches (and posts) per transaction
+ARCHIVE_PAUSE = float(os.environ.get("LAF_ARCHIVE_PAUSE_MS", "50")) / 1000   # gap between batches for other writers
+
+# REPORT ROLLUP SETTINGS (see REPORT ROLLUPS below and database/RollupLAF.py)
+ROLLUP_CHUNK = int(os.environ.get("LAF_ROLLUP_CHUNK", "5000"))  # source rows per rollup transaction
+ROLLUP_LAG = float(os.environ.get("LAF_ROLLUP_LAG", "60"))  # seconds, younger rows wait for the next run
+REPORT_CACHE_SIZE = 32  # finished reports kept per process, until the rollups move on
+
+# QUERY METRICS SETTINGS
+SLOW_QUERY_MS = float(os.environ.get("LAF_SLOW_QUERY_MS", "200"))
+QUERY_TOTALS_SIZE = 500
+
+# PRAGMA profile every connection gets. journal_mode=WAL is stored in the database file itself so it
+# is set once at startup by database/migrations.py instead of here.
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA synchronous = NORMAL;",   # safe with WAL, commits no longer fsync the main db file
+    "PRAGMA cache_size = -20000;",    # ~20MB page cache per connection (negative = KiB)
+    "PRAGMA mmap_size = 268435456;",  # read pages through a 256MB memory map instead of read() calls
+    "PRAGMA temp_store = MEMORY;",    # temp b-trees for sorts/GROUP BY stay in memory
+)
+
+
+def configure_connection(conn):
+    """Apply the PRAGMA profile to a freshly opened connection."""
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# QUERY METRICS
+# What I need: to see which requests run lots of SQL or slow SQL. Every pooled connection times each
+# execute plus its fetches, and while it's lent out to a request it also counts the statements sqlite
+# runs (trace callback, so trigger and FTS internal statements count too). The trace costs a Python call
+# per statement (an FTS search runs ~100) so it's only switched on when there's a request to count for. Both go into the QueryStats of whatever is running (metrics.py sets one per request and
+# run_db carries it over to the DB thread), and into query_totals per statement for /metrics.
+# Statements slower than SLOW_QUERY_MS are logged to "laf.slow_queries" with the SQL and the shape of
+# the parameters, only the types, never the values (some of them are password hashes).
+slow_query_log = logging.getLogger("laf.slow_queries")
+
+
+class QueryStats:
+    """SQL work done on behalf of one request."""
+
+    def __init__(self, label: str = None):
+        self.label = label
+        self.statements = 0
+        self.seconds = 0.0
+        self.pool_wait = 0.0
+        self.slow = 0
+
+
+current_query_stats = contextvars.ContextVar("current_query_stats", default=None)
+
+# normalized SQL -> [executions, seconds, slow executions]
+query_totals = {}
+_query_totals_lock = threading.Lock()
+_normalized = {}
+
+
+def normalize_sql(query: str) -> str:
+    """One line, and IN (?, ?, ?, ...) lists of any length collapse to the same text."""
+    key = _normalized.get(query)
+    if key is None:
+        key = re.sub(r"\s+", " ", query).strip()
+        key = re.sub(r"\?(\s*,\s*\?)+", "?, ...", key)[:300]
+        if len(_normalized) < QUERY_TOTALS_SIZE * 4:
+            _normalized[query] = key
+    return key
+
+
+def param_shape(params, many: bool = False) -> str:
+    """Types of the bound parameters, e.g. (str, int) or 500 x (str, str)."""
+    if many:
+        if not isinstance(params, (list, tuple)):
+            return "iterator"
+        return f"{len(params)} x {param_shape(params[0])}" if params else "0 rows"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+
+
+def _trace(statement):
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.statements += 1
+
+
+def _add_query_time(seconds: float):
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.seconds += seconds
+
+
+def _record_query(query: str, params, many: bool, seconds: float):
+    key = normalize_sql(query)
+    slow = seconds * 1000 >= SLOW_QUERY_MS
+    with _query_totals_lock:
+        totals = query_totals.get(key)
+        if totals is None:
+            if len(query_totals) >= QUERY_TOTALS_SIZE:
+                key = "other"
+            totals = query_totals.setdefault(key, [0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += slow
+    if slow:
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.slow += 1
+        slow_query_log.warning("slow query %.1f ms%s: %s params=%s", seconds * 1000,
+                               f" ({stats.label})" if stats is not None and stats.label else "",
+                               key, param_shape(params, many))
+
+
+def query_totals_snapshot() -> dict:
+    with _query_totals_lock:
+        return {key: tuple(totals) for key, totals in query_totals.items()}
+
+
+class TimedCursor(sql.Cursor):
+    """
+    Cursor that times each statement from execute() until its rows are used up (or the next execute,
+    close, or the connection going back to the pool) and records it (see QUERY METRICS).
+    """
+    _query = None
+
+    def _start(self, query: str, params, many: bool):
+        self._finish()
+        self._query, self._params, self._many, self._elapsed = query, params, many, 0.0
+
+    def _add(self, seconds: float):
+        if self._query is not None:
+            self._elapsed += seconds
+        _add_query_time(seconds)
+
+    def _finish(self):
+        if self._query is not None:
+            query, self._query = self._query, None
+            _record_query(query, self._params, self._many, self._elapsed)
+            self._params = None
+
+    def execute(self, query, params=()):
+        self._start(query, params, False)
+        start = time.perf_counter()
+        try:
+            return super().execute(query, params)
+        finally:
+            self._add(time.perf_counter() - start)
+
+    def executemany(self, query, seq):
+        self._start(query, seq, True)
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, seq)
+        finally:
+            self._add(time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add(time.perf_counter() - start)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._add(time.perf_counter() - start)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add(time.perf_counter() - start)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return super().__next__()
+        except StopIteration:
+            self._finish()
+            raise
+        finally:
+            self._add(time.perf_counter() - start)
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class TimedConnection(sql.Connection):
+    """sqlite3 connection whose cursors (and execute shortcuts) are TimedCursors."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = []
+        self._tracing = False
+
+    def trace_statements(self):
+        self.set_trace_callback(_trace)
+        self._tracing = True
+
+    def cursor(self, factory=TimedCursor):
+        cur = super().cursor(factory)
+        self._cursors.append(cur)
+        return cur
+
+    def execute(self, query, params=()):
+        return self.cursor().execute(query, params)
+
+    def executemany(self, query, seq):
+        return self.cursor().executemany(query, seq)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            _add_query_time(time.perf_counter() - start)
+
+    def finish_statements(self):
+        """Record whatever the cursors were still running and stop counting (the pool got it back)."""
+        cursors, self._cursors = self._cursors, []
+        for cur in cursors:
+            cur._finish()
+        if self._tracing:
+            self.set_trace_callback(None)
+            self._tracing = False
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection frees up before the wait timeout."""
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a pooled sqlite3 connection. Everything is passed straight through
+    to the real connection except close(), which hands the connection back to the pool.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sql.ProgrammingError("Cannot operate on a connection returned to the pool.")
+        return getattr(self._conn, name)
+
+    def close(self):
+        # closing twice is fine, the second call does nothing
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    Bounded pool of already-configured sqlite3 connections.
+    Connections are opened lazily up to `size`; after that callers wait up to `timeout`
+    seconds for one to be returned. Keeping the connections open means row_factory,
+    the PRAGMAs and sqlite's prepared statement cache all survive between calls.
+    """
+
+    def __init__(self, db_path: str, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._opened = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._acquired = 0
+        self._wait_seconds = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _new_connection(self):
+        conn = sql.connect(self.db_path, timeout=5, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE, factory=TimedConnection)
+        conn.row_factory = sql.Row
+        return configure_connection(conn)
+
+    def acquire(self) -> PooledConnection:
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            if self._closed:
+                raise PoolTimeout("Connection pool is closed.")
+            # wait for either an idle connection or room to open a new one
+            while not self._idle and self._opened >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s "
+                                      f"({self._in_use} in use, {self._waiting} waiting).")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = None
+                self._opened += 1
+            self._in_use += 1
+            waited = time.perf_counter() - started
+            self._acquired += 1
+            self._wait_seconds += waited
+
+        if conn is None:
+            # open outside the lock so a slow connect doesn't hold up everybody else
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.pool_wait += waited
+            conn.trace_statements()
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        conn.finish_statements()
+        # never hand out a connection with a half finished transaction on it
+        healthy = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sql.Error:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and not self._closed:
+                self._idle.append(conn)
+            else:
+                self._opened -= 1
+                conn.close()
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        """Snapshot of the pool for monitoring."""
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._opened,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "acquired": self._acquired,
+                "wait_seconds": self._wait_seconds,
+            }
+
+    def close(self):
+        """Close every idle connection, connections still checked out are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the shared pool, (re)creating it if DB was pointed somewhere else."""
+    global _pool
+    if _pool is None or _pool.db_path != DB:
+        with _pool_lock:
+            if _pool is None or _pool.db_path != DB:
+                old, _pool = _pool, ConnectionPool(DB)
+                if old is not None:
+                    old.close()
+    return _pool
+
 
 # connect this i found online because the datAbase kept not INTERACTING TO the database
 def get_connection():
     """
-    Return a new sqlite3 connection configureds, this waits for 5 seconds to acquire locks
+    Borrow a configured connection from the pool, calling close() on it puts it back.
+    Waits up to POOL_TIMEOUT seconds for a free connection and 5 seconds to acquire locks.
     """
-    conn = sql.connect(DB, timeout=5, check_same_thread=False)
-    conn.row_factory = sql.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+    return get_pool().acquire()
+
 
+def close_pool():
+    """Close the shared pool, the next get_connection() starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, None
+    if old is not None:
+        old.close()
+
+
+def get_read_connection():
+    """
+    Open a read-only connection of its own, outside the pool, for long reads like exports so a slow
+    download doesn't keep one of the POOL_SIZE connections away from requests. close() really closes it.
+    """
+    conn = sql.connect(Path(DB).resolve().as_uri() + "?mode=ro", uri=True, timeout=5, check_same_thread=False,
+                       factory=TimedConnection)
+    return configure_connection(conn)
+
+
+def pool_stats() -> dict:
+    """How many pooled connections are open / in use / idle and how many callers are waiting."""
+    return get_pool().stats()
+
+# SCHEMA CATALOG
 # PLANNING: Need a helper function to check if a column exists in a table.
+# Instead of running PRAGMA table_info on every call (add_user used to do it up to twice per signup)
+# the column names of every table are read once and kept here. The catalog remembers the schema
+# version (PRAGMA user_version) it was loaded at, migrations.py calls invalidate() after changing the
+# schema so the next lookup reloads it.
+class SchemaCatalog:
+    """Column names for every table in the database, loaded once."""
+
+    def __init__(self):
+        self.db_path = None
+        self.version = None
+        self.columns = {}
+        self._lock = threading.Lock()
+
+    def load(self, conn, db_path: str = None):
+        """Read every table's columns using the given connection."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        columns = {}
+        for table in tables:
+            columns[table] = tuple(r[1] for r in conn.execute(f'PRAGMA table_info("{table}")'))
+        self.columns = columns
+        self.version = version
+        self.db_path = db_path
+        return self
+
+    def ensure_loaded(self):
+        # only touches the database the first time (or after invalidate / a DB path change)
+        if self.version is not None and self.db_path == DB:
+            return self
+        with self._lock:
+            if self.version is None or self.db_path != DB:
+                conn = get_connection()
+                try:
+                    self.load(conn, DB)
+                finally:
+                    conn.close()
+        return self
+
+    def invalidate(self):
+        self.version = None
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in self.columns.get(table, ())
+
+    def password_column(self):
+        """'password' preferred, fallback to 'password_hash', None if neither exists."""
+        if self.has_column("Users", "password"):
+            return "password"
+        if self.has_column("Users", "password_hash"):
+            return "password_hash"
+        return None
+
+
+schema_catalog = SchemaCatalog()
+
+
+def get_schema_catalog() -> SchemaCatalog:
+    return schema_catalog.ensure_loaded()
+
+
 def table_has_column(table: str, column: str) -> bool:
-    # ACTION: Get connection
-    conn = get_connection()
+    return get_schema_catalog().has_column(table, column)
+
+# --- PAGINATION HELPERS ---
+# Lists are paged with keyset (cursor) pagination instead of OFFSET: the cursor holds the sort key of
+# the last row on the page and the next page starts right after it, so every page is an index range
+# scan no matter how deep into the list it is.
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values) -> str:
+    """Pack the sort key of a row into an opaque url-safe string."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Unpack a cursor made by encode_cursor, raises ValueError if it was tampered with."""
     try:
-        cur = conn.cursor()
-        cur.execute("PRAGMA table_info(?)", (table,))  # Initial attempt with placeholder
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
     except Exception:
-        cur = conn.cursor()
-        cur.execute(f"PRAGMA table_info({table})")
-    # ACTION: Extract column names and check if the target exists.
-    print("cur.execute(f'PRAGMA table_info({table})') ran")
-    cols = [r["name"] for r in cur.fetchall()]
+        raise ValueError("Invalid page cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid page cursor.")
+    return values
+
+
+def clamp_limit(limit) -> int:
+    """Keep a user supplied page size between 1 and MAX_PAGE_SIZE."""
+    if not limit:
+        return PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def next_cursor(rows: list, limit, *key_cols):
+    """Cursor for the page after `rows`, or None when this was the last (short) page."""
+    if not limit or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(*(last[c] for c in key_cols))
+
+
+# WRITE LISTENERS
+# What I need: let other modules (the incremental matcher) hear about posts being added, deleted,
+# claimed or resolved without db.py importing them. Listeners are called as fn(action, kind, post_id, post)
+# with action 'remove' and kind 'lost' or 'found', after the write has been committed.
+# Bulk imports send one 'add_many' with post_id None and a list of the new posts.
+# Posts added through the group-commit writer go to the suggester instead (see GROUP COMMIT below).
+_write_listeners = []
+_suggester = None
+
+
+def add_write_listener(fn):
+    if fn not in _write_listeners:
+        _write_listeners.append(fn)
+
+
+def remove_write_listener(fn):
+    if fn in _write_listeners:
+        _write_listeners.remove(fn)
+
+
+def set_suggester(fn):
+    """fn([(kind, post_id, post)]) -> [(lost_id, found_id, score)] for new posts, None turns it off."""
+    global _suggester
+    _suggester = fn
+
+
+def _suggest(added: list) -> list:
+    if _suggester is None or not added:
+        return []
+    try:
+        return _suggester(added)
+    except Exception:
+        # no suggestions is better than failing the whole batch of posts
+        return []
+
+
+def _notify(action: str, kind: str, post_id: str, post: dict = None):
+    for fn in list(_write_listeners):
+        try:
+            fn(action, kind, post_id, post)
+        except Exception:
+            # the write already went through, a broken listener shouldn't turn it into an error
+            pass
+
+
+# GROUP COMMIT
+# What I need: at semester start /add-lost, /add-found and /register come in bursts, and each one took its
+# own write lock and commit, so they lined up on sqlite's single writer lock until some timed out.
+# Now those inserts are queued and one writer thread runs whatever piled up while it was busy with the
+# last batch (plus anything within WRITE_BATCH_WINDOW) in a single transaction. Every insert gets its own SAVEPOINT, so a bad row
+# only undoes itself and each caller still gets its own result or exception from its Future.
+# The bigger the burst, the bigger the batch, so commits stop being the limit.
+# The batch's new posts go to the suggester (the incremental matcher) before the COMMIT and the suggestions
+# it returns are written by one executemany in the same transaction, so suggestions exist by the time the
+# new post's page loads without a second commit per post.
+write_log = logging.getLogger("laf.writes")
+
+
+class WriteBatcher:
+    """Single writer thread that group-commits queued insert operations."""
+
+    def __init__(self, max_batch: int = WRITE_BATCH_MAX, window: float = WRITE_BATCH_WINDOW):
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._db_path = None
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+        self.largest = 0
+
+    def submit(self, op, args: tuple, notice: tuple = None) -> Future:
+        """
+        Queue op(cursor, *args) for the next batch. notice is (kind, post_id, post) for the write listeners.
+        Returns a Future with op's return value, or the exception it raised.
+        """
+        future = Future()
+        self._ensure_running()
+        self._queue.put((op, args, notice, future))
+        return future
+
+    def _ensure_running(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="laf-writer", daemon=True)
+                    self._thread.start()
+
+    def stop(self):
+        """Finish what's queued and stop the writer thread (the next submit starts a new one)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def _take(self):
+        # block for the first write, then take whatever else shows up within the window
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is None:
+                # stop was called, write this batch first
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _connection(self):
+        if self._conn is None or self._db_path != DB:
+            if self._conn is not None:
+                self._conn.close()
+            # autocommit mode so BEGIN IMMEDIATE / SAVEPOINT / COMMIT below are exactly what runs
+            conn = sql.connect(DB, timeout=5, isolation_level=None, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE, factory=TimedConnection)
+            self._conn, self._db_path = configure_connection(conn), DB
+        return self._conn
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._take()
+                if batch is None:
+                    break
+                self._write(batch)
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _write(self, batch: list):
+        results, added, gone = [], [], []
+        try:
+            conn = self._connection()
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                for op, args, notice, future in batch:
+                    cur.execute("SAVEPOINT write")
+                    try:
+                        result = op(cur, *args)
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO write")
+                        cur.execute("RELEASE write")
+                        results.append((future, None, e, None))
+                    else:
+                        cur.execute("RELEASE write")
+                        results.append((future, result, None, notice))
+                added = [notice for _, _, error, notice in results if notice and not error]
+                suggestions = _suggest(added)
+                if suggestions:
+                    # a side effect, so it gets its own savepoint and can never take the posts down with it
+                    cur.execute("SAVEPOINT suggestions")
+                    try:
+                        gone = _gone_posts(cur, suggestions)
+                        cur.executemany(SUGGESTIONS_UPSERT, suggestions)
+                        _bump_data_version(cur, 'suggestions')
+                    except sql.Error:
+                        cur.execute("ROLLBACK TO suggestions")
+                        write_log.exception("couldn't store %d suggestions for new posts", len(suggestions))
+                    cur.execute("RELEASE suggestions")
+                cur.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # the suggester may have indexed posts that now don't exist
+                for kind, post_id, _ in added:
+                    _notify('remove', kind, post_id)
+                raise
+            finally:
+                conn.finish_statements()
+        except Exception as e:
+            # couldn't get the write lock or commit, nothing in the batch was written
+            self.failed += len(batch)
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        self.largest = max(self.largest, len(batch))
+        for future, result, error, _ in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        # posts the matcher still had but another process deleted, so it stops suggesting them
+        for kind, post_id in gone:
+            _notify('remove', kind, post_id)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "batches": self.batches, "writes": self.writes,
+                "failed": self.failed, "largest_batch": self.largest}
+
+
+write_batcher = WriteBatcher()
+
+
+def write_batcher_stats() -> dict:
+    return write_batcher.stats()
+
+
+# DATA VERSIONS
+# What I need: a cheap way to know if something changed since it was cached or sent to a browser.
+#   - DataVersions (migrations 6/7) has a counter per list ('lost', 'found', 'matches') that triggers
+#     bump on every insert/update/delete, and a 'suggestions' counter bumped by the suggestion writers
+#   - every post has its own version / updated_at, bumped by the write functions below (BUMP_VERSION)
+BUMP_VERSION = "version = version + 1, updated_at = strftime('%Y-%m-%d %H:%M:%S', 'now')"
+POST_TABLES = {'lost': ('LostPosts', 'lost_id'), 'found': ('FoundPosts', 'found_id')}
+
+# every counter in one string ("found:12,lost:40,...") plus the newest change time
+DATA_VERSIONS_SQL = """
+    SELECT group_concat(name || ':' || version, ','), max(updated_at)
+    FROM (SELECT name, version, updated_at FROM DataVersions ORDER BY name)
+"""
+
+
+def get_data_version(name: str) -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM DataVersions WHERE name = ?", (name,))
+    row = cur.fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+
+def get_data_versions() -> dict:
+    """All the list counters (as one string and by name) and when the newest one moved, for list page ETags."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(DATA_VERSIONS_SQL)
+    versions, updated_at = cur.fetchone()
+    conn.close()
+    counters = {}
+    for pair in (versions or "").split(","):
+        if pair:
+            name, version = pair.split(":")
+            counters[name] = int(version)
+    return {"version": versions or "", "counters": counters, "updated_at": updated_at}
+
+
+def get_post_version(kind: str, post_id: str):
+    """
+    A post's version plus the list counters (detail pages also show suggestions and the user's open posts),
+    or None if the post doesn't exist. Only touches the primary key and the tiny DataVersions table.
+    """
+    table, id_col = POST_TABLES[kind]
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(f"SELECT version, coalesce(updated_at, date_posted) FROM {table} WHERE {id_col} = ?", (post_id,))
+    row = cur.fetchone()
+    if row is None:  # archived posts never change, but their page still needs validators
+        cur.execute(f"SELECT version, coalesce(updated_at, date_posted) FROM Archived{table} WHERE {id_col} = ?",
+                    (post_id,))
+        row = cur.fetchone()
+    if row is None:
+        conn.close()
+        return None
+    cur.execute(DATA_VERSIONS_SQL)
+    versions, data_updated_at = cur.fetchone()
+    conn.close()
+    return {
+        "version": f"{row[0]}/{versions or ''}",
+        "updated_at": max(filter(None, (row[1], data_updated_at)), default=None),
+    }
+
+
+def _bump_data_version(cur, name: str):
+    cur.execute(f"UPDATE DataVersions SET {BUMP_VERSION} WHERE name = ?", (name,))
+
+
+# DASHBOARD STATS
+# What I need: totals for the dashboards (open items per category, pending matches) without COUNT(*) /
+# GROUP BY over the posts. Stats (migration 9) holds a count per (kind, status, category) that triggers
+# move on every insert, delete and status/category/resolved change, archive tables included, so this is
+# a read of a few dozen rows however big the tables get.
+def get_dashboard_stats() -> dict:
+    """
+    {'lost': {status: n}, 'found': {status: n}, 'matches': {'unresolved': n, 'resolved': n},
+     'categories': {category: {'lost': open n, 'found': available n}}}
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT kind, status, category, count FROM Stats")
+    rows = cur.fetchall()
     conn.close()
-    return column in cols
+
+    stats = {kind: dict.fromkeys(SEARCH_KINDS[kind][4], 0) for kind in POST_TABLES}
+    stats['matches'] = dict.fromkeys(MATCH_STATUSES, 0)
+    stats['categories'] = {category: {'lost': 0, 'found': 0} for category in VALID_CATEGORIES}
+    for kind, status, category, count in rows:
+        stats[kind][status] = stats[kind].get(status, 0) + count
+        if kind in ACTIVE_STATUS and status == ACTIVE_STATUS[kind] and category:
+            stats['categories'].setdefault(category, {'lost': 0, 'found': 0})[kind] += count
+    return stats
+
 
 # --- USERS/AUTH FUNCTIONS ---
 # making a user
-def add_user(user_id: str, name: str, email: str, password: str, phone: str = None, role: str = "student"):
+def add_user(user_id: str, name: str, email: str, password: str, phone: str = None, role: str = "student",
+             password_is_hashed: bool = False):
     """
-    Adds a new user. Stores the plain text password in whichever column exists:
+    Adds a new user. Stores the hashed password in whichever column exists:
     'password' preferred, fallback to 'password_hash'.
+    Pass password_is_hashed=True if the caller already ran hash_password (main.py does it on the hashing pool).
     Returns (success: bool, message: str)
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-# dynamically check the schema for password column name.
-        if table_has_column("Users", "password"):
-            pw_col = "password"
-        elif table_has_column("Users", "password_hash"):
-            pw_col = "password_hash"
-        else:
-            return False, "Database schema missing password column (password or password_hash)."
+    if not password_is_hashed:
+        password = hash_password(password)
+    return submit_user(user_id, name, email, password, phone, role).result()
+
+
+def submit_user(user_id: str, name: str, email: str, password_hash: str, phone: str = None,
+                role: str = "student") -> Future:
+    """Queue the Users insert for the group-commit writer, the Future gets add_user's (success, message)."""
+# check the schema catalog for the password column name (no PRAGMA once it's loaded).
+    pw_col = get_schema_catalog().password_column()
+    if not pw_col:
+        future = Future()
+        future.set_result((False, "Database schema missing password column (password or password_hash)."))
+        return future
+    return write_batcher.submit(_insert_user, (pw_col, (user_id, name, email, password_hash, phone, role)))
+
 
+def _insert_user(cursor, pw_col: str, row: tuple) -> tuple[bool, str]:
+    try:
         # ACTION: Execute the INSERT using the determined column name.
         cursor.execute(f"""
             INSERT INTO Users (user_id, name, email, {pw_col}, phone, role)
             VALUES (?, ?, ?, ?, ?, ?)
-        """, (user_id, name, email, password, phone, role))
-        conn.commit()
+        """, row)
         return True, "User successfully added."
-    # ERROR HANDLING: Catch integrity errors for duplicates
+    # ERROR HANDLING: Catch integrity errors for duplicates (a failed INSERT leaves nothing behind)
     except sql.IntegrityError as e:
         msg = str(e)
         if "UNIQUE constraint failed: Users.email" in msg:
@@ -68,18 +933,20 @@ def add_user(user_id: str, name: str, email: str, password: str, phone: str = No
         elif "CHECK constraint failed" in msg:
             return False, "Error: Invalid role specified."
         return False, f"Database error: {e}"
-    finally:
-        # ACTION: close system everytime
-        conn.close()
 
         #i need to make a verification now
 
 # What I need: A flexible login check (ID or email) that handles either password column.
-def verify_login(user_id_or_email: str, password: str):
+def get_login_user(user_id_or_email: str):
     """
-    Verifies user login using user_id or email and plain text password.
-    Returns user dict without password field on success, otherwise None.
+    Looks a user up by user_id or email for logging in.
+    Returns the user dict with the stored password value under 'stored_password', or None.
     """
+    # LOGIC: the schema catalog says which password column exists.
+    pw_col = get_schema_catalog().password_column()
+    if not pw_col:
+        return None
+
     conn = get_connection()
     cur = conn.cursor()
     # DECISION POINT: Determine lookup field based on the presence of '@'.
@@ -90,21 +957,43 @@ def verify_login(user_id_or_email: str, password: str):
 
     if not user_row:
         return None
-
     user = dict(user_row)
-    # LOGIC: Check against the column that exists in the fetched row.
-    if 'password' in user:
-        if password == user['password']:
-            del user['password'] #delete apss
-            return user
-    elif 'password_hash' in user:
-        if password == user['password_hash']:
-            del user['password_hash']
-            return user
+    user['stored_password'] = user.pop(pw_col)
+    return user
+
+
+def set_password_hash(user_id: str, password_hash: str):
+    """Replace a user's stored password (used to upgrade plain text / old hashes after a good login)."""
+    pw_col = get_schema_catalog().password_column()
+    conn = get_connection()
+    try:
+        conn.execute(f"UPDATE Users SET {pw_col} = ? WHERE user_id = ?", (password_hash, user_id))
+        conn.commit()
+    finally:
+        conn.close()
 
-    return None
+
+def verify_login(user_id_or_email: str, password: str):
+    """
+    Verifies user login using user_id or email and password.
+    Plain text (legacy) rows are re-hashed on a successful login.
+    Returns user dict without password field on success, otherwise None.
+    """
+    user = get_login_user(user_id_or_email)
+    if not user:
+        return None
+    stored = user.pop('stored_password')  # never hand the password back
+    ok, needs_rehash = verify_password(password, stored)
+    if not ok:
+        return None
+    if needs_rehash:
+        set_password_hash(user['user_id'], hash_password(password))
+    return user
 
 
+# No user cache here on purpose: get_current_user reads name/role from the signed session token (sessions.py)
+# and role changes / deletes reach every worker through SessionRevocations, so page views never read Users.
+# This lookup is only left for /api/v1/users/me and the import CLI, not worth a cache and its invalidation.
 def get_user_by_id(user_id: str):
     """Retrieves user details by user_id (excludes any password column)."""
     conn = get_connection()
@@ -115,50 +1004,186 @@ def get_user_by_id(user_id: str):
     conn.close()
     return dict(user_row) if user_row else None
 
-# FRAMEWORK STEP 3: Lost Item Management (CRUD)
-# What I need: List all posts, filtered by status, ordered by date.
-def get_lost_posts(status: str = 'open') -> list:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM LostPosts WHERE status = ? ORDER BY date_posted DESC", (status,))
-    posts = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return posts
+# --- SESSION REVOCATIONS ---
+# Signed session tokens (sessions.py) are checked without a database lookup, so logging out or
+# changing someone's role is recorded here and every worker picks it up from this table.
+# 'user' rows are kept long enough to outlive any token issued before them.
+USER_REVOCATION_KEEP = 30 * 24 * 60 * 60
 
-# What needs to happen for this to work: List posts for a just the user logging in.
-def get_lost_posts_by_user(user_id: str, status: str = 'open') -> list:
+
+def _revoke_user_sessions(cur, user_id: str):
+    now = time.time()
+    cur.execute("""
+        INSERT OR REPLACE INTO SessionRevocations (kind, key, revoked_at, expires_at)
+        VALUES ('user', ?, ?, ?)
+    """, (user_id, now, now + USER_REVOCATION_KEEP))
+
+
+def add_session_revocation(kind: str, key: str, expires_at: float) -> float:
+    """Revoke one token ('token', jti) or every current token of a user ('user', user_id). Returns revoked_at."""
+    now = time.time()
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM LostPosts WHERE user_id = ? AND status = ? ORDER BY date_posted DESC", (user_id, status))
-    posts = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return posts
+    try:
+        conn.execute("""
+            INSERT OR REPLACE INTO SessionRevocations (kind, key, revoked_at, expires_at)
+            VALUES (?, ?, ?, ?)
+        """, (kind, key, now, expires_at))
+        conn.commit()
+    finally:
+        conn.close()
+    return now
 
-# Whats needed: Retrieve a single post by ID.
-def get_lost_post(lost_id: str):
+
+def get_session_revocations(since: float = 0.0) -> list:
+    """Revocations written at or after `since` that haven't expired yet."""
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT * FROM LostPosts WHERE lost_id = ?", (lost_id,))
-    post_row = cur.fetchone()
+    cur.execute("""
+        SELECT kind, key, revoked_at, expires_at FROM SessionRevocations
+        WHERE revoked_at >= ? AND expires_at > ?
+    """, (since, time.time()))
+    rows = [dict(row) for row in cur.fetchall()]
     conn.close()
-    return dict(post_row) if post_row else None
+    return rows
 
-# What I need: Insertion logic.
-def add_lost_post(lost_id: str, user_id: str, item_name: str, category: str, description: str, date_lost: str,
-                  last_seen_location: str):
+
+def purge_session_revocations(max_age: float) -> int:
+    """
+    Delete revocations no live token can need: expired ones, and 'user' ones older than max_age (the token
+    lifetime, every token issued before them has expired). Returns how many went.
+    """
+    now = time.time()
     conn = get_connection()
-    cur = conn.cursor()
     try:
-        # the insert: INSERT INTO LostPosts (lost_id, user_id, item_name, category, description, date_lost, last_seen_location)
-        cur.execute("""
-            INSERT INTO LostPosts (lost_id, user_id, item_name, category, description, date_lost, last_seen_location)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (lost_id, user_id, item_name, category, description, date_lost, last_seen_location))
+        cur = conn.execute("""
+            DELETE FROM SessionRevocations WHERE expires_at <= ? OR (kind = 'user' AND revoked_at <= ?)
+        """, (now, now - max_age))
         conn.commit()
+        return cur.rowcount
     finally:
         conn.close()
 
-# What I need: Deletion logic.
+# What I need: admin changes to a user. Both revoke the user's session tokens so the change shows up right away.
+def update_user_role(user_id: str, role: str) -> tuple[bool, str]:
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("UPDATE Users SET role = ? WHERE user_id = ?", (role, user_id))
+        if cur.rowcount == 0:
+            return False, "User not found."
+        _revoke_user_sessions(cur, user_id)
+        conn.commit()
+        return True, f"User {user_id} is now {role}."
+    except sql.IntegrityError:
+        return False, "Error: Invalid role specified."
+    finally:
+        conn.close()
+
+
+def delete_user(user_id: str) -> tuple[bool, str]:
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        # their posts go with them (ON DELETE CASCADE), remember which so listeners can drop them too
+        cur.execute("SELECT lost_id FROM LostPosts WHERE user_id = ?", (user_id,))
+        lost_ids = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT found_id FROM FoundPosts WHERE user_id = ?", (user_id,))
+        found_ids = [row[0] for row in cur.fetchall()]
+        cur.execute("DELETE FROM Users WHERE user_id = ?", (user_id,))
+        if cur.rowcount == 0:
+            return False, "User not found."
+        _revoke_user_sessions(cur, user_id)
+        conn.commit()
+        for lost_id in lost_ids:
+            _notify('remove', 'lost', lost_id)
+        for found_id in found_ids:
+            _notify('remove', 'found', found_id)
+        return True, f"User {user_id} deleted."
+    finally:
+        conn.close()
+
+# Categories the LostPosts / FoundPosts CHECK constraints allow (main.py's forms and the importer use this list)
+VALID_CATEGORIES = [
+    'Electronics', 'Clothing', 'Accessories',
+    'Documents', 'Keys', 'Books', 'Other'
+]
+
+# FRAMEWORK STEP 3: Lost Item Management (CRUD)
+# What I need: List all posts, filtered by status, ordered by date.
+# after/limit page through the list newest first, next_cursor(posts, limit, 'date_posted', 'lost_id')
+# gives the `after` for the following page.
+def get_lost_posts(status: str = 'open', after: str = None, limit: int = None) -> list:
+    query = "SELECT * FROM LostPosts WHERE status = ?"
+    params = [status]
+    if after:
+        query += " AND (date_posted, lost_id) < (?, ?)"
+        params += decode_cursor(after, 2)
+    query += " ORDER BY date_posted DESC, lost_id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(query, params)
+    posts = [dict(row) for row in cur.fetchall()]
+    conn.close()
+    return posts
+
+# What needs to happen for this to work: List posts for a just the user logging in.
+def get_lost_posts_by_user(user_id: str, status: str = 'open', after: str = None, limit: int = None) -> list:
+    query = "SELECT * FROM LostPosts WHERE user_id = ? AND status = ?"
+    params = [user_id, status]
+    if after:
+        query += " AND (date_posted, lost_id) < (?, ?)"
+        params += decode_cursor(after, 2)
+    query += " ORDER BY date_posted DESC, lost_id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(query, params)
+    posts = [dict(row) for row in cur.fetchall()]
+    conn.close()
+    return posts
+
+# Whats needed: Retrieve a single post by ID.
+def get_lost_post(lost_id: str):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM LostPosts WHERE lost_id = ?", (lost_id,))
+    post_row = cur.fetchone()
+    if post_row is None:  # archived (see ARCHIVE)
+        cur.execute("SELECT * FROM ArchivedLostPosts WHERE lost_id = ?", (lost_id,))
+        post_row = cur.fetchone()
+    conn.close()
+    return dict(post_row) if post_row else None
+
+# What I need: Insertion logic.
+# Goes through the group-commit writer, raises whatever the INSERT raised.
+def add_lost_post(lost_id: str, user_id: str, item_name: str, category: str, description: str, date_lost: str,
+                  last_seen_location: str):
+    submit_lost_post(lost_id, user_id, item_name, category, description, date_lost, last_seen_location).result()
+
+
+def submit_lost_post(lost_id: str, user_id: str, item_name: str, category: str, description: str, date_lost: str,
+                     last_seen_location: str) -> Future:
+    row = (lost_id, user_id, item_name, category, description, date_lost, last_seen_location)
+    return write_batcher.submit(_insert_lost, (row,), ('lost', lost_id, {
+        'lost_id': lost_id, 'category': category, 'item_name': item_name, 'description': description,
+        'date_lost': date_lost, 'last_seen_location': last_seen_location,
+    }))
+
+
+def _insert_lost(cur, row: tuple):
+    # the insert: INSERT INTO LostPosts (lost_id, user_id, item_name, category, description, date_lost, last_seen_location)
+    cur.execute("""
+        INSERT INTO LostPosts (lost_id, user_id, item_name, category, description, date_lost, last_seen_location,
+                               updated_at, inserted_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now'), strftime('%Y-%m-%d %H:%M:%S', 'now'))
+    """, row)
+
+# What I need: Deletion logic.
 def delete_lost_post(lost_id: str):
     conn = get_connection()
     cur = conn.cursor()
@@ -167,14 +1192,24 @@ def delete_lost_post(lost_id: str):
         conn.commit()
     finally:
         conn.close()
+    _notify('remove', 'lost', lost_id)
 
 # FOUND POST CRUD
 # FRAMEWORK STEP 4: Found Item Management this is lowkey just the lost post one
 # What I need: List all posts, using 'available' status as the default.
-def get_found_posts(status: str = 'available') -> list:
+def get_found_posts(status: str = 'available', after: str = None, limit: int = None) -> list:
+    query = "SELECT * FROM FoundPosts WHERE status = ?"
+    params = [status]
+    if after:
+        query += " AND (date_posted, found_id) < (?, ?)"
+        params += decode_cursor(after, 2)
+    query += " ORDER BY date_posted DESC, found_id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT * FROM FoundPosts WHERE status = ? ORDER BY date_posted DESC", (status,))
+    cur.execute(query, params)
     posts = [dict(row) for row in cur.fetchall()]
     conn.close()
     return posts
@@ -185,42 +1220,319 @@ def get_found_post(found_id: str):
     cur = conn.cursor()
     cur.execute("SELECT * FROM FoundPosts WHERE found_id = ?", (found_id,))
     post_row = cur.fetchone()
+    if post_row is None:  # archived (see ARCHIVE)
+        cur.execute("SELECT * FROM ArchivedFoundPosts WHERE found_id = ?", (found_id,))
+        post_row = cur.fetchone()
     conn.close()
     return dict(post_row) if post_row else None
 
 # What I need: Insertion logic (must include storage_location).
+# Goes through the group-commit writer, raises whatever the INSERT raised.
 def add_found_post(found_id: str, user_id: str, item_name: str, category: str, description: str, date_found: str,
                    found_location: str, storage_location: str):
+    submit_found_post(found_id, user_id, item_name, category, description, date_found, found_location,
+                      storage_location).result()
+
+
+def submit_found_post(found_id: str, user_id: str, item_name: str, category: str, description: str, date_found: str,
+                      found_location: str, storage_location: str) -> Future:
+    row = (found_id, user_id, item_name, category, description, date_found, found_location, storage_location)
+    return write_batcher.submit(_insert_found, (row,), ('found', found_id, {
+        'found_id': found_id, 'category': category, 'item_name': item_name, 'description': description,
+        'date_found': date_found, 'found_location': found_location,
+    }))
+
+
+def _insert_found(cur, row: tuple):
+    cur.execute("""
+        INSERT INTO FoundPosts (found_id, user_id, item_name, category, description, date_found, found_location,
+                                storage_location, updated_at, inserted_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now'), strftime('%Y-%m-%d %H:%M:%S', 'now'))
+    """, row)
+
+# What I need: Deletion logic.
+def delete_found_post(found_id: str):
     conn = get_connection()
     cur = conn.cursor()
     try:
-        cur.execute("""
-            INSERT INTO FoundPosts (found_id, user_id, item_name, category, description, date_found, found_location, storage_location)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (found_id, user_id, item_name, category, description, date_found, found_location, storage_location))
+        cur.execute("DELETE FROM FoundPosts WHERE found_id = ?", (found_id,))
         conn.commit()
     finally:
         conn.close()
+    _notify('remove', 'found', found_id)
+# BULK IMPORT
+# What I need: Campus Security turns in hundreds of items a day, one /add-found form (one connection and
+# one commit) per item doesn't scale. import_found_posts() takes rows from a CSV/JSONL reader
+# (database/ImportLAF.py), checks each one and inserts the good ones with executemany, IMPORT_CHUNK rows
+# per transaction. Bad rows are reported with their line number and skipped, existing posts are never
+# changed (a found_id that's already taken is an error, not an overwrite).
+IMPORT_CHUNK = 5000
+IMPORT_MAX_ERRORS = 1000  # errors kept in the report, the count keeps going
+IMPORT_REQUIRED = ('item_name', 'category', 'date_found', 'found_location')
+IMPORT_INSERT = """
+    INSERT INTO FoundPosts (found_id, user_id, item_name, category, description, date_found, found_location,
+                            storage_location, updated_at, inserted_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now'), strftime('%Y-%m-%d %H:%M:%S', 'now'))
+    ON CONFLICT (found_id) DO NOTHING
+"""
+DEFAULT_STORAGE = "Campus Security Office"
 
-# What I need: Deletion logic.
-def delete_found_post(found_id: str):
+
+def _clean_found_row(record: dict, user_id: str) -> tuple:
+    """A FoundPosts insert tuple from one imported record, raises ValueError saying what's wrong with it."""
+    if not isinstance(record, dict):
+        raise ValueError("row is not an object")
+    row = {k: (str(v).strip() if v is not None else '') for k, v in record.items() if k}
+    missing = [col for col in IMPORT_REQUIRED if not row.get(col)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    if row['category'] not in VALID_CATEGORIES:
+        raise ValueError(f"unknown category '{row['category']}'")
+    try:
+        date.fromisoformat(row['date_found'])
+    except ValueError:
+        raise ValueError(f"date_found '{row['date_found']}' is not YYYY-MM-DD")
+    return (
+        row.get('found_id') or None, user_id, row['item_name'], row['category'], row.get('description', ''),
+        row['date_found'], row['found_location'], row.get('storage_location') or DEFAULT_STORAGE,
+    )
+
+
+def _taken_found_ids(cur, ids: list) -> set:
+    taken = set()
+    for i in range(0, len(ids), 500):  # stay under sqlite's bound parameter limit
+        part = ids[i:i + 500]
+        cur.execute(f"SELECT found_id FROM FoundPosts WHERE found_id IN ({','.join('?' * len(part))})", part)
+        taken.update(r[0] for r in cur.fetchall())
+    return taken
+
+
+def _new_found_id(seen: set) -> str:
+    # same "found" + 8 hex digits ids main.py makes for the /add-found form
+    while True:
+        found_id = "found" + secrets.token_hex(4)
+        if found_id not in seen:
+            return found_id
+
+
+def _insert_found_chunk(conn, chunk: list, seen: set, errors: list) -> tuple[int, list]:
+    """
+    Give the chunk its ids and insert it in one transaction. seen holds every id used so far in this import,
+    rows asking for an id that's taken go to errors. Returns (rows inserted, the inserted rows).
+    """
+    cur = conn.cursor()
+    rows = []
+    for line, row in chunk:
+        found_id = row[0]
+        if found_id and found_id in seen:
+            errors.append((line, f"found_id '{found_id}' is already used"))
+            continue
+        generated = not found_id
+        found_id = found_id or _new_found_id(seen)
+        seen.add(found_id)
+        rows.append((line, generated, (found_id, *row[1:])))
+
+    # anything already in the table: an error if the file asked for that id, otherwise just pick another one
+    taken = _taken_found_ids(cur, [row[0] for _, _, row in rows])
+    while taken:
+        seen.update(taken)
+        kept, retry = [], []
+        for line, generated, row in rows:
+            if row[0] not in taken:
+                kept.append((line, generated, row))
+            elif generated:
+                found_id = _new_found_id(seen)
+                seen.add(found_id)
+                retry.append(found_id)
+                kept.append((line, generated, (found_id, *row[1:])))
+            else:
+                errors.append((line, f"found_id '{row[0]}' already exists"))
+        rows = kept
+        taken = _taken_found_ids(cur, retry)
+
+    # ON CONFLICT keeps a post someone added in the meantime untouched instead of failing the whole chunk.
+    # One execute per row (same transaction) so rowcount says which rows really went in, only those are
+    # counted and announced to the matcher.
+    inserted = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for line, generated, row in rows:
+            cur.execute(IMPORT_INSERT, row)
+            while not cur.rowcount and generated:
+                # someone took the generated id after the check above, pick another one
+                row = (_new_found_id(seen), *row[1:])
+                seen.add(row[0])
+                cur.execute(IMPORT_INSERT, row)
+            if cur.rowcount:
+                inserted.append(row)
+            else:
+                errors.append((line, f"found_id '{row[0]}' already exists"))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(inserted), inserted
+
+
+def import_found_posts(records, user_id: str, chunk_size: int = IMPORT_CHUNK) -> dict:
+    """
+    Bulk insert found posts for user_id from (line number, record dict) pairs. A record that failed to parse
+    can be passed as (line number, Exception). Returns {"inserted", "failed", "errors": [(line, message)]}.
+    """
+    started = time.perf_counter()
+    errors, failed, inserted, added = [], 0, 0, []
+
+    def note(line, message):
+        nonlocal failed
+        failed += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append((line, message))
+
+    conn = get_connection()
+    chunk, seen = [], set()
+
+    def flush():
+        nonlocal inserted, chunk
+        chunk_errors = []
+        count, rows = _insert_found_chunk(conn, chunk, seen, chunk_errors)
+        for line_no, message in chunk_errors:
+            note(line_no, message)
+        inserted += count
+        added.extend(rows)
+        chunk = []
+
+    try:
+        for line, record in records:
+            if isinstance(record, Exception):
+                note(line, str(record))
+                continue
+            try:
+                chunk.append((line, _clean_found_row(record, user_id)))
+            except ValueError as e:
+                note(line, str(e))
+                continue
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    finally:
+        conn.close()
+
+    if added:
+        # one notification for the whole import (the matcher scores them as a block)
+        cols = ('found_id', 'user_id', 'item_name', 'category', 'description', 'date_found', 'found_location')
+        _notify('add_many', 'found', None, [dict(zip(cols, row)) for row in added])
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# SEARCH
+# What I need: search item names, descriptions and locations without LIKE '%...%' scans.
+# LostPostsFTS / FoundPostsFTS (migration 4) are FTS5 indexes kept in sync by triggers, results
+# are ranked with bm25 (item_name weighted highest). Note: VACUUM can renumber rowids on these tables,
+# run rebuild_search_index() after a VACUUM.
+SEARCH_KINDS = {
+    # kind: (table, fts table, id column, location column, statuses)
+    'lost': ('LostPosts', 'LostPostsFTS', 'lost_id', 'last_seen_location', ('open', 'matched', 'closed')),
+    'found': ('FoundPosts', 'FoundPostsFTS', 'found_id', 'found_location', ('available', 'matched', 'returned')),
+}
+# bm25 column weights: item_name, description, location
+SEARCH_WEIGHTS = (10.0, 2.0, 4.0)
+# 'active' means still open / available, whichever fits the kind
+ACTIVE_STATUS = {'lost': 'open', 'found': 'available'}
+
+
+def fts_query(text: str):
+    """
+    Turn whatever the user typed into a safe FTS5 query: every word becomes a quoted prefix term
+    ("mac"* matches macbook) and all of them have to match. None if there are no words at all.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words[:16])
+
+
+def _search_kind(cur, kind: str, match: str, category, status, limit: int) -> list:
+    table, fts, id_col, loc_col, statuses = SEARCH_KINDS[kind]
+    if status == 'active':
+        status = ACTIVE_STATUS[kind]
+    if status and status not in statuses:
+        return []
+    query = f"""
+        SELECT p.*, bm25({fts}, ?, ?, ?) AS rank, ? AS kind, p.{id_col} AS post_id, p.{loc_col} AS location
+        FROM {fts} JOIN {table} p ON p.rowid = {fts}.rowid
+        WHERE {fts} MATCH ?
+    """
+    params = [*SEARCH_WEIGHTS, kind, match]
+    if category:
+        query += " AND p.category = ?"
+        params.append(category)
+    if status:
+        query += " AND p.status = ?"
+        params.append(status)
+    query += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    cur.execute(query, params)
+    return [dict(row) for row in cur.fetchall()]
+
+
+def search_posts(query: str, kind: str = 'all', category: str = None, status: str = None, limit: int = 20) -> list:
+    """
+    Full-text search over lost and/or found posts, best match first.
+    kind is 'lost', 'found' or 'all'; status can be any post status or 'active'.
+    Each result is the post dict plus kind, post_id, location and rank (lower bm25 = better).
+    """
+    match = fts_query(query)
+    if not match:
+        return []
+    kinds = ['lost', 'found'] if kind == 'all' else [kind]
+    if any(k not in SEARCH_KINDS for k in kinds):
+        raise ValueError(f"Unknown search kind: {kind}")
     conn = get_connection()
     cur = conn.cursor()
     try:
-        cur.execute("DELETE FROM FoundPosts WHERE found_id = ?", (found_id,))
+        results = []
+        for k in kinds:
+            results += _search_kind(cur, k, match, category, status, limit)
+    finally:
+        conn.close()
+    results.sort(key=lambda r: r['rank'])
+    return results[:limit]
+
+
+def rebuild_search_index():
+    """Rebuild both FTS indexes from scratch (after a VACUUM or if they ever drift)."""
+    conn = get_connection()
+    try:
+        conn.execute("INSERT INTO LostPostsFTS (LostPostsFTS) VALUES ('rebuild')")
+        conn.execute("INSERT INTO FoundPostsFTS (FoundPostsFTS) VALUES ('rebuild')")
         conn.commit()
     finally:
         conn.close()
+
 # What i still need to do is the matching function look at the social media and perhaps find something online thats like this
 
 # MATCHING FUNCTIONS
 # FRAMEWORK STEP 5: Matching and Transaction Logic (admin special priv perhaps)
 # What I need: Admin view - all matches that haven't been resolved (resolved = 0). i need to join the tables and then
 # check for the resolved status perhaps change the 0's to 1's
-def get_all_unresolved_matches() -> list:
+# Paged on (date_matched, match_id).
+def get_all_unresolved_matches(after: str = None, limit: int = None) -> list:
+    page = ""
+    params = []
+    if after:
+        page = "AND (m.date_matched, m.match_id) < (?, ?)"
+        params += decode_cursor(after, 2)
+    if limit:
+        params.append(limit)
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("""
+    cur.execute(f"""
         SELECT
             m.*,
             lp.item_name AS lost_item_name,  -- Pull the name of the lost item. We need a clear, friendly label for the report.
@@ -230,113 +1542,910 @@ def get_all_unresolved_matches() -> list:
         JOIN LostPosts lp ON m.lost_id = lp.lost_id   -- Match must link to a lost post.
         JOIN FoundPosts fp ON m.found_id = fp.found_id -- Match must link to a found post.
         LEFT JOIN Users u ON m.matched_by_user_id = u.user_id --LEFT JOIN.
-        WHERE m.resolved = 0 
-        ORDER BY m.date_matched DESC
-    """)
+        WHERE m.resolved = 0 {page}
+        ORDER BY m.date_matched DESC, m.match_id DESC
+        {"LIMIT ?" if limit else ""}
+    """, params)
     matches = [dict(row) for row in cur.fetchall()]
     conn.close()
     return matches
 
 # What I need: User view - matches relevant to their lost or found posts.
-def get_matches_by_user(user_id: str) -> list:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT
-            m.*,
+# Paged on (resolved, date_matched, match_id), resolved goes up while the date goes down so the
+# cursor check is spelled out instead of one row-value comparison. Archived matches are included.
+def get_matches_by_user(user_id: str, after: str = None, limit: int = None) -> list:
+    select = f"""
+            {_select_list('Matches', 'm', get_schema_catalog().columns['Matches'])},
             lp.item_name AS lost_item_name,
             fp.item_name AS found_item_name,
-            u_matched.name AS matched_by_user_name
-        FROM Matches m
-        JOIN LostPosts lp ON m.lost_id = lp.lost_id
-        JOIN FoundPosts fp ON m.found_id = fp.found_id
-        LEFT JOIN Users u_matched ON m.matched_by_user_id = u_matched.user_id
-        -- LOGIC: The user is involved if they posted the lost item OR the found item.
-        WHERE lp.user_id = ? OR fp.user_id = ?
-        ORDER BY m.resolved ASC, m.date_matched DESC -- Show UNRESOLVED (0) first, then date.
-    """, (user_id, user_id))
+            u_matched.name AS matched_by_user_name"""
+    query, params = _user_matches_query(select, user_id, after, limit,
+                                        "LEFT JOIN Users u_matched ON m.matched_by_user_id = u_matched.user_id")
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(query, params)
     matches = [dict(row) for row in cur.fetchall()]
     conn.close()
     return matches
 
-# What I need: The claim transaction.
-def claim_item(lost_id: str, found_id: str, claimant_user_id: str) -> tuple[bool, str]:
+
+def _user_matches_query(select: str, user_id: str, after: str = None, limit: int = None, joins: str = "") -> tuple:
     """
-    Create a match when an owner claims a found item.
-    Use a single connection for the entire transaction to avoid database locking due to nested connections.
+    (query, params) for a user's matches, the hot tables and the archive (see ARCHIVE) glued together with
+    UNION ALL. `select` is written against m / lp / fp and has to include resolved, date_matched and match_id.
+    """
+    page, page_params = "", []
+    if after:
+        resolved, date_matched, match_id = decode_cursor(after, 3)
+        page = "AND (m.resolved > ? OR (m.resolved = ? AND (m.date_matched, m.match_id) < (?, ?)))"
+        page_params = [resolved, resolved, date_matched, match_id]
+    halves, params = [], []
+    for matches, lost, found in (('Matches', 'LostPosts', 'FoundPosts'),
+                                 ('ArchivedMatches', 'ArchivedLostPosts', 'ArchivedFoundPosts')):
+        halves.append(f"""
+        SELECT {select}
+        FROM {matches} m
+        JOIN {lost} lp ON m.lost_id = lp.lost_id
+        JOIN {found} fp ON m.found_id = fp.found_id
+        {joins}
+        -- LOGIC: The user is involved if they posted the lost item OR the found item.
+        -- (written as IN subqueries so sqlite can use the user_id and lost_id/found_id indexes)
+        WHERE (m.lost_id IN (SELECT lost_id FROM {lost} WHERE user_id = ?)
+               OR m.found_id IN (SELECT found_id FROM {found} WHERE user_id = ?))
+        {page}""")
+        params += [user_id, user_id] + page_params
+    # Show UNRESOLVED (0) first, then date.
+    query = " UNION ALL ".join(halves) + "\n        ORDER BY resolved ASC, date_matched DESC, match_id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+# MATCH SUGGESTIONS
+# The scoring itself lives in database/matching.py, these are just the reads/writes it needs.
+# the columns the matcher scores on, for every post it should have in its index
+MATCH_CANDIDATES = {
+    'lost': """
+        SELECT lost_id, category, item_name, description, date_lost, last_seen_location
+        FROM LostPosts WHERE status = 'open'
+    """,
+    'found': """
+        SELECT found_id, category, item_name, description, date_found, found_location
+        FROM FoundPosts WHERE status = 'available'
+    """,
+}
+
+
+def get_match_candidates(lost_ids: list = None, found_ids: list = None) -> tuple[list, list]:
     """
+    Every open lost post and available found post, only the columns the matcher scores on.
+    With lost_ids / found_ids only those posts (if they're still open / available).
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    posts = []
+    for kind, ids in (('lost', lost_ids), ('found', found_ids)):
+        query, params = MATCH_CANDIDATES[kind], ()
+        if ids is not None:
+            query += f" AND {POST_TABLES[kind][1]} IN (SELECT value FROM json_each(?))"
+            params = (json.dumps(list(ids)),)
+        cur.execute(query, params)
+        posts.append([dict(row) for row in cur.fetchall()])
+    conn.close()
+    return posts[0], posts[1]
+
+
+def get_match_candidate_ids() -> tuple[set, set]:
+    """Ids of every open lost post and available found post (what the matcher's index should hold)."""
     conn = get_connection()
     cur = conn.cursor()
+    cur.execute("SELECT lost_id FROM LostPosts WHERE status = 'open'")
+    lost = {row[0] for row in cur.fetchall()}
+    cur.execute("SELECT found_id FROM FoundPosts WHERE status = 'available'")
+    found = {row[0] for row in cur.fetchall()}
+    conn.close()
+    return lost, found
+
+
+SUGGESTIONS_CHUNK = 10000  # rows per executemany when the whole table is replaced
+
+
+def replace_match_suggestions(rows: list):
+    """Swap the whole MatchSuggestions table for a fresh set of (lost_id, found_id, score) rows."""
+    # in primary key order the inserts append to the table's b-tree instead of landing all over it
+    rows = sorted(rows)
+    conn = get_connection()
     try:
-        cur.execute("SELECT * FROM LostPosts WHERE lost_id = ?", (lost_id,))
-        lost_post = cur.fetchone()
-        cur.execute("SELECT * FROM FoundPosts WHERE found_id = ?", (found_id,))
-        found_post = cur.fetchone()
-
-        # Check item status.
-        if not lost_post or lost_post['status'] != 'open':
-            return False, "Lost item not found or is already matched/closed."
-        if not found_post or found_post['status'] != 'available':
-            return False, "Found item not found or is already matched/returned."
-        if lost_post['user_id'] != claimant_user_id:
-            return False, "You can only claim items you have reported as lost."
+        conn.execute("BEGIN IMMEDIATE")
+        # the found_id index is rebuilt in one sorted pass at the end instead of row by row (about half the
+        # time for a full rescore), with the CREATE it was made with so the migrations stay its only definition
+        indexes = conn.execute("""
+            SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'MatchSuggestions' AND sql IS NOT NULL
+        """).fetchall()
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {name}")
+        conn.execute("DELETE FROM MatchSuggestions")
+        for start in range(0, len(rows), SUGGESTIONS_CHUNK):
+            conn.executemany("INSERT INTO MatchSuggestions (lost_id, found_id, score) VALUES (?, ?, ?)",
+                             rows[start:start + SUGGESTIONS_CHUNK])
+        for _, create in indexes:
+            conn.execute(create)
+        _bump_data_version(conn, 'suggestions')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# the matcher's index can still hold a post another process deleted, a pair whose post is gone is skipped
+# instead of failing the foreign key
+SUGGESTIONS_UPSERT = """
+    INSERT INTO MatchSuggestions (lost_id, found_id, score)
+    SELECT ?1, ?2, ?3
+    WHERE EXISTS (SELECT 1 FROM LostPosts WHERE lost_id = ?1) AND EXISTS (SELECT 1 FROM FoundPosts WHERE found_id = ?2)
+    ON CONFLICT (lost_id, found_id) DO UPDATE SET score = excluded.score, computed_at = CURRENT_TIMESTAMP
+"""
+
+
+def _gone_posts(cur, rows: list) -> list:
+    """(kind, post_id) for the posts in (lost_id, found_id, score) rows that aren't in the database any more."""
+    gone = []
+    for kind, col in (('lost', 0), ('found', 1)):
+        table, id_col = POST_TABLES[kind]
+        cur.execute(f"""
+            SELECT value FROM json_each(?) WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {id_col} = value)
+        """, (json.dumps(sorted({row[col] for row in rows})),))
+        gone += [(kind, row[0]) for row in cur.fetchall()]
+    return gone
+
+
+def add_match_suggestions(rows: list):
+    """Insert or update (lost_id, found_id, score) rows without touching the rest of the table."""
+    if not rows:
+        return
+    conn = get_connection()
+    try:
+        gone = _gone_posts(conn.cursor(), rows)
+        conn.executemany(SUGGESTIONS_UPSERT, rows)
+        _bump_data_version(conn, 'suggestions')
+        conn.commit()
+    finally:
+        conn.close()
+    for kind, post_id in gone:
+        _notify('remove', kind, post_id)
+
+
+def get_suggestions_for_lost(lost_id: str, limit: int = 5) -> list:
+    """Available found posts that look like this lost item, best first."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT fp.*, s.score
+        FROM MatchSuggestions s
+        JOIN FoundPosts fp ON fp.found_id = s.found_id
+        WHERE s.lost_id = ? AND fp.status = 'available'
+        ORDER BY s.score DESC
+        LIMIT ?
+    """, (lost_id, limit))
+    posts = [dict(row) for row in cur.fetchall()]
+    conn.close()
+    return posts
+
+
+def get_suggestions_for_found(found_id: str, limit: int = 5) -> list:
+    """Open lost posts this found item might belong to, best first."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT lp.*, s.score
+        FROM MatchSuggestions s
+        JOIN LostPosts lp ON lp.lost_id = s.lost_id
+        WHERE s.found_id = ? AND lp.status = 'open'
+        ORDER BY s.score DESC
+        LIMIT ?
+    """, (found_id, limit))
+    posts = [dict(row) for row in cur.fetchall()]
+    conn.close()
+    return posts
+
+# CONTENDED WRITES
+RESOLVE_NOTE = "Match successfully resolved by admin. Item returned."
+RESOLVE_BATCH_MAX = 1000
+
+# What I need: two people claiming the same found item at the same moment must not both get it. The old
+# claim read both posts, checked them in Python and then wrote, so two requests (or two server processes)
+# could both pass the check before either wrote. Now:
+#   - BEGIN IMMEDIATE takes the write lock before anything is read, so the transaction can't hit
+#     SQLITE_BUSY halfway through when a deferred read lock tries to become a write lock.
+#   - every UPDATE carries its own guard (WHERE status = 'available', WHERE resolved = 0) and the rowcount
+#     says whether we won. The guard is what makes it correct, the lock just keeps it from failing.
+#   - when another writer holds the lock, sqlite waits BUSY_WAIT_MS, then we back off a random bit
+#     (doubling each time) and try again, BUSY_RETRIES times at most, so a pile-up spreads out instead of
+#     every waiter retrying in lockstep, and a request never hangs for the full 5s connection timeout.
+# benchmarks/bench_claims.py hammers this from several processes and checks nothing is double-matched.
+_contention_lock = threading.Lock()
+_contention = {'busy_retries': 0, 'busy_failures': 0}
 
-        cur.execute("""
-            INSERT INTO Matches (lost_id, found_id, matched_by_user_id, notes)
-            VALUES (?, ?, ?, ?)
-        """, (lost_id, found_id, claimant_user_id, "Item claimed by owner."))
 
-        # Update both post statuses to 'matched'.
-        cur.execute("UPDATE LostPosts SET status = 'matched' WHERE lost_id = ?", (lost_id,))
-        cur.execute("UPDATE FoundPosts SET status = 'matched' WHERE found_id = ?", (found_id,))
+class _Rejected(Exception):
+    """Raised inside a write transaction to roll it back with a message for the user."""
 
-        conn.commit() # FINAL STEP: Commit the whole transaction.
-        return True, "Match created successfully. Awaiting admin resolution."
-    except Exception as e:
-        #roll back function if it fails
+
+def _count_contention(key: str):
+    with _contention_lock:
+        _contention[key] += 1
+
+
+def contention_stats() -> dict:
+    """How often claims/resolves found the write lock taken (retried) and how often they gave up."""
+    with _contention_lock:
+        return dict(_contention)
+
+
+def _is_busy(error: sql.OperationalError) -> bool:
+    return getattr(error, 'sqlite_errorname', '').startswith(('SQLITE_BUSY', 'SQLITE_LOCKED')) \
+        or 'database is locked' in str(error)
+
+
+def _begin_immediate(conn):
+    """BEGIN IMMEDIATE with bounded, jittered retries while another connection holds the write lock."""
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_WAIT_MS}")
+    try:
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sql.OperationalError as e:
+                if not _is_busy(e):
+                    raise
+                if attempt == BUSY_RETRIES:
+                    _count_contention('busy_failures')
+                    raise
+                _count_contention('busy_retries')
+                time.sleep(random.uniform(0, BUSY_BACKOFF * 2 ** attempt))
+    finally:
+        conn.execute("PRAGMA busy_timeout = 5000")  # back to the timeout=5 every pooled connection has
+
+
+def _write_transaction(work, error_prefix: str) -> tuple:
+    """Run work(cursor) -> (result, notices) in one IMMEDIATE transaction. Returns (True, result) or (False, msg)."""
+    conn = get_connection()
+    try:
         try:
+            _begin_immediate(conn)
+        except sql.OperationalError as e:
+            return False, f"{error_prefix}: {e}"
+        try:
+            result, notices = work(conn.cursor())
+            conn.commit()
+        except _Rejected as e:
             conn.rollback()
-        except Exception:
-            pass
-        return False, f"Error creating match: {e}"
+            return False, str(e)
+        except Exception as e:
+            #roll back function if it fails
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return False, f"{error_prefix}: {e}"
+        for kind, post_id in notices:
+            _notify('remove', kind, post_id)
+        return True, result
     finally:
         conn.close()
 
+
+def _claim_rejection(cur, lost_id: str, found_id: str, claimant_user_id: str) -> str:
+    # the guarded UPDATE only says "no", this says why (same checks and order as the old claim).
+    # Only called before anything was written, so it reads the real statuses.
+    cur.execute("SELECT status, user_id FROM LostPosts WHERE lost_id = ?", (lost_id,))
+    lost_post = cur.fetchone()
+    cur.execute("SELECT status FROM FoundPosts WHERE found_id = ?", (found_id,))
+    found_post = cur.fetchone()
+    if not lost_post or lost_post['status'] != 'open':
+        return "Lost item not found or is already matched/closed."
+    if not found_post or found_post['status'] != 'available':
+        return "Found item not found or is already matched/returned."
+    if lost_post['user_id'] != claimant_user_id:
+        return "You can only claim items you have reported as lost."
+    return "Lost item not found or is already matched/closed."
+
+
+# What I need: The claim transaction.
+def claim_item(lost_id: str, found_id: str, claimant_user_id: str) -> tuple[bool, str]:
+    """
+    Create a match when an owner claims a found item.
+    Both posts move to 'matched' only if they are still open/available, checked by the UPDATEs themselves.
+    """
+    def work(cur):
+        cur.execute(f"""
+            UPDATE LostPosts SET status = 'matched', {BUMP_VERSION}
+            WHERE lost_id = ? AND status = 'open' AND user_id = ?
+        """, (lost_id, claimant_user_id))
+        if cur.rowcount != 1:
+            raise _Rejected(_claim_rejection(cur, lost_id, found_id, claimant_user_id))
+        cur.execute(f"UPDATE FoundPosts SET status = 'matched', {BUMP_VERSION} "
+                    "WHERE found_id = ? AND status = 'available'", (found_id,))
+        if cur.rowcount != 1:
+            raise _Rejected("Found item not found or is already matched/returned.")
+
+        cur.execute("""
+            INSERT INTO Matches (lost_id, found_id, matched_by_user_id, notes)
+            VALUES (?, ?, ?, ?)
+        """, (lost_id, found_id, claimant_user_id, "Item claimed by owner."))
+        return "Match created successfully. Awaiting admin resolution.", (('lost', lost_id), ('found', found_id))
+
+    return _write_transaction(work, "Error creating match")
+
 # What I need: The final resolution transaction.
 def admin_resolve_match(match_id: int) -> tuple[bool, str]:
     """
-    Resolve a match and update related post statuses. Use single connection for transaction.
+    Resolve a match and update related post statuses. Only the first resolve of a match wins.
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        # Check the match exists and is unresolved.
-        cur.execute("SELECT lost_id, found_id, resolved FROM Matches WHERE match_id = ?", (match_id,))
+    def work(cur):
+        cur.execute("""
+            UPDATE Matches SET resolved = 1, notes = ?, date_resolved = strftime('%Y-%m-%d %H:%M:%S', 'now')
+            WHERE match_id = ? AND resolved = 0
+            RETURNING lost_id, found_id
+        """, (RESOLVE_NOTE, match_id))
         match = cur.fetchone()
         if not match:
-            return False, "Match not found."
-        if match['resolved'] == 1:
-            return False, "Match is already resolved."
+            cur.execute("SELECT 1 FROM Matches WHERE match_id = ?", (match_id,))
+            raise _Rejected("Match is already resolved." if cur.fetchone() else "Match not found.")
         lost_id, found_id = match['lost_id'], match['found_id']
 
-        # Update all 3 tables: Matches, LostPosts, FoundPosts once we know its valid
-        cur.execute("UPDATE Matches SET resolved = 1, notes = ? WHERE match_id = ?",
-                    ("Match successfully resolved by admin. Item returned.", match_id))
-        cur.execute("UPDATE LostPosts SET status = 'closed' WHERE lost_id = ?", (lost_id,))
-        cur.execute("UPDATE FoundPosts SET status = 'returned' WHERE found_id = ?", (found_id,))
-        conn.commit()
-        return True, f"Match {match_id} resolved successfully."
-    except Exception as e:
-        # rollback if needed
-        try:
-            conn.rollback()
-        except Exception:
-            pass
-        return False, f"Error resolving match: {e}"
+        cur.execute(f"UPDATE LostPosts SET status = 'closed', {BUMP_VERSION} WHERE lost_id = ?", (lost_id,))
+        cur.execute(f"UPDATE FoundPosts SET status = 'returned', {BUMP_VERSION} WHERE found_id = ?", (found_id,))
+        return f"Match {match_id} resolved successfully.", (('lost', lost_id), ('found', found_id))
+
+    return _write_transaction(work, "Error resolving match")
+
+# What I need: clearing the pending queue at the end of a shift in one go. Same guarded UPDATE as above,
+# but for the whole set at once (the ids go in as one JSON array and json_each turns them into rows),
+# so 500 matches are 4 statements and one commit instead of 500 transactions.
+def admin_resolve_matches(match_ids: list) -> list[dict]:
+    """
+    Resolve many matches in one transaction. Returns {'match_id', 'resolved', 'message'} for each id, in order.
+    Ids that don't exist or are already resolved are reported and skipped, the rest still resolve.
+    """
+    ids = list(dict.fromkeys(int(match_id) for match_id in match_ids))  # ints, duplicates dropped
+    if len(ids) > RESOLVE_BATCH_MAX:
+        raise ValueError(f"Too many matches, at most {RESOLVE_BATCH_MAX} per batch.")
+    if not ids:
+        return []
+    ids_json = json.dumps(ids)
+
+    def work(cur):
+        cur.execute("""
+            UPDATE Matches SET resolved = 1, notes = ?, date_resolved = strftime('%Y-%m-%d %H:%M:%S', 'now')
+            WHERE resolved = 0 AND match_id IN (SELECT value FROM json_each(?))
+            RETURNING match_id, lost_id, found_id
+        """, (RESOLVE_NOTE, ids_json))
+        done = cur.fetchall()
+        lost_ids = [row['lost_id'] for row in done]
+        found_ids = [row['found_id'] for row in done]
+        cur.execute(f"UPDATE LostPosts SET status = 'closed', {BUMP_VERSION} "
+                    "WHERE lost_id IN (SELECT value FROM json_each(?))", (json.dumps(lost_ids),))
+        cur.execute(f"UPDATE FoundPosts SET status = 'returned', {BUMP_VERSION} "
+                    "WHERE found_id IN (SELECT value FROM json_each(?))", (json.dumps(found_ids),))
+        cur.execute("SELECT match_id FROM Matches WHERE match_id IN (SELECT value FROM json_each(?))", (ids_json,))
+        existing = {row['match_id'] for row in cur.fetchall()}
+
+        resolved = {row['match_id'] for row in done}
+        results = []
+        for match_id in ids:
+            if match_id in resolved:
+                message = f"Match {match_id} resolved successfully."
+            elif match_id in existing:
+                message = "Match is already resolved."
+            else:
+                message = "Match not found."
+            results.append({'match_id': match_id, 'resolved': match_id in resolved, 'message': message})
+        notices = [('lost', lost_id) for lost_id in lost_ids] + [('found', found_id) for found_id in found_ids]
+        return results, notices
+
+    ok, results = _write_transaction(work, "Error resolving matches")
+    if not ok:
+        return [{'match_id': match_id, 'resolved': False, 'message': results} for match_id in ids]
+    return results
+
+
+# API READS
+# What I need: the JSON API (api.py) asks for specific columns (?fields=) and streams its rows, so these
+# select only those columns and hand rows back in fetchmany() batches of plain tuples (no Row -> dict).
+API_BATCH = 200
+API_HIDDEN = {'Users': ('password', 'password_hash')}
+# fields the API can ask for that aren't columns of the table itself
+API_EXTRA = {'Matches': {'lost_item_name': 'lp.item_name', 'found_item_name': 'fp.item_name'}}
+
+
+def api_columns(table: str, fields: str = None) -> list:
+    """
+    Columns for a ?fields=a,b,c list, checked against the schema catalog (all visible columns if empty).
+    Raises ValueError naming any unknown field.
+    """
+    hidden = API_HIDDEN.get(table, ())
+    visible = [c for c in get_schema_catalog().columns.get(table, ()) if c not in hidden]
+    visible += list(API_EXTRA.get(table, {}))
+    if not fields:
+        return visible
+    wanted = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in wanted if f not in visible]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(visible)}")
+    return wanted
+
+
+def _select_list(table: str, alias: str, columns: list) -> str:
+    extra = API_EXTRA.get(table, {})
+    return ", ".join(extra.get(c, f"{alias}.{c}") for c in columns)
+
+
+def iter_query(query: str, params, batch: int = API_BATCH, connect=get_connection):
+    """
+    Run a query and yield its rows as lists of tuples, batch rows at a time. The connection (from connect,
+    a pooled one by default) is closed when it's done.
+    """
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        cur.row_factory = None  # plain tuples, the caller knows the column order
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield rows
     finally:
         conn.close()
 
 
+def stream_posts(kind: str, columns: list, status: str = None, after: str = None, limit: int = None):
+    """Batches of lost/found post tuples in `columns` order, newest first (same cursor as the dashboard lists)."""
+    table, id_col = POST_TABLES[kind]
+    where, params = [], []
+    if status:
+        where.append("p.status = ?")
+        params.append(status)
+    if after:
+        where.append(f"(p.date_posted, p.{id_col}) < (?, ?)")
+        params += decode_cursor(after, 2)
+    query = f"SELECT {_select_list(table, 'p', columns)} FROM {table} p"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += f" ORDER BY p.date_posted DESC, p.{id_col} DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return iter_query(query, params)
+
+
+def stream_matches(columns: list, user_id: str = None, after: str = None, limit: int = None):
+    """
+    Batches of match tuples in `columns` order. With a user_id it's that user's matches (same order and
+    cursor as get_matches_by_user), without one every unresolved match (same as get_all_unresolved_matches).
+    """
+    if user_id:
+        return iter_query(*_user_matches_query(_select_list('Matches', 'm', columns), user_id, after, limit))
+    params = []
+    where = "m.resolved = 0"
+    if after:
+        where += " AND (m.date_matched, m.match_id) < (?, ?)"
+        params += decode_cursor(after, 2)
+    order = "m.date_matched DESC, m.match_id DESC"
+    query = f"""
+        SELECT {_select_list('Matches', 'm', columns)}
+        FROM Matches m
+        JOIN LostPosts lp ON m.lost_id = lp.lost_id
+        JOIN FoundPosts fp ON m.found_id = fp.found_id
+        WHERE {where}
+        ORDER BY {order}
+    """
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return iter_query(query, params)
+
+
+# EXPORTS
+# What I need: admins dump whole tables for reporting. stream_export() is iter_query with filters, so an
+# export of millions of rows only ever has one fetchmany() batch in memory (database/ExportLAF.py and
+# /admin/export turn the batches into CSV / JSONL). A download goes as fast as the client reads it, so
+# exports read on their own get_read_connection() instead of holding a pooled connection all that time.
+# kind -> (table, alias, status column, category column, date column, order)
+EXPORT_KINDS = {
+    'lost': ('LostPosts', 'p', 'p.status', 'p.category', 'p.date_posted', 'p.lost_id'),
+    'found': ('FoundPosts', 'p', 'p.status', 'p.category', 'p.date_posted', 'p.found_id'),
+    # matches have no category of their own, the lost post's is used; status is resolved / unresolved
+    'matches': ('Matches', 'm', 'm.resolved', 'lp.category', 'm.date_matched', 'm.match_id'),
+}
+MATCH_STATUSES = {'unresolved': 0, 'resolved': 1}
+
+
+def export_statuses(kind: str) -> tuple:
+    return tuple(MATCH_STATUSES) if kind == 'matches' else SEARCH_KINDS[kind][4]
+
+
+def stream_export(kind: str, columns: list, status: str = None, category: str = None, date_from: str = None,
+                  date_to: str = None, batch: int = API_BATCH):
+    """
+    Batches of row tuples (in `columns` order) for an export. date_from / date_to are YYYY-MM-DD and both
+    inclusive. Raises ValueError for a bad filter before anything is read.
+    """
+    table, alias, status_col, category_col, date_col, order = EXPORT_KINDS[kind]
+    where, params = [], []
+    if status:
+        if status not in export_statuses(kind):
+            raise ValueError(f"status must be one of: {', '.join(export_statuses(kind))}")
+        where.append(f"{status_col} = ?")
+        params.append(MATCH_STATUSES[status] if kind == 'matches' else status)
+    if category:
+        if category not in VALID_CATEGORIES:
+            raise ValueError(f"category must be one of: {', '.join(VALID_CATEGORIES)}")
+        where.append(f"{category_col} = ?")
+        params.append(category)
+    for value, op in ((date_from, ">="), (date_to, "<")):
+        if value:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"'{value}' is not a YYYY-MM-DD date")
+            # compare against the raw timestamp column (not date(col)) so the date index can be used
+            where.append(f"{date_col} {op} " + ("?" if op == ">=" else "date(?, '+1 day')"))
+            params.append(value)
+
+    # the hot table first, then its archive (only holds closed / returned / resolved rows)
+    sources = [(table, 'LostPosts', 'FoundPosts')]
+    if status is None or status == ('resolved' if kind == 'matches' else ARCHIVE_STATUS[kind]):
+        sources.append((ARCHIVE_TABLES[kind], 'ArchivedLostPosts', 'ArchivedFoundPosts'))
+    queries = []
+    for source, lost, found in sources:
+        query = f"SELECT {_select_list(table, alias, columns)} FROM {source} {alias}"
+        if kind == 'matches':
+            query += f" JOIN {lost} lp ON m.lost_id = lp.lost_id JOIN {found} fp ON m.found_id = fp.found_id"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += f" ORDER BY {order}"
+        queries.append(query)
+    return _chain_batches(iter_query(query, params, batch, get_read_connection) for query in queries)
+
+
+def _chain_batches(generators):
+    for batches in generators:
+        yield from batches
+
+
+# ARCHIVE
+# What I need: LostPosts / FoundPosts / Matches kept every closed/returned/resolved row forever, so their
+# indexes and sorts grew every term while nearly every request is about open items. archive_resolved()
+# moves resolved matches together with their closed lost post and returned found post (plus closed/returned
+# posts that never had a match) into the Archived* tables (migration 8) once they were resolved more than
+# ARCHIVE_AFTER_DAYS ago. It goes ARCHIVE_BATCH matches per IMMEDIATE transaction with a short pause in
+# between, so the write lock is only ever held for a few ms and claims/new posts slot in between batches.
+# A match only moves with both of its posts (and a post only if that's its only match), so Matches never
+# points into the archive and the ON DELETE CASCADEs can't take anything with them.
+# Reads that have to see history fall back to / add the archive: post detail pages (get_lost_post,
+# get_found_post, get_post_version), a user's matches and the exports. Dashboards, search and the admin
+# queue only ever want open items and stay on the hot tables.
+ARCHIVE_TABLES = {'lost': 'ArchivedLostPosts', 'found': 'ArchivedFoundPosts', 'matches': 'ArchivedMatches'}
+# status a post has to have to be archived
+ARCHIVE_STATUS = {'lost': 'closed', 'found': 'returned'}
+
+
+def _archive_candidates(cur, cutoff: str, batch: int) -> tuple[list, dict]:
+    """(match ids, {'lost': ids, 'found': ids}) for one archive batch."""
+    cur.execute("""
+        SELECT m.match_id, m.lost_id, m.found_id
+        FROM Matches m
+        JOIN LostPosts lp ON lp.lost_id = m.lost_id
+        JOIN FoundPosts fp ON fp.found_id = m.found_id
+        WHERE m.resolved = 1
+          AND lp.status = 'closed' AND lp.updated_at < ?
+          AND fp.status = 'returned' AND fp.updated_at < ?
+          AND NOT EXISTS (SELECT 1 FROM Matches o WHERE o.lost_id = m.lost_id AND o.match_id != m.match_id)
+          AND NOT EXISTS (SELECT 1 FROM Matches o WHERE o.found_id = m.found_id AND o.match_id != m.match_id)
+        LIMIT ?
+    """, (cutoff, cutoff, batch))
+    rows = cur.fetchall()
+    match_ids = [row['match_id'] for row in rows]
+    posts = {'lost': [row['lost_id'] for row in rows], 'found': [row['found_id'] for row in rows]}
+    # closed/returned posts that were never matched (closed by hand, old data)
+    for kind, (table, id_col) in POST_TABLES.items():
+        cur.execute(f"""
+            SELECT {id_col} FROM {table} p
+            WHERE p.status = ? AND p.updated_at < ?
+              AND NOT EXISTS (SELECT 1 FROM Matches m WHERE m.{id_col} = p.{id_col})
+            LIMIT ?
+        """, (ARCHIVE_STATUS[kind], cutoff, batch))
+        posts[kind] += [row[0] for row in cur.fetchall()]
+    return match_ids, posts
+
+
+def archive_cutoff(older_than_days: float = ARCHIVE_AFTER_DAYS) -> str:
+    # same format and clock (UTC) as the updated_at stamps BUMP_VERSION writes
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - older_than_days * 86400))
+
+
+def archive_batch(cutoff: str, batch: int = ARCHIVE_BATCH) -> dict:
+    """
+    Move one batch of resolved matches and closed/returned posts last changed before cutoff
+    ('YYYY-MM-DD HH:MM:SS', UTC) into the archive. Returns how many rows of each moved.
+    """
+    columns = get_schema_catalog().columns
+
+    def work(cur):
+        match_ids, posts = _archive_candidates(cur, cutoff, batch)
+        matches_json = json.dumps(match_ids)
+        # archived posts first (ArchivedMatches points at them), then the matches, then delete in reverse
+        for kind, (table, id_col) in POST_TABLES.items():
+            cols = ", ".join(columns[table])
+            cur.execute(f"INSERT INTO {ARCHIVE_TABLES[kind]} ({cols}) SELECT {cols} FROM {table} "
+                        f"WHERE {id_col} IN (SELECT value FROM json_each(?))", (json.dumps(posts[kind]),))
+        cols = ", ".join(columns['Matches'])
+        cur.execute(f"INSERT INTO ArchivedMatches ({cols}) SELECT {cols} FROM Matches "
+                    "WHERE match_id IN (SELECT value FROM json_each(?))", (matches_json,))
+        cur.execute("DELETE FROM Matches WHERE match_id IN (SELECT value FROM json_each(?))", (matches_json,))
+        for kind, (table, id_col) in POST_TABLES.items():
+            cur.execute(f"DELETE FROM {table} WHERE {id_col} IN (SELECT value FROM json_each(?))",
+                        (json.dumps(posts[kind]),))
+        moved = {'matches': len(match_ids), 'lost': len(posts['lost']), 'found': len(posts['found'])}
+        notices = [(kind, post_id) for kind in posts for post_id in posts[kind]]
+        return moved, notices
+
+    ok, result = _write_transaction(work, "Error archiving")
+    if not ok:
+        raise sql.OperationalError(result)
+    return result
+
+
+def archive_resolved(older_than_days: float = ARCHIVE_AFTER_DAYS, batch: int = ARCHIVE_BATCH,
+                     pause: float = ARCHIVE_PAUSE, max_batches: int = None) -> dict:
+    """Archive everything resolved more than older_than_days ago, batch by batch. Returns the totals."""
+    cutoff = archive_cutoff(older_than_days)
+    totals = {'matches': 0, 'lost': 0, 'found': 0, 'batches': 0}
+    while max_batches is None or totals['batches'] < max_batches:
+        moved = archive_batch(cutoff, batch)
+        if not any(moved.values()):
+            break
+        totals['batches'] += 1
+        for key, count in moved.items():
+            totals[key] += count
+        time.sleep(pause)
+    return totals
+
+
+def archive_counts() -> dict:
+    """Rows in each archive table."""
+    conn = get_connection()
+    cur = conn.cursor()
+    counts = {}
+    for kind, table in ARCHIVE_TABLES.items():
+        cur.execute(f"SELECT count(*) FROM {table}")
+        counts[kind] = cur.fetchone()[0]
+    conn.close()
+    return counts
+
+
+# REPORT ROLLUPS
+# What I need: /admin/reports (weekly volume per category, hotspot locations, time to resolution) over a
+# whole year without scanning the posts and parsing their date strings on every page load.
+# The Daily* tables (migration 10) hold per-day aggregates. rollup_step() adds only the rows whose
+# stamp (inserted_at for posts, date_resolved for matches) is past that rollup's watermark in
+# RollupWatermarks, in chunks of ROLLUP_CHUNK rows, and moves the watermark in the same transaction, so
+# every row is counted exactly once even if the job dies halfway. Live and archive tables are both read
+# (a row may have been archived before it was rolled up). Rows are only taken up to ROLLUP_LAG seconds
+# ago, so a row stamped just now whose transaction hasn't committed yet can't slip under the watermark.
+# Posts are scanned by when they were written (an import can bring in posts with an old date_posted)
+# but counted by the day they were reported, a post deleted after it was counted stays counted.
+ROLLUPS = {
+    # name: the source rows (stamp, day, category, location[, date_matched, date_posted]) inside a window,
+    # bound as (low, high) once for the live table and once for the archive. A resolution counts even when
+    # its lost post can't be found (or is in the other table), its category is '' then.
+    'lost': """
+        SELECT inserted_at AS stamp, date_posted AS day, category, last_seen_location AS location FROM LostPosts
+        WHERE inserted_at > ? AND inserted_at <= ?
+        UNION ALL
+        SELECT inserted_at, date_posted, category, last_seen_location FROM ArchivedLostPosts
+        WHERE inserted_at > ? AND inserted_at <= ?
+    """,
+    'found': """
+        SELECT inserted_at AS stamp, date_posted AS day, category, found_location AS location FROM FoundPosts
+        WHERE inserted_at > ? AND inserted_at <= ?
+        UNION ALL
+        SELECT inserted_at, date_posted, category, found_location FROM ArchivedFoundPosts
+        WHERE inserted_at > ? AND inserted_at <= ?
+    """,
+    'resolutions': """
+        SELECT m.date_resolved AS stamp, m.date_resolved AS day, lp.category, NULL AS location, m.date_matched,
+               lp.date_posted
+        FROM Matches m LEFT JOIN LostPosts lp ON lp.lost_id = m.lost_id
+        WHERE m.date_resolved > ? AND m.date_resolved <= ?
+        UNION ALL
+        SELECT m.date_resolved, m.date_resolved, coalesce(alp.category, lp.category), NULL, m.date_matched,
+               coalesce(alp.date_posted, lp.date_posted)
+        FROM ArchivedMatches m
+        LEFT JOIN ArchivedLostPosts alp ON alp.lost_id = m.lost_id
+        LEFT JOIN LostPosts lp ON lp.lost_id = m.lost_id
+        WHERE m.date_resolved > ? AND m.date_resolved <= ?
+    """,
+}
+# the upserts that add one window of source rows to the Daily* tables ({rows} is the source query)
+ROLLUP_UPSERTS = {
+    'posts': """
+        INSERT INTO DailyPosts (day, kind, category, posts)
+        SELECT date(day), ?, coalesce(category, ''), count(*) FROM ({rows}) WHERE true GROUP BY 1, 3
+        ON CONFLICT (day, kind, category) DO UPDATE SET posts = posts + excluded.posts
+    """,
+    'locations': """
+        INSERT INTO DailyLocations (day, kind, location, posts)
+        SELECT date(day), ?, lower(trim(location)), count(*) FROM ({rows})
+        WHERE trim(coalesce(location, '')) != '' GROUP BY 1, 3
+        ON CONFLICT (day, kind, location) DO UPDATE SET posts = posts + excluded.posts
+    """,
+    'resolutions': """
+        INSERT INTO DailyResolutions (day, category, resolved, hours_from_posted, hours_from_claim)
+        SELECT date(day), coalesce(category, ''), count(*),
+               total(max(0, julianday(stamp) - julianday(date_posted)) * 24),
+               total(max(0, julianday(stamp) - julianday(date_matched)) * 24)
+        FROM ({rows}) WHERE true GROUP BY 1, 2
+        ON CONFLICT (day, category) DO UPDATE SET
+            resolved = resolved + excluded.resolved,
+            hours_from_posted = hours_from_posted + excluded.hours_from_posted,
+            hours_from_claim = hours_from_claim + excluded.hours_from_claim
+    """,
+}
+
+
+def rollup_high_mark(lag: float = ROLLUP_LAG) -> str:
+    """Newest timestamp a rollup run may count up to."""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - lag))
+
+
+def rollup_step(name: str, high: str, chunk: int = ROLLUP_CHUNK) -> tuple[int, bool]:
+    """
+    Add the next chunk of rows past the `name` watermark (up to high) to the rollups.
+    Returns (rows added, True when the watermark reached high).
+    """
+    source = ROLLUPS[name]
+
+    def work(cur):
+        cur.execute("SELECT watermark FROM RollupWatermarks WHERE name = ?", (name,))
+        row = cur.fetchone()
+        low = row[0] if row else ''
+        # end the window at the chunk-th row's timestamp (rows sharing it all go in this window)
+        cur.execute(f"SELECT stamp FROM ({source}) ORDER BY stamp LIMIT 1 OFFSET ?",
+                    (low, high, low, high, chunk - 1))
+        row = cur.fetchone()
+        end = row[0] if row else high
+        window = (low, end, low, end)
+        if name == 'resolutions':
+            cur.execute(ROLLUP_UPSERTS['resolutions'].format(rows=source), window)
+        else:
+            cur.execute(ROLLUP_UPSERTS['posts'].format(rows=source), (name,) + window)
+            cur.execute(ROLLUP_UPSERTS['locations'].format(rows=source), (name,) + window)
+        cur.execute(f"SELECT count(*) FROM ({source})", window)
+        rows = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO RollupWatermarks (name, watermark) VALUES (?, ?)
+            ON CONFLICT (name) DO UPDATE SET watermark = excluded.watermark,
+                updated_at = strftime('%Y-%m-%d %H:%M:%S', 'now')
+        """, (name, end))
+        return (rows, end >= high), ()
+
+    ok, result = _write_transaction(work, f"Error rolling up {name}")
+    if not ok:
+        raise sql.OperationalError(result)
+    return result
+
+
+def rollup_reports(chunk: int = ROLLUP_CHUNK, lag: float = ROLLUP_LAG) -> dict:
+    """Bring every rollup up to date. Returns the rows added per rollup."""
+    high = rollup_high_mark(lag)
+    totals = {}
+    for name in ROLLUPS:
+        totals[name] = 0
+        done = False
+        while not done:
+            rows, done = rollup_step(name, high, chunk)
+            totals[name] += rows
+    return totals
+
+
+REPORT_HOTSPOTS = 10  # locations listed per kind
+# a report only changes when a rollup run moves the watermarks, so it's kept until then
+# (date_from, date_to, watermarks) -> report
+_report_cache = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+
+def _report_date(value: str) -> str:
+    try:
+        if re.fullmatch(r"\d{4}-\d{2}-\d{2}", value or ""):
+            return date.fromisoformat(value).isoformat()  # also catches 2024-02-31
+    except ValueError:
+        pass
+    raise ValueError(f"Bad date {value!r}, expected YYYY-MM-DD")
+
+
+def get_report(date_from: str, date_to: str) -> dict:
+    """
+    Admin report for the days date_from..date_to (YYYY-MM-DD, inclusive), from the rollup tables only:
+    {'weeks': [{'week', 'lost', 'found', 'resolved', 'days_from_posted',
+                'categories': {category: {'lost', 'found'}}}] oldest first,
+     'hotspots': {'lost': [(location, n)], 'found': [...]},
+     'resolutions': [{'category', 'resolved', 'days_from_posted', 'hours_from_claim'}],
+     'totals': {'lost', 'found', 'resolved'}, 'rolled_up_to': {rollup: watermark}}
+    Weeks start on Monday. Raises ValueError on a bad date. The dict is shared with later callers, don't change it.
+    """
+    window = (_report_date(date_from), _report_date(date_to))
+    week = "date(day, 'weekday 0', '-6 days')"  # the Monday on or before day
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT name, watermark FROM RollupWatermarks")
+    rolled_up_to = dict(cur.fetchall())
+    key = window + tuple(rolled_up_to.get(name) for name in ROLLUPS)
+    with _report_cache_lock:
+        report = _report_cache.get(key)
+        if report is not None:
+            _report_cache.move_to_end(key)
+    if report is not None:
+        conn.close()
+        return report
+
+    weeks = {}
+
+    def week_row(week_start):
+        return weeks.setdefault(week_start, {'week': week_start, 'lost': 0, 'found': 0, 'resolved': 0,
+                                             'days_from_posted': None, 'categories': {}})
+
+    cur.execute(f"""
+        SELECT {week} AS week, kind, category, sum(posts) FROM DailyPosts
+        WHERE day BETWEEN ? AND ? GROUP BY 1, 2, 3
+    """, window)
+    for week_start, kind, category, posts in cur.fetchall():
+        row = week_row(week_start)
+        row[kind] += posts
+        row['categories'].setdefault(category or 'Other', {'lost': 0, 'found': 0})[kind] += posts
+
+    cur.execute(f"""
+        SELECT {week}, sum(resolved), sum(hours_from_posted) FROM DailyResolutions
+        WHERE day BETWEEN ? AND ? GROUP BY 1
+    """, window)
+    for week_start, n, posted in cur.fetchall():
+        row = week_row(week_start)
+        row['resolved'] = n
+        row['days_from_posted'] = posted / n / 24
+
+    hotspots = {}
+    for kind in POST_TABLES:
+        cur.execute("""
+            SELECT location, sum(posts) AS n FROM DailyLocations
+            WHERE kind = ? AND day BETWEEN ? AND ? GROUP BY location ORDER BY n DESC, location LIMIT ?
+        """, (kind,) + window + (REPORT_HOTSPOTS,))
+        hotspots[kind] = [tuple(row) for row in cur.fetchall()]
+
+    cur.execute("""
+        SELECT category, sum(resolved), sum(hours_from_posted), sum(hours_from_claim) FROM DailyResolutions
+        WHERE day BETWEEN ? AND ? GROUP BY category ORDER BY sum(resolved) DESC, category
+    """, window)
+    resolutions = [{'category': category or 'Other', 'resolved': n, 'days_from_posted': posted / n / 24,
+                    'hours_from_claim': claim / n} for category, n, posted, claim in cur.fetchall()]
+
+    conn.close()
+
+    report = {
+        'weeks': [weeks[week_start] for week_start in sorted(weeks)],
+        'hotspots': hotspots,
+        'resolutions': resolutions,
+        'totals': {'lost': sum(w['lost'] for w in weeks.values()), 'found': sum(w['found'] for w in weeks.values()),
+                   'resolved': sum(w['resolved'] for w in weeks.values())},
+        'rolled_up_to': {name: rolled_up_to.get(name) for name in ROLLUPS},
+    }
+    with _report_cache_lock:
+        _report_cache[key] = report
+        while len(_report_cache) > REPORT_CACHE_SIZE:
+            _report_cache.popitem(last=False)
+    return report
+
 
 if __name__ == "__main__":
     print("DB module loaded")
@@ -0,0 +1,510 @@
+# imports
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import date
+
+import numpy as np
+
+from database import db
+from database.async_db import run_db
+
+# MATCH SUGGESTIONS
+# What I need: instead of waiting for an owner to spot their item, score every open LostPost against
+# every available FoundPost and keep the best few pairs in MatchSuggestions.
+#
+# How a pair is scored:
+#   - only posts in the same category are compared (category blocking, this is also what keeps the
+#     number of pairs manageable)
+#   - text similarity: cosine of hashed token vectors of item_name (counted twice) + description
+#   - location similarity: cosine of hashed token vectors of last_seen_location / found_location
+#   - date: 1 if date_found is on/after date_lost, 0 if before, 0.5 if either date is missing
+# Every post is turned into one weighted vector once, so scoring a whole block of pairs is a single
+# matrix multiply in NumPy instead of a Python loop over pairs.
+TEXT_DIM = 256
+LOC_DIM = 64
+W_TEXT = 0.6
+W_LOC = 0.25
+W_DATE = 0.15
+MIN_SCORE = 0.3   # pairs below this are never suggested
+TOP_K = 5         # suggestions kept per lost post and per found post
+CHUNK = 2048      # lost posts scored per matrix multiply
+SAMPLE_STEP = 8   # every 8th score of a row/column is partitioned to find which cells can be in its top k
+MAX_POSTING = 500      # a token in more posts than this ("black", "iphone") doesn't bring in candidates when rarer ones do
+MAX_CANDIDATES = 500   # a new post is only scored against this many candidates, the ones sharing the most tokens
+
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "in", "on", "at", "with", "to", "for", "my", "is", "it", "its",
+    "was", "near", "by", "from", "or", "has", "have", "this", "that", "floor", "room",
+}
+
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+@functools.lru_cache(maxsize=65536)
+def _word(word: str) -> str:
+    # '' for a word that isn't a token, cached because the same few thousand words come up over and over
+    if len(word) < 2 or word in STOPWORDS:
+        return ''
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokens(text) -> list:
+    """Lowercase words minus stopwords, with a plural 's' chopped off (keys -> key)."""
+    return [tok for tok in map(_word, WORD.findall((text or "").lower())) if tok]
+
+
+@functools.lru_cache(maxsize=65536)
+def _bucket(token: str, dim: int) -> int:
+    # crc32 instead of hash() so buckets are the same in every process
+    return zlib.crc32(token.encode()) % dim
+
+
+def _vectorize(token_lists: list, dim: int) -> np.ndarray:
+    """One L2-normalized hashed bag-of-words row per token list."""
+    n = len(token_lists)
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=n)
+    flat = list(itertools.chain.from_iterable(token_lists))
+    buckets = np.fromiter((_bucket(tok, dim) for tok in flat), dtype=np.int64, count=len(flat))
+    # count (row, bucket) pairs in one go instead of a Python += per token
+    cells = np.repeat(np.arange(n, dtype=np.int64) * dim, lengths) + buckets
+    m = np.bincount(cells, minlength=n * dim).astype(np.float32).reshape(n, dim)
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    m /= norms
+    return m
+
+
+@functools.lru_cache(maxsize=4096)
+def _day(value):
+    try:
+        return float(date.fromisoformat(str(value)[:10]).toordinal())
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def features(posts: list, kind: str):
+    """
+    Turn post dicts into (feature matrix, day numbers), both float32.
+    The feature row is [sqrt(W_TEXT) * text vector, sqrt(W_LOC) * location vector] so that the dot
+    product of a lost row and a found row is W_TEXT * text cosine + W_LOC * location cosine.
+    """
+    loc_col = 'last_seen_location' if kind == 'lost' else 'found_location'
+    date_col = 'date_lost' if kind == 'lost' else 'date_found'
+    text = _vectorize([tokens(p['item_name']) * 2 + tokens(p['description']) for p in posts], TEXT_DIM)
+    loc = _vectorize([tokens(p[loc_col]) for p in posts], LOC_DIM)
+    feats = np.hstack([text * np.float32(np.sqrt(W_TEXT)), loc * np.float32(np.sqrt(W_LOC))])
+    # day ordinals (~740000) are exact in float32
+    days = np.array([_day(p[date_col]) for p in posts], dtype=np.float32)
+    return feats, days
+
+
+def score_block(lost_feats, lost_days, found_feats, found_days) -> np.ndarray:
+    """Scores for every (lost row, found row) pair, shape (n_lost, n_found), float32 and added up in place."""
+    scores = lost_feats @ found_feats.T
+    # + W_DATE where the item was found on/after it was lost (a missing day compares False) ...
+    np.add(scores, np.float32(W_DATE), out=scores, where=found_days[None, :] >= lost_days[:, None])
+    # ... and + W_DATE / 2 where either day is missing
+    lost_missing, found_missing = np.isnan(lost_days), np.isnan(found_days)
+    if lost_missing.any() or found_missing.any():
+        half = np.float32(W_DATE / 2)
+        scores[lost_missing] += half
+        scores[:, found_missing] += half
+        scores[np.ix_(lost_missing, found_missing)] -= half
+    return scores
+
+
+def _kth_floor(scores, k: int, axis: int) -> np.ndarray:
+    """
+    A lower bound for the k-th best score of every row (axis=1) or column (axis=0): the k-th best of
+    every SAMPLE_STEP-th entry. Partitioning that sample is a fraction of the cost of the whole block.
+    """
+    sample = scores[:, ::SAMPLE_STEP] if axis == 1 else np.ascontiguousarray(scores[::SAMPLE_STEP].T)
+    if sample.shape[1] < k:
+        # too few to bound anything, every cell stays in
+        return np.full(len(sample), -np.inf, dtype=np.float32)
+    return np.partition(sample, -k, axis=1)[:, -k]
+
+
+def _top_per_group(groups, values, k: int) -> np.ndarray:
+    """Mask of the k highest values of each group (groups and values are parallel arrays, values in [0, 2))."""
+    # one float key sorts by group, then best value first (a single argsort is a lot quicker than lexsort)
+    order = np.argsort(groups * 4.0 - values, kind='stable')
+    sorted_groups = groups[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_groups, sorted_groups, side='left')
+    keep = np.zeros(len(order), dtype=bool)
+    keep[order[rank < k]] = True
+    return keep
+
+
+def _top_pairs(lost_feats, lost_days, found_feats, found_days, k: int = TOP_K, min_score: float = MIN_SCORE):
+    """
+    (lost indexes, found indexes, scores) arrays of the top k found posts of each lost post and the top k
+    lost posts of each found post, scored CHUNK lost rows at a time so memory stays bounded.
+    Only the cells that can still make a row's or a column's top k (at or above its _kth_floor) are pulled
+    out of each block, which is a fraction of a percent of it, and the top k are picked among those.
+    """
+    n_lost, n_found = len(lost_feats), len(found_feats)
+    none = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+    if n_lost == 0 or n_found == 0:
+        return none
+    min_score = np.float32(min_score)
+    row_parts = []
+    col_floor = np.full(n_found, min_score, dtype=np.float32)   # never above a column's k-th best so far
+    col_l, col_f, col_s = none                                  # every column's best k so far
+
+    for start in range(0, n_lost, CHUNK):
+        stop = min(start + CHUNK, n_lost)
+        s = score_block(lost_feats[start:stop], lost_days[start:stop], found_feats, found_days)
+        row_floor = np.maximum(_kth_floor(s, k, axis=1), min_score)
+        col_floor = np.maximum(_kth_floor(s, k, axis=0), col_floor)
+        # one pass against the lowest floor of all, then each cell against its own row's and column's floor
+        flat = np.flatnonzero(s >= min(row_floor.min(), col_floor.min()))
+        rr, cc = np.divmod(flat, n_found)
+        sc = s.ravel()[flat]
+
+        in_row = sc >= row_floor[rr]
+        keep = _top_per_group(rr[in_row], sc[in_row], k)
+        row_parts.append((rr[in_row][keep] + start, cc[in_row][keep], sc[in_row][keep]))
+
+        in_col = sc >= col_floor[cc]
+        col_l = np.concatenate([col_l, rr[in_col] + start])
+        col_f = np.concatenate([col_f, cc[in_col]])
+        col_s = np.concatenate([col_s, sc[in_col]])
+        keep = _top_per_group(col_f, col_s, k)
+        col_l, col_f, col_s = col_l[keep], col_f[keep], col_s[keep]
+
+    li = np.concatenate([part[0] for part in row_parts] + [col_l])
+    fi = np.concatenate([part[1] for part in row_parts] + [col_f])
+    sc = np.concatenate([part[2] for part in row_parts] + [col_s])
+    # a pair can be in a row's and its column's top k, keep it once
+    _, first = np.unique(li * n_found + fi, return_index=True)
+    return li[first], fi[first], sc[first]
+
+
+def suggest_pairs(lost_posts: list, found_posts: list) -> list:
+    """Score lost posts against found posts category by category, returns (lost_id, found_id, score) rows."""
+    by_cat = {}
+    for p in lost_posts:
+        by_cat.setdefault(p['category'], ([], []))[0].append(p)
+    for p in found_posts:
+        by_cat.setdefault(p['category'], ([], []))[1].append(p)
+
+    rows = []
+    for category, (lost, found) in by_cat.items():
+        if not lost or not found:
+            continue
+        lf, ld = features(lost, 'lost')
+        ff, fd = features(found, 'found')
+        rows += _pair_rows([p['lost_id'] for p in lost], [p['found_id'] for p in found],
+                           *_top_pairs(lf, ld, ff, fd))
+    return rows
+
+
+def _pair_rows(lost_ids: list, found_ids: list, li, fi, scores) -> list:
+    """(lost_id, found_id, score) rows for _top_pairs' index arrays."""
+    lost_ids, found_ids = np.array(lost_ids, dtype=object), np.array(found_ids, dtype=object)
+    return list(zip(lost_ids[li].tolist(), found_ids[fi].tolist(), np.round(scores.astype(np.float64), 4).tolist()))
+
+
+def rescore_all() -> dict:
+    """Recompute every suggestion from the open lost / available found posts and replace MatchSuggestions."""
+    started = time.perf_counter()
+    lost_posts, found_posts = db.get_match_candidates()
+    rows = suggest_pairs(lost_posts, found_posts)
+    db.replace_match_suggestions(rows)
+    return {
+        "lost_posts": len(lost_posts),
+        "found_posts": len(found_posts),
+        "suggestions": len(rows),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# INCREMENTAL MATCHING
+# What I need: tell someone "this might be yours" as soon as they post, without a full rescore.
+# IncrementalMatcher keeps every open lost / available found post in memory (its feature row and day)
+# plus an inverted index (category, token) -> post ids, location tokens included ('@library'). A new post
+# is only scored against the MAX_CANDIDATES posts of the other kind in its category that share the most
+# tokens with it (each shared token weighted by W_TEXT or W_LOC over how many posts have it), instead of
+# the whole table or every post that happens to say "black". db.py hands it new posts as its suggester and tells it about
+# imports/removes through its write listeners.
+# Each process has its own copy, it's rebuilt from the database at startup (start()). Other workers and the
+# CLI scripts delete, claim and archive posts without this process hearing about it, so a post that turns
+# out to be gone when its suggestion is written is dropped right away (db.py notifies a 'remove'), and every
+# LAF_MATCHER_REFRESH seconds refresh() syncs the index with the database if the posts' DataVersions moved.
+OTHER_KIND = {'lost': 'found', 'found': 'lost'}
+MATCHER_REFRESH = float(os.environ.get("LAF_MATCHER_REFRESH", "300"))  # 0 turns it off
+REFRESH_GRACE = 60  # seconds, a post indexed this recently may not be committed yet so refresh() keeps it
+
+log = logging.getLogger("laf.matcher")
+
+
+class IncrementalMatcher:
+    def __init__(self, k: int = TOP_K, min_score: float = MIN_SCORE):
+        self.k = k
+        self.min_score = min_score
+        self.posts = {'lost': {}, 'found': {}}   # post id -> (category, tokens, feature row, day, indexed at)
+        self.index = {'lost': {}, 'found': {}}   # (category, token) -> set of post ids
+        self.last_match_ms = 0.0
+        self.versions = None  # the posts' DataVersions counters when the index was last synced
+        self.refreshes = 0
+        self._lock = threading.Lock()
+
+    def _add(self, kind: str, post_id: str, category: str, toks: set, row, day: float):
+        self._remove(kind, post_id)
+        self.posts[kind][post_id] = (category, toks, row, day, time.monotonic())
+        for tok in toks:
+            self.index[kind].setdefault((category, tok), set()).add(post_id)
+
+    def _remove(self, kind: str, post_id: str):
+        entry = self.posts[kind].pop(post_id, None)
+        if entry is None:
+            return
+        category, toks = entry[0], entry[1]
+        for tok in toks:
+            ids = self.index[kind].get((category, tok))
+            if ids is not None:
+                ids.discard(post_id)
+                if not ids:
+                    del self.index[kind][(category, tok)]
+
+    def _load(self, kind: str, posts: list):
+        if not posts:
+            return
+        feats, days = features(posts, kind)
+        id_col = kind + '_id'
+        loc_col = 'last_seen_location' if kind == 'lost' else 'found_location'
+        for i, p in enumerate(posts):
+            # location tokens are indexed too, '@' keeps them apart from the same word in a description
+            toks = set(tokens(p['item_name']) + tokens(p['description']))
+            toks.update('@' + tok for tok in tokens(p[loc_col]))
+            self._add(kind, p[id_col], p['category'], toks, feats[i], days[i])
+
+    def rebuild(self):
+        """Reload the whole index from the open lost / available found posts."""
+        versions = _post_versions()
+        lost_posts, found_posts = db.get_match_candidates()
+        with self._lock:
+            self.posts = {'lost': {}, 'found': {}}
+            self.index = {'lost': {}, 'found': {}}
+            self._load('lost', lost_posts)
+            self._load('found', found_posts)
+        self.versions = versions
+
+    def refresh(self) -> dict:
+        """
+        Sync the index with the database if any process changed the posts since the last sync: drop what's
+        no longer open / available and load what other processes added. Returns what it dropped and added.
+        """
+        versions = _post_versions()
+        if versions == self.versions:
+            return {'dropped': 0, 'added': 0}
+        ids = dict(zip(('lost', 'found'), db.get_match_candidate_ids()))
+        recent = time.monotonic() - REFRESH_GRACE
+        dropped, new = 0, {}
+        with self._lock:
+            for kind, posts in self.posts.items():
+                gone = [post_id for post_id, entry in posts.items() if post_id not in ids[kind] and entry[4] < recent]
+                for post_id in gone:
+                    self._remove(kind, post_id)
+                dropped += len(gone)
+                new[kind] = ids[kind].difference(posts)
+        lost_posts, found_posts = db.get_match_candidates(new['lost'], new['found'])
+        with self._lock:
+            self._load('lost', lost_posts)
+            self._load('found', found_posts)
+        self.versions = versions
+        self.refreshes += 1
+        return {'dropped': dropped, 'added': len(lost_posts) + len(found_posts)}
+
+    def add(self, kind: str, post: dict):
+        with self._lock:
+            self._load(kind, [post])
+
+    def remove(self, kind: str, post_id: str):
+        with self._lock:
+            self._remove(kind, post_id)
+
+    def candidates(self, kind: str, post_id: str) -> list:
+        """
+        Ids of the other kind in the same category that share the most tokens with this post, at most
+        MAX_CANDIDATES. Tokens in more than MAX_POSTING posts are left out when the post has rarer ones,
+        their posting lists are most of the category and would swamp the overlap count.
+        """
+        entry = self.posts[kind].get(post_id)
+        if entry is None:
+            return []
+        category, toks = entry[0], entry[1]
+        other = self.index[OTHER_KIND[kind]]
+        postings = [(tok, ids) for tok, ids in ((tok, other.get((category, tok))) for tok in toks) if ids]
+        rare = [(tok, ids) for tok, ids in postings if len(ids) <= MAX_POSTING]
+        if rare:
+            postings = rare
+        if len(postings) == 1:
+            return list(itertools.islice(postings[0][1], MAX_CANDIDATES))
+        overlap = {}
+        for tok, ids in postings:
+            weight = (W_LOC if tok[0] == '@' else W_TEXT) / len(ids)
+            for other_id in ids:
+                overlap[other_id] = overlap.get(other_id, 0.0) + weight
+        if len(overlap) <= MAX_CANDIDATES:
+            return list(overlap)
+        return heapq.nlargest(MAX_CANDIDATES, overlap, key=overlap.get)
+
+    def match(self, kind: str, post_id: str) -> list:
+        """Score one indexed post against its candidates, returns its best (lost_id, found_id, score) rows."""
+        started = time.perf_counter()
+        other_kind = OTHER_KIND[kind]
+        with self._lock:
+            entry = self.posts[kind].get(post_id)
+            cand_ids = self.candidates(kind, post_id)
+            if entry is None or not cand_ids:
+                return []
+            rows = [self.posts[other_kind][c] for c in cand_ids]
+        cand_feats = np.stack([r[2] for r in rows])
+        cand_days = np.array([r[3] for r in rows], dtype=np.float32)
+        row, day = entry[2][None, :], np.array([entry[3]], dtype=np.float32)
+        if kind == 'lost':
+            scores = score_block(row, day, cand_feats, cand_days)[0]
+        else:
+            scores = score_block(cand_feats, cand_days, row, day)[:, 0]
+
+        k = min(self.k, len(cand_ids))
+        best = np.argpartition(-scores, k - 1)[:k]
+        out = []
+        for i in best:
+            if scores[i] < self.min_score:
+                continue
+            pair = (post_id, cand_ids[i]) if kind == 'lost' else (cand_ids[i], post_id)
+            out.append((*pair, round(float(scores[i]), 4)))
+        self.last_match_ms = (time.perf_counter() - started) * 1000
+        return out
+
+    def match_many(self, kind: str, posts: list) -> list:
+        """
+        Suggestions for a batch of new posts (a bulk import) scored as one block per category against every
+        indexed post of the other kind, instead of one candidate lookup per post.
+        """
+        other_kind = OTHER_KIND[kind]
+        id_col = kind + '_id'
+        with self._lock:
+            by_cat = {}
+            for p in posts:
+                entry = self.posts[kind].get(p[id_col])
+                if entry is not None:
+                    by_cat.setdefault(entry[0], ([], []))[0].append((p[id_col], entry))
+            for other_id, entry in self.posts[other_kind].items():
+                if entry[0] in by_cat:
+                    by_cat[entry[0]][1].append((other_id, entry))
+
+        rows = []
+        for new, other in by_cat.values():
+            if not other:
+                continue
+            new_feats = np.stack([e[2] for _, e in new])
+            new_days = np.array([e[3] for _, e in new], dtype=np.float32)
+            other_feats = np.stack([e[2] for _, e in other])
+            other_days = np.array([e[3] for _, e in other], dtype=np.float32)
+            new_ids, other_ids = [post_id for post_id, _ in new], [post_id for post_id, _ in other]
+            if kind == 'lost':
+                pairs = _top_pairs(new_feats, new_days, other_feats, other_days, self.k, self.min_score)
+                rows += _pair_rows(new_ids, other_ids, *pairs)
+            else:
+                pairs = _top_pairs(other_feats, other_days, new_feats, new_days, self.k, self.min_score)
+                rows += _pair_rows(other_ids, new_ids, *pairs)
+        return rows
+
+    def suggest_new(self, added: list) -> list:
+        """
+        db.py suggester: index a group-commit batch of new posts (features built once per kind) and return
+        their suggestion rows, the writer stores them in the batch's own transaction.
+        """
+        by_kind = {}
+        for kind, post_id, post in added:
+            by_kind.setdefault(kind, []).append(post)
+        with self._lock:
+            for kind, posts in by_kind.items():
+                self._load(kind, posts)
+        rows = []
+        for kind, post_id, post in added:
+            rows += self.match(kind, post_id)
+        return rows
+
+    def on_write(self, action: str, kind: str, post_id: str, post=None):
+        """db.py write listener: index imported posts and store their suggestions, drop removed ones."""
+        if action == 'add_many' and post:
+            with self._lock:
+                self._load(kind, post)
+            db.add_match_suggestions(self.match_many(kind, post))
+        elif action == 'remove':
+            self.remove(kind, post_id)
+
+    def start(self):
+        self.rebuild()
+        db.add_write_listener(self.on_write)
+        db.set_suggester(self.suggest_new)
+
+    def stop(self):
+        db.set_suggester(None)
+        db.remove_write_listener(self.on_write)
+
+    def stats(self) -> dict:
+        return {
+            "lost_posts": len(self.posts['lost']),
+            "found_posts": len(self.posts['found']),
+            "index_keys": len(self.index['lost']) + len(self.index['found']),
+            "last_match_ms": round(self.last_match_ms, 3),
+            "refreshes": self.refreshes,
+        }
+
+
+def _post_versions() -> tuple:
+    return db.get_data_version('lost'), db.get_data_version('found')
+
+
+matcher = IncrementalMatcher()
+
+
+async def refresh_loop(interval: float = MATCHER_REFRESH):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changes = await run_db(matcher.refresh)
+            if any(changes.values()):
+                log.info("matcher refresh dropped %(dropped)s posts and added %(added)s", changes)
+        except Exception:
+            # the index just stays as it is until the next try
+            log.exception("matcher refresh failed")
+
+
+def start_refresh():
+    """Start the background refresh (main.py's lifespan), returns the task or None if it's turned off."""
+    if MATCHER_REFRESH <= 0:
+        return None
+    return asyncio.create_task(refresh_loop())
+
+
+async def stop_refresh(task):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+if __name__ == "__main__":
+    # python -m database.matching
+    print(rescore_all())
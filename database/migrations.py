@@ -0,0 +1,590 @@
+# imports
+import sqlite3 as sql
+
+from database import db
+
+# SCHEMA MIGRATIONS
+# CreateLAF.py drops and rebuilds everything, which is fine for a fresh database but not for the live
+# one. This runner applies numbered migrations on top of whatever is already in lost_and_found.db and
+# never drops data. The applied version lives in PRAGMA user_version (cheap to read) and every applied
+# migration is also logged in the SchemaMigrations table.
+#
+# Rules for adding a migration:
+#   - append it to MIGRATIONS with the next number, never edit or renumber one that already shipped
+#   - every step must be safe to run against a database that already has the change
+#     (CREATE ... IF NOT EXISTS, add_column() instead of a raw ALTER TABLE, etc.)
+#   - a step is either a SQL string or a function that takes the connection
+
+
+def add_column(table: str, column: str, decl: str):
+    """Migration step that adds a column only if it isn't there yet (ALTER TABLE has no IF NOT EXISTS)."""
+    def step(conn):
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return step
+
+
+def version_triggers(name: str, table: str) -> list:
+    """Steps that (re)create the triggers bumping DataVersions[name] on every insert/update/delete of table."""
+    steps = []
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        trigger = f"trg_{name}_version_{event.lower()}"
+        steps.append(f"DROP TRIGGER IF EXISTS {trigger}")
+        steps.append(f"""
+        CREATE TRIGGER {trigger} AFTER {event} ON {table} BEGIN
+            UPDATE DataVersions SET version = version + 1, updated_at = strftime('%Y-%m-%d %H:%M:%S', 'now')
+            WHERE name = '{name}';
+        END
+        """)
+    return steps
+
+
+def stats_triggers(kind: str, table: str, status: str, category: str = "''", events=("INSERT", "UPDATE", "DELETE")) -> list:
+    """
+    Steps that (re)create the triggers keeping the Stats(kind, status, category) counts in sync with table.
+    status / category are SQL expressions over the row with {row} where new. / old. goes.
+    """
+    def add(row: str, amount: int) -> str:
+        return f"""
+            INSERT INTO Stats (kind, status, category, count)
+            VALUES ('{kind}', {status.format(row=row)}, {category.format(row=row)}, {amount})
+            ON CONFLICT (kind, status, category) DO UPDATE SET count = count + excluded.count;"""
+
+    # updates only touch Stats when a counted column changed (version bumps, edits, resolve notes don't)
+    changed = " OR ".join(f"{expr.format(row='old.')} IS NOT {expr.format(row='new.')}"
+                          for expr in (status, category) if "{row}" in expr)
+    steps = []
+    for event in events:
+        trigger = f"trg_{table.lower()}_stats_{event.lower()}"
+        body = {"INSERT": add("new.", 1), "DELETE": add("old.", -1), "UPDATE": add("old.", -1) + add("new.", 1)}[event]
+        when = f" WHEN {changed}" if event == "UPDATE" else ""
+        steps.append(f"DROP TRIGGER IF EXISTS {trigger}")
+        steps.append(f"CREATE TRIGGER {trigger} AFTER {event} ON {table}{when} BEGIN{body}\n        END")
+    return steps
+
+
+# what stats_triggers counts by (see migration 9)
+POST_STATUS = "coalesce({row}status, '')"
+POST_CATEGORY = "coalesce({row}category, '')"
+MATCH_STATUS = "CASE {row}resolved WHEN 1 THEN 'resolved' ELSE 'unresolved' END"
+
+
+MIGRATIONS = [
+    (1, "baseline schema", [
+        # same tables and indexes CreateLAF.py builds
+        """
+        CREATE TABLE IF NOT EXISTS Users (
+            user_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            phone TEXT,
+            password_hash TEXT NOT NULL,
+            role TEXT DEFAULT 'student' CHECK(role IN ('student', 'staff', 'admin')),
+            date_joined DATE DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS LostPosts (
+            lost_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            category TEXT CHECK(category IN (
+                'Electronics', 'Clothing', 'Accessories',
+                'Documents', 'Keys', 'Books', 'Other'
+            )),
+            description TEXT,
+            date_lost DATE,
+            last_seen_location TEXT,
+            date_posted TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            status TEXT DEFAULT 'open' CHECK(status IN ('open', 'matched', 'closed')),
+            FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS FoundPosts (
+            found_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            category TEXT CHECK(category IN (
+                'Electronics', 'Clothing', 'Accessories',
+                'Documents', 'Keys', 'Books', 'Other'
+            )),
+            description TEXT,
+            date_found DATE,
+            found_location TEXT,
+            storage_location TEXT,
+            date_posted TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            status TEXT DEFAULT 'available' CHECK(status IN ('available', 'matched', 'returned')),
+            FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS Matches (
+            match_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lost_id TEXT NOT NULL,
+            found_id TEXT NOT NULL,
+            matched_by_user_id TEXT,
+            date_matched TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            resolved INTEGER DEFAULT 0,
+            notes TEXT,
+            FOREIGN KEY (lost_id) REFERENCES LostPosts(lost_id) ON DELETE CASCADE,
+            FOREIGN KEY (found_id) REFERENCES FoundPosts(found_id) ON DELETE CASCADE,
+            FOREIGN KEY (matched_by_user_id) REFERENCES Users(user_id) ON DELETE SET NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_lost_category ON LostPosts(category)",
+        "CREATE INDEX IF NOT EXISTS idx_lost_status ON LostPosts(status)",
+        "CREATE INDEX IF NOT EXISTS idx_lost_date ON LostPosts(date_lost)",
+        "CREATE INDEX IF NOT EXISTS idx_found_category ON FoundPosts(category)",
+        "CREATE INDEX IF NOT EXISTS idx_found_status ON FoundPosts(status)",
+        "CREATE INDEX IF NOT EXISTS idx_found_date ON FoundPosts(date_found)",
+        "CREATE INDEX IF NOT EXISTS idx_match_resolved ON Matches(resolved)",
+    ]),
+    (2, "keyset pagination indexes", [
+        # each list query is "WHERE <filter> ORDER BY <date>, <id>" so the index covers filter + sort key
+        "CREATE INDEX IF NOT EXISTS idx_lost_status_posted ON LostPosts(status, date_posted, lost_id)",
+        "CREATE INDEX IF NOT EXISTS idx_lost_user_status_posted ON LostPosts(user_id, status, date_posted, lost_id)",
+        "CREATE INDEX IF NOT EXISTS idx_found_status_posted ON FoundPosts(status, date_posted, found_id)",
+        "CREATE INDEX IF NOT EXISTS idx_found_user ON FoundPosts(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_match_resolved_date ON Matches(resolved, date_matched, match_id)",
+        "CREATE INDEX IF NOT EXISTS idx_match_lost ON Matches(lost_id)",
+        "CREATE INDEX IF NOT EXISTS idx_match_found ON Matches(found_id)",
+        # these are now just prefixes of the indexes above
+        "DROP INDEX IF EXISTS idx_lost_status",
+        "DROP INDEX IF EXISTS idx_found_status",
+        "DROP INDEX IF EXISTS idx_match_resolved",
+    ]),
+    (3, "session revocations", [
+        # kind is 'token' (key = token id, one logout) or 'user' (key = user_id, every token issued
+        # before revoked_at, e.g. after a role change)
+        """
+        CREATE TABLE IF NOT EXISTS SessionRevocations (
+            kind TEXT NOT NULL CHECK(kind IN ('token', 'user')),
+            key TEXT NOT NULL,
+            revoked_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (kind, key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_revocations_revoked_at ON SessionRevocations(revoked_at)",
+    ]),
+    (4, "full-text search", [
+        # External content FTS5 tables: the text lives only in LostPosts/FoundPosts, the FTS table just
+        # holds the index and points back by rowid. The triggers keep it in sync on every write.
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS LostPostsFTS USING fts5(
+            item_name, description, last_seen_location,
+            content='LostPosts', content_rowid='rowid',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lost_fts_insert AFTER INSERT ON LostPosts BEGIN
+            INSERT INTO LostPostsFTS (rowid, item_name, description, last_seen_location)
+            VALUES (new.rowid, new.item_name, new.description, new.last_seen_location);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lost_fts_delete AFTER DELETE ON LostPosts BEGIN
+            INSERT INTO LostPostsFTS (LostPostsFTS, rowid, item_name, description, last_seen_location)
+            VALUES ('delete', old.rowid, old.item_name, old.description, old.last_seen_location);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lost_fts_update
+        AFTER UPDATE OF item_name, description, last_seen_location ON LostPosts BEGIN
+            INSERT INTO LostPostsFTS (LostPostsFTS, rowid, item_name, description, last_seen_location)
+            VALUES ('delete', old.rowid, old.item_name, old.description, old.last_seen_location);
+            INSERT INTO LostPostsFTS (rowid, item_name, description, last_seen_location)
+            VALUES (new.rowid, new.item_name, new.description, new.last_seen_location);
+        END
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS FoundPostsFTS USING fts5(
+            item_name, description, found_location,
+            content='FoundPosts', content_rowid='rowid',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_found_fts_insert AFTER INSERT ON FoundPosts BEGIN
+            INSERT INTO FoundPostsFTS (rowid, item_name, description, found_location)
+            VALUES (new.rowid, new.item_name, new.description, new.found_location);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_found_fts_delete AFTER DELETE ON FoundPosts BEGIN
+            INSERT INTO FoundPostsFTS (FoundPostsFTS, rowid, item_name, description, found_location)
+            VALUES ('delete', old.rowid, old.item_name, old.description, old.found_location);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_found_fts_update
+        AFTER UPDATE OF item_name, description, found_location ON FoundPosts BEGIN
+            INSERT INTO FoundPostsFTS (FoundPostsFTS, rowid, item_name, description, found_location)
+            VALUES ('delete', old.rowid, old.item_name, old.description, old.found_location);
+            INSERT INTO FoundPostsFTS (rowid, item_name, description, found_location)
+            VALUES (new.rowid, new.item_name, new.description, new.found_location);
+        END
+        """,
+        # index the posts that already exist
+        "INSERT INTO LostPostsFTS (LostPostsFTS) VALUES ('rebuild')",
+        "INSERT INTO FoundPostsFTS (FoundPostsFTS) VALUES ('rebuild')",
+    ]),
+    (5, "match suggestions", [
+        """
+        CREATE TABLE IF NOT EXISTS MatchSuggestions (
+            lost_id TEXT NOT NULL,
+            found_id TEXT NOT NULL,
+            score REAL NOT NULL,
+            computed_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            PRIMARY KEY (lost_id, found_id),
+            FOREIGN KEY (lost_id) REFERENCES LostPosts(lost_id) ON DELETE CASCADE,
+            FOREIGN KEY (found_id) REFERENCES FoundPosts(found_id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_suggestion_found ON MatchSuggestions(found_id, score)",
+    ]),
+    (6, "data versions for cached fragments", [
+        # one counter per list, bumped by triggers on every insert/update/delete so a cached
+        # rendering of the list is stale as soon as its version moves (in every worker)
+        """
+        CREATE TABLE IF NOT EXISTS DataVersions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO DataVersions (name) VALUES ('lost'), ('found')",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lost_version_insert AFTER INSERT ON LostPosts BEGIN
+            UPDATE DataVersions SET version = version + 1 WHERE name = 'lost';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lost_version_update AFTER UPDATE ON LostPosts BEGIN
+            UPDATE DataVersions SET version = version + 1 WHERE name = 'lost';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lost_version_delete AFTER DELETE ON LostPosts BEGIN
+            UPDATE DataVersions SET version = version + 1 WHERE name = 'lost';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_found_version_insert AFTER INSERT ON FoundPosts BEGIN
+            UPDATE DataVersions SET version = version + 1 WHERE name = 'found';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_found_version_update AFTER UPDATE ON FoundPosts BEGIN
+            UPDATE DataVersions SET version = version + 1 WHERE name = 'found';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_found_version_delete AFTER DELETE ON FoundPosts BEGIN
+            UPDATE DataVersions SET version = version + 1 WHERE name = 'found';
+        END
+        """,
+    ]),
+    (7, "row versions for conditional GETs", [
+        # version / updated_at on each post are kept up to date by the write functions in db.py,
+        # pages send them as ETag / Last-Modified
+        add_column("LostPosts", "version", "INTEGER NOT NULL DEFAULT 1"),
+        add_column("LostPosts", "updated_at", "TIMESTAMP"),
+        "UPDATE LostPosts SET updated_at = date_posted WHERE updated_at IS NULL",
+        add_column("FoundPosts", "version", "INTEGER NOT NULL DEFAULT 1"),
+        add_column("FoundPosts", "updated_at", "TIMESTAMP"),
+        "UPDATE FoundPosts SET updated_at = date_posted WHERE updated_at IS NULL",
+        add_column("DataVersions", "updated_at", "TIMESTAMP"),
+        "INSERT OR IGNORE INTO DataVersions (name) VALUES ('matches'), ('suggestions')",
+        "UPDATE DataVersions SET updated_at = strftime('%Y-%m-%d %H:%M:%S', 'now') WHERE updated_at IS NULL",
+        # same version triggers as migration 6, now also stamping updated_at (and a set for Matches)
+        *version_triggers("lost", "LostPosts"),
+        *version_triggers("found", "FoundPosts"),
+        *version_triggers("matches", "Matches"),
+    ]),
+    (8, "archive tables", [
+        # resolved matches and their closed/returned posts are moved here by db.archive_resolved() so the
+        # hot tables (and their indexes) only hold what people are still looking for. Same columns as the
+        # hot tables plus archived_at. No FTS and no version triggers, archived rows never change.
+        """
+        CREATE TABLE IF NOT EXISTS ArchivedLostPosts (
+            lost_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            category TEXT,
+            description TEXT,
+            date_lost DATE,
+            last_seen_location TEXT,
+            date_posted TIMESTAMP,
+            status TEXT,
+            version INTEGER NOT NULL DEFAULT 1,
+            updated_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ArchivedFoundPosts (
+            found_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            category TEXT,
+            description TEXT,
+            date_found DATE,
+            found_location TEXT,
+            storage_location TEXT,
+            date_posted TIMESTAMP,
+            status TEXT,
+            version INTEGER NOT NULL DEFAULT 1,
+            updated_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ArchivedMatches (
+            match_id INTEGER PRIMARY KEY,
+            lost_id TEXT NOT NULL,
+            found_id TEXT NOT NULL,
+            matched_by_user_id TEXT,
+            date_matched TIMESTAMP,
+            resolved INTEGER DEFAULT 1,
+            notes TEXT,
+            archived_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            FOREIGN KEY (lost_id) REFERENCES ArchivedLostPosts(lost_id) ON DELETE CASCADE,
+            FOREIGN KEY (found_id) REFERENCES ArchivedFoundPosts(found_id) ON DELETE CASCADE,
+            FOREIGN KEY (matched_by_user_id) REFERENCES Users(user_id) ON DELETE SET NULL
+        )
+        """,
+        # same lookups the hot tables have for "my posts" / "my matches" and exports
+        "CREATE INDEX IF NOT EXISTS idx_archived_lost_user ON ArchivedLostPosts(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_archived_lost_posted ON ArchivedLostPosts(date_posted, lost_id)",
+        "CREATE INDEX IF NOT EXISTS idx_archived_found_user ON ArchivedFoundPosts(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_archived_found_posted ON ArchivedFoundPosts(date_posted, found_id)",
+        "CREATE INDEX IF NOT EXISTS idx_archived_match_lost ON ArchivedMatches(lost_id)",
+        "CREATE INDEX IF NOT EXISTS idx_archived_match_found ON ArchivedMatches(found_id)",
+        "CREATE INDEX IF NOT EXISTS idx_archived_match_date ON ArchivedMatches(date_matched, match_id)",
+    ]),
+    (9, "dashboard stats", [
+        # row counts per (kind, status, category) kept by triggers, so dashboard totals are a read of this
+        # small table instead of COUNT(*) / GROUP BY over the posts. The archive tables count too (they
+        # only get inserts/deletes), so moving a row to the archive leaves the totals alone.
+        # category is '' for matches (they don't have one) and for posts without a category.
+        """
+        CREATE TABLE IF NOT EXISTS Stats (
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            category TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, status, category)
+        ) WITHOUT ROWID
+        """,
+        *stats_triggers("lost", "LostPosts", POST_STATUS, POST_CATEGORY),
+        *stats_triggers("found", "FoundPosts", POST_STATUS, POST_CATEGORY),
+        *stats_triggers("matches", "Matches", MATCH_STATUS),
+        *stats_triggers("lost", "ArchivedLostPosts", POST_STATUS, POST_CATEGORY,
+                        events=("INSERT", "DELETE")),
+        *stats_triggers("found", "ArchivedFoundPosts", POST_STATUS, POST_CATEGORY,
+                        events=("INSERT", "DELETE")),
+        *stats_triggers("matches", "ArchivedMatches", MATCH_STATUS,
+                        events=("INSERT", "DELETE")),
+        # count what's already there (one scan, in the same transaction as the triggers)
+        "DELETE FROM Stats",
+        """
+        INSERT INTO Stats (kind, status, category, count)
+        SELECT 'lost', coalesce(status, ''), coalesce(category, ''), count(*)
+        FROM (SELECT status, category FROM LostPosts UNION ALL SELECT status, category FROM ArchivedLostPosts)
+        GROUP BY 1, 2, 3
+        """,
+        """
+        INSERT INTO Stats (kind, status, category, count)
+        SELECT 'found', coalesce(status, ''), coalesce(category, ''), count(*)
+        FROM (SELECT status, category FROM FoundPosts UNION ALL SELECT status, category FROM ArchivedFoundPosts)
+        GROUP BY 1, 2, 3
+        """,
+        """
+        INSERT INTO Stats (kind, status, category, count)
+        SELECT 'matches', CASE resolved WHEN 1 THEN 'resolved' ELSE 'unresolved' END, '', count(*)
+        FROM (SELECT resolved FROM Matches UNION ALL SELECT resolved FROM ArchivedMatches)
+        GROUP BY 1, 2, 3
+        """,
+    ]),
+    (10, "daily rollups for reports", [
+        # when a match was resolved (time-to-resolution). Matches resolved before this existed get the
+        # lost post's last change (the resolve bumped it) or, failing that, the match date.
+        add_column("Matches", "date_resolved", "TIMESTAMP"),
+        add_column("ArchivedMatches", "date_resolved", "TIMESTAMP"),
+        """
+        UPDATE Matches SET date_resolved = max(date_matched, coalesce(
+            (SELECT updated_at FROM LostPosts WHERE lost_id = Matches.lost_id), date_matched))
+        WHERE resolved = 1 AND date_resolved IS NULL
+        """,
+        """
+        UPDATE ArchivedMatches SET date_resolved = max(date_matched, coalesce(
+            (SELECT updated_at FROM ArchivedLostPosts WHERE lost_id = ArchivedMatches.lost_id), date_matched))
+        WHERE resolved = 1 AND date_resolved IS NULL
+        """,
+        # the rollup job reads new resolutions by date_resolved (only resolved rows are in these)
+        "CREATE INDEX IF NOT EXISTS idx_match_date_resolved ON Matches(date_resolved) WHERE date_resolved IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS idx_archived_match_date_resolved ON ArchivedMatches(date_resolved)",
+        # daily aggregates db.rollup_reports() keeps up to date, /admin/reports only reads these
+        """
+        CREATE TABLE IF NOT EXISTS DailyPosts (
+            day DATE NOT NULL,
+            kind TEXT NOT NULL,
+            category TEXT NOT NULL,
+            posts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, kind, category)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS DailyLocations (
+            day DATE NOT NULL,
+            kind TEXT NOT NULL,
+            location TEXT NOT NULL,
+            posts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, kind, location)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS DailyResolutions (
+            day DATE NOT NULL,
+            category TEXT NOT NULL,
+            resolved INTEGER NOT NULL DEFAULT 0,
+            hours_from_posted REAL NOT NULL DEFAULT 0,   -- sums, divide by resolved for the average
+            hours_from_claim REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, category)
+        ) WITHOUT ROWID
+        """,
+        # how far each rollup has got (the newest timestamp it has counted)
+        """
+        CREATE TABLE IF NOT EXISTS RollupWatermarks (
+            name TEXT PRIMARY KEY,
+            watermark TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+        )
+        """,
+    ]),
+    (11, "insert stamps for the post rollups", [
+        # the post rollups used to read new rows by date_posted, but ImportLAF/GenerateLAF/InsertsLAF write
+        # posts with an older date_posted, and those never got past the watermark. inserted_at is when the
+        # row was written. The write functions in db.py set it, the triggers fill it in for anything else
+        # that inserts a post (scripts, the sqlite3 shell). Archiving copies it along with the row.
+        add_column("LostPosts", "inserted_at", "TIMESTAMP"),
+        add_column("FoundPosts", "inserted_at", "TIMESTAMP"),
+        add_column("ArchivedLostPosts", "inserted_at", "TIMESTAMP"),
+        add_column("ArchivedFoundPosts", "inserted_at", "TIMESTAMP"),
+        "UPDATE LostPosts SET inserted_at = date_posted WHERE inserted_at IS NULL",
+        "UPDATE FoundPosts SET inserted_at = date_posted WHERE inserted_at IS NULL",
+        "UPDATE ArchivedLostPosts SET inserted_at = date_posted WHERE inserted_at IS NULL",
+        "UPDATE ArchivedFoundPosts SET inserted_at = date_posted WHERE inserted_at IS NULL",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lost_inserted_at AFTER INSERT ON LostPosts
+        WHEN new.inserted_at IS NULL BEGIN
+            UPDATE LostPosts SET inserted_at = strftime('%Y-%m-%d %H:%M:%S', 'now') WHERE rowid = new.rowid;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_found_inserted_at AFTER INSERT ON FoundPosts
+        WHEN new.inserted_at IS NULL BEGIN
+            UPDATE FoundPosts SET inserted_at = strftime('%Y-%m-%d %H:%M:%S', 'now') WHERE rowid = new.rowid;
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_lost_inserted_at ON LostPosts(inserted_at)",
+        "CREATE INDEX IF NOT EXISTS idx_found_inserted_at ON FoundPosts(inserted_at)",
+        "CREATE INDEX IF NOT EXISTS idx_archived_lost_inserted_at ON ArchivedLostPosts(inserted_at)",
+        "CREATE INDEX IF NOT EXISTS idx_archived_found_inserted_at ON ArchivedFoundPosts(inserted_at)",
+        # count the posts again from scratch, so the ones the old watermark skipped are in the reports
+        "DELETE FROM DailyPosts",
+        "DELETE FROM DailyLocations",
+        "DELETE FROM RollupWatermarks WHERE name IN ('lost', 'found')",
+    ]),
+    (12, "recount resolutions", [
+        # the resolutions rollup used to skip archived matches whose lost post wasn't in ArchivedLostPosts,
+        # count them again from scratch so those are in the reports
+        "DELETE FROM DailyResolutions",
+        "DELETE FROM RollupWatermarks WHERE name = 'resolutions'",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _connect(db_path: str):
+    # autocommit mode (isolation_level=None) so BEGIN/COMMIT below are exactly what runs
+    conn = sql.connect(db_path, timeout=30, isolation_level=None)
+    db.configure_connection(conn)
+    return conn
+
+
+def current_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def enable_wal(conn) -> str:
+    """
+    Switch the database to write-ahead logging so readers don't block on writers.
+    This is persistent, once set every later connection uses WAL too.
+    """
+    return conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+
+
+def _apply(conn, version: int, name: str, steps) -> bool:
+    # BEGIN IMMEDIATE takes the write lock up front, so if two workers start at once the second one
+    # waits here and then sees the version already bumped
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if current_version(conn) >= version:
+            conn.execute("ROLLBACK")
+            return False
+        for step in steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(step)
+        conn.execute("INSERT OR REPLACE INTO SchemaMigrations (version, name) VALUES (?, ?)", (version, name))
+        conn.execute(f"PRAGMA user_version = {int(version)}")
+        conn.execute("COMMIT")
+        return True
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def migrate(db_path: str = None, target: int = None) -> list:
+    """
+    Bring the database up to LATEST_VERSION (or stop at target) and turn on WAL.
+    Returns the list of migration numbers that were applied (empty if it was already current).
+    """
+    conn = _connect(db_path or db.DB)
+    try:
+        enable_wal(conn)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS SchemaMigrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+            )
+        """)
+        applied = []
+        for version, name, steps in MIGRATIONS:
+            if current_version(conn) >= version or (target is not None and version > target):
+                continue
+            if _apply(conn, version, name, steps):
+                applied.append(version)
+        # the cached column lists are stale now, reload them on the next lookup
+        db.schema_catalog.invalidate()
+        return applied
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    # python -m database.migrations
+    done = migrate()
+    if done:
+        print(f"Applied migrations {done}, database is now at version {LATEST_VERSION}.")
+    else:
+        print(f"Database already at version {LATEST_VERSION}, nothing to do.")
@@ -0,0 +1,108 @@
+# imports
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# PASSWORD HASHING
+# Passwords used to be stored and compared as plain text. They're now hashed with a slow KDF:
+# scrypt by default (memory-hard), or PBKDF2-SHA256 if LAF_PASSWORD_KDF=pbkdf2.
+# Stored format is "<kdf>$<params...>$<salt>$<hash>" so old hashes keep verifying after the settings
+# change, and verify_password says when a row should be re-hashed with the current settings.
+# Rows without a "$" are legacy plain text and always need a re-hash.
+#
+# A hash takes tens of milliseconds on purpose, so the async versions run on their own bounded pool
+# (threads by default, hashlib releases the GIL while it works; LAF_HASH_POOL=process for processes)
+# and never on the event loop or the DB thread pool.
+KDF = os.environ.get("LAF_PASSWORD_KDF", "scrypt")
+SCRYPT_N = int(os.environ.get("LAF_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = int(os.environ.get("LAF_PBKDF2_ITERATIONS", "600000"))
+HASH_WORKERS = int(os.environ.get("LAF_HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_POOL = os.environ.get("LAF_HASH_POOL", "thread")
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode()
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # maxmem has to cover 128 * n * r bytes plus some slack
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+                          maxmem=256 * n * r + 1024 * 1024)
+
+
+def hash_password(password: str) -> str:
+    """Hash a password with the configured KDF, returns the string to store in Users.password_hash."""
+    salt = secrets.token_bytes(SALT_BYTES)
+    if KDF == "pbkdf2":
+        key = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PBKDF2_ITERATIONS, KEY_BYTES)
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(key)}"
+    key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+
+
+def verify_password(password: str, stored: str) -> tuple[bool, bool]:
+    """
+    Check a password against a stored value.
+    Returns (matches, needs_rehash), needs_rehash is True for plain text rows and for hashes made
+    with different settings than the current ones.
+    """
+    if not stored:
+        return False, False
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            key = _scrypt(password, base64.b64decode(parts[4]), n, r, p)
+            ok = hmac.compare_digest(key, base64.b64decode(parts[5]))
+            return ok, ok and (KDF != "scrypt" or (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P))
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            iterations = int(parts[1])
+            key = hashlib.pbkdf2_hmac("sha256", password.encode(), base64.b64decode(parts[2]), iterations,
+                                      KEY_BYTES)
+            ok = hmac.compare_digest(key, base64.b64decode(parts[3]))
+            return ok, ok and (KDF != "pbkdf2" or iterations != PBKDF2_ITERATIONS)
+    except (ValueError, TypeError):
+        return False, False
+    # legacy plain text row
+    ok = hmac.compare_digest(password.encode(), stored.encode())
+    return ok, ok
+
+
+_executor = None
+
+
+def get_executor():
+    """The bounded hashing pool, started on first use."""
+    global _executor
+    if _executor is None:
+        if HASH_POOL == "process":
+            _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="laf-hash")
+    return _executor
+
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), hash_password, password)
+
+
+async def verify_password_async(password: str, stored: str) -> tuple[bool, bool]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), verify_password, password, stored)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,83 @@
+# imports
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+# RENDERED FRAGMENT CACHE
+# What I need: the dashboard lists are the same HTML for everyone, only the delete buttons differ
+# (owner or admin). So the list part of home.html is rendered once per (list, status, page, data version)
+# and kept here, with the per-post controls cut out:
+#   - the template wraps each post's controls in <!--controls--> ... <!--/controls-->
+#   - Fragment splits the HTML on those markers and pre-joins the admin and "owns nothing" versions
+#   - a user who owns posts on the page gets their controls put back in a single join
+# The data version comes from DataVersions (bumped by triggers on every write to the posts), so a write
+# in any worker makes every older entry unreachable and the LRU ages it out.
+FRAGMENT_CACHE_SIZE = int(os.environ.get("LAF_FRAGMENT_CACHE_SIZE", "256"))
+CONTROLS = re.compile(r"<!--controls-->(.*?)<!--/controls-->", re.S)
+
+
+class Fragment:
+    """A rendered post list plus what the page around it needs (count, next page cursor)."""
+
+    def __init__(self, html: str, owners: list, count: int, next_after):
+        # even pieces are shared HTML, odd pieces are the controls of post (index // 2)
+        self.pieces = CONTROLS.split(html)
+        self.owners = owners
+        self.owner_set = set(owners)
+        self.count = count
+        self.next_after = next_after
+        self.admin_html = Markup("".join(self.pieces))
+        self.plain_html = Markup("".join(self.pieces[::2]))
+
+    def render(self, user_id: str, is_admin: bool = False) -> Markup:
+        if is_admin:
+            return self.admin_html
+        if user_id not in self.owner_set:
+            return self.plain_html
+        out = []
+        for i, piece in enumerate(self.pieces):
+            if i % 2 == 0 or self.owners[i // 2] == user_id:
+                out.append(piece)
+        return Markup("".join(out))
+
+
+class FragmentCache:
+    """Small thread-safe LRU of Fragments."""
+
+    def __init__(self, max_size: int = FRAGMENT_CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            frag = self._items.get(key)
+            if frag is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return frag
+
+    def put(self, key, frag: Fragment):
+        with self._lock:
+            self._items[key] = frag
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+fragment_cache = FragmentCache()
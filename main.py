@@ -1,13 +1,26 @@
-from fastapi import FastAPI, Request, Form, Response, Cookie, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, Request, Form, Response, Cookie, HTTPException, UploadFile, File
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
 from starlette import status
+from contextlib import asynccontextmanager
 import uuid
 from typing import Optional
-
-# Database functions
-from database.db import (
+from datetime import date, timedelta
+
+# Database functions (async versions that run on the DB thread pool so the event loop never blocks)
+from database import async_db, passwords, matching
+from database.ImportLAF import iter_records, text_stream, guess_format
+from database import ExportLAF, ArchiveLAF, RollupLAF
+from database.migrations import migrate
+from database.db import PAGE_SIZE, VALID_CATEGORIES, clamp_limit, next_cursor, get_schema_catalog, stream_export
+import sessions
+from sessions import SESSION_COOKIE, SESSION_TTL
+from fragments import Fragment, fragment_cache
+import conditional
+import static_assets
+import api
+import metrics
+from database.async_db import (
     get_lost_posts,
     get_found_posts,
     get_lost_post,
@@ -16,34 +29,75 @@ from database.db import (
     delete_lost_post,
     add_found_post,
     delete_found_post,
+    import_found_posts,
     add_user,
-    verify_login,
-    get_user_by_id,
+    get_login_user,
+    set_password_hash,
     claim_item,
     get_all_unresolved_matches,
     get_matches_by_user,
     admin_resolve_match,
-    get_lost_posts_by_user
+    admin_resolve_matches,
+    search_posts,
+    get_suggestions_for_lost,
+    get_suggestions_for_found,
+    get_lost_posts_by_user,
+    get_data_versions,
+    get_post_version,
+    get_dashboard_stats,
+    get_report
 )
 
 # --- FastAPI Setup ---
-app = FastAPI()
-app.mount("/static", StaticFiles(directory="static"), name="static")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # bring the schema up to date (and turn on WAL) before serving anything
+    migrate()
+    # load the table/column catalog once so registration and login never have to introspect
+    get_schema_catalog()
+    # fingerprint + precompress static/ if it changed, so static_url() in the templates has the new names
+    static_assets.ensure_built()
+    # index open lost / available found posts so new posts get match suggestions right away
+    matching.matcher.start()
+    # ... and keep that index in sync with what other workers / scripts change every LAF_MATCHER_REFRESH seconds
+    refresher = matching.start_refresh()
+    # move long-resolved matches and posts out of the hot tables every LAF_ARCHIVE_INTERVAL seconds
+    archiver = ArchiveLAF.start()
+    # roll new posts/resolutions into the daily report tables every LAF_ROLLUP_INTERVAL seconds
+    rollup = RollupLAF.start()
+    yield
+    await RollupLAF.stop(rollup)
+    await ArchiveLAF.stop(archiver)
+    await matching.stop_refresh(refresher)
+    matching.matcher.stop()
+    # shut down the DB worker threads and close pooled connections
+    async_db.shutdown()
+    passwords.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+app.mount("/static", static_assets.PrecompressedStaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_assets.static_url
+app.include_router(api.router)
+# per-route latency / status counts and per-request SQL stats, shown on /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+app.include_router(metrics.router)
 
-# --- Application Constants ---
-VALID_CATEGORIES = [
-    'Electronics', 'Clothing', 'Accessories',
-    'Documents', 'Keys', 'Books', 'Other'
-]
+# --- Simple Session Helper (using cookies) ---
+async def get_current_user(session: Optional[str] = None):
+    """Get current logged in user from the signed session cookie (no Users lookup needed)"""
+    user = await sessions.current_user(session)
+    if user:
+        # the templates (layout.html, matches.html, ...) read these names
+        user["user_name"], user["user_role"] = user["name"], user["role"]
+    return user
 
 
-# --- Simple Session Helper (using cookies) ---
-def get_current_user(user_id: Optional[str] = None):
-    """Get current logged in user from cookie or passed ID"""
-    if not user_id:
-        return None
-    return get_user_by_id(user_id)
+def set_session_cookie(response: Response, user: dict):
+    """Issue a signed session token for the user and store it in the session cookie"""
+    response.set_cookie(key=SESSION_COOKIE, value=sessions.issue_token(user), max_age=SESSION_TTL,
+                        httponly=True, samesite="lax")
 
 
 # --- Authentication Routes ---
@@ -69,12 +123,14 @@ async def register_user(
     """Handle user registration"""
     user_id = name[0].lower() + uuid.uuid4().hex[:7]
 
-    success, message = add_user(user_id, name, email, password, phone, role)
+    # hash on the hashing pool, not on the event loop or a DB thread
+    password_hash = await passwords.hash_password_async(password)
+    success, message = await add_user(user_id, name, email, password_hash, phone, role, password_is_hashed=True)
 
     if success:
         # Automatically log the user in upon successful registration
         response = RedirectResponse("/", status_code=status.HTTP_303_SEE_OTHER)
-        response.set_cookie(key="user_id", value=user_id, httponly=True)
+        set_session_cookie(response, {"user_id": user_id, "name": name, "role": role})
         return response
     else:
         # Re-render form with error and submitted data
@@ -102,68 +158,127 @@ async def login_user(
         password: str = Form(...)
 ):
     """Handle user login and set cookie"""
-    user = verify_login(user_id_or_email, password)
+    user = await get_login_user(user_id_or_email)
+    ok = False
+    if user:
+        stored = user.pop('stored_password')
+        ok, needs_rehash = await passwords.verify_password_async(password, stored)
 
-    if not user:
+    if not ok:
         return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid User ID/Email or Password"})
 
-    # Normalize to a dict-like user object (ensure we have a canonical user record)
-    try:
-        # preferred: user is a mapping with 'user_id'
-        user_id = user['user_id']
-    except Exception:
-        # fallback: assume first element is user_id (tuple/sequence)
-        user_id = user[0]
-
-    full_user = get_user_by_id(user_id)
-    if not full_user:
-        return templates.TemplateResponse("login.html", {"request": request, "error": "User record not found after login"})
+    if needs_rehash:
+        # upgrade plain text / old-settings rows now that we know the password
+        await set_password_hash(user['user_id'], await passwords.hash_password_async(password))
 
     response = RedirectResponse("/", status_code=status.HTTP_303_SEE_OTHER)
-    response.set_cookie(key="user_id", value=full_user['user_id'], httponly=True)
+    set_session_cookie(response, user)
     return response
 
 
 @app.get("/logout", response_class=RedirectResponse)
-async def logout_user():
-    """Clear session cookie and redirect to login"""
+async def logout_user(session: Optional[str] = Cookie(None)):
+    """Revoke the session token, clear the cookie and redirect to login"""
+    await sessions.revoke_token(session)
     response = RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
-    response.delete_cookie(key="user_id")
+    response.delete_cookie(key=SESSION_COOKIE)
     return response
 
 
 # --- Core Application Routes (Requires Login) ---
 
 @app.get("/", response_class=HTMLResponse)
-async def home_dashboard(request: Request, user_id: Optional[str] = Cookie(None)):
-    """Display the main dashboard with lost and found items"""
-    current_user = get_current_user(user_id)
+async def home_dashboard(
+        request: Request,
+        lost_after: Optional[str] = None,
+        found_after: Optional[str] = None,
+        limit: int = PAGE_SIZE,
+        session: Optional[str] = Cookie(None)
+):
+    """Display the main dashboard with lost and found items (one page of each list)"""
+    current_user = await get_current_user(session)
     if not current_user:
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    lost_posts = get_lost_posts(status='open')
-    found_posts = get_found_posts(status='available')
+    limit = clamp_limit(limit)
+    versions = await get_data_versions()
+    etag, last_modified = conditional.validators(current_user, versions['version'], versions['updated_at'],
+                                                 'home', lost_after, found_after, limit)
+    cached = conditional.not_modified(request, etag, last_modified)
+    if cached:
+        return cached
 
-    return templates.TemplateResponse(
+    try:
+        lost_list = await cached_post_list('lost', lost_after, limit, versions['counters'].get('lost', 0))
+        found_list = await cached_post_list('found', found_after, limit, versions['counters'].get('found', 0))
+    except ValueError as e:
+        return RedirectResponse(f"/error?msg={e}", status_code=status.HTTP_303_SEE_OTHER)
+    stats = await get_dashboard_stats()
+
+    is_admin = current_user['role'] == 'admin'
+    response = templates.TemplateResponse(
         "home.html",
         {
             "request": request,
-            "lost_posts": lost_posts,
-            "found_posts": found_posts,
+            "lost_list": lost_list.render(current_user['user_id'], is_admin),
+            "found_list": found_list.render(current_user['user_id'], is_admin),
+            "lost_count": lost_list.count,
+            "found_count": found_list.count,
+            "stats": stats,
+            "lost_after": lost_after,
+            "found_after": found_after,
+            "lost_next": lost_list.next_after,
+            "found_next": found_list.next_after,
+            "limit": limit,
             **current_user
         }
     )
+    return conditional.add_validators(response, etag, last_modified)
+
+
+# kind -> (fragment template, list query, status shown on the dashboard, id column)
+POST_LISTS = {
+    'lost': ("fragments/lost_list.html", get_lost_posts, 'open', 'lost_id'),
+    'found': ("fragments/found_list.html", get_found_posts, 'available', 'found_id'),
+}
+
+
+async def cached_post_list(kind: str, after: Optional[str], limit: int, version: int) -> Fragment:
+    """
+    One dashboard page of a post list, from the fragment cache when the data hasn't changed.
+    version has to be read before the rows: if a write sneaks in between, the entry holds newer rows
+    than its version says, which is harmless (the next request sees a new version and misses).
+    """
+    template, fetch, status_name, id_col = POST_LISTS[kind]
+    key = (kind, status_name, after, limit, version)
+    frag = fragment_cache.get(key)
+    if frag is None:
+        posts = await fetch(status=status_name, after=after, limit=limit)
+        html = templates.get_template(template).render(posts=posts)
+        frag = Fragment(html, [p['user_id'] for p in posts], len(posts),
+                        next_cursor(posts, limit, 'date_posted', id_col))
+        fragment_cache.put(key, frag)
+    return frag
 
 
 # --- Lost Post Detail/Management ---
 
 @app.get("/lost/{lost_id}", response_class=HTMLResponse)
-async def lost_detail(request: Request, lost_id: str, user_id: Optional[str] = Cookie(None)):
-    current_user = get_current_user(user_id)
+async def lost_detail(request: Request, lost_id: str, session: Optional[str] = Cookie(None)):
+    current_user = await get_current_user(session)
     if not current_user:
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    post = get_lost_post(lost_id)
+    # cheap version lookup first, a browser that already has this page gets a 304
+    version = await get_post_version('lost', lost_id)
+    if version:
+        etag, last_modified = conditional.validators(current_user, version['version'], version['updated_at'],
+                                                     'lost', lost_id)
+        cached = conditional.not_modified(request, etag, last_modified)
+        if cached:
+            return cached
+
+    post = await get_lost_post(lost_id) if version else None
     if not post:
         return templates.TemplateResponse(
             "error.html",
@@ -171,39 +286,53 @@ async def lost_detail(request: Request, lost_id: str, user_id: Optional[str] = C
             status_code=status.HTTP_404_NOT_FOUND
         )
 
-    return templates.TemplateResponse(
+    # Found items the match engine thinks could be this one
+    suggestions = await get_suggestions_for_lost(lost_id) if post['status'] == 'open' else []
+
+    response = templates.TemplateResponse(
         "lost_detail.html",
         {
             "request": request,
             "post": post,
+            "suggestions": suggestions,
             **current_user
         }
     )
+    return conditional.add_validators(response, etag, last_modified)
 
 
 @app.post("/delete-lost/{lost_id}", response_class=RedirectResponse)
-async def delete_lost_item(lost_id: str, user_id: Optional[str] = Cookie(None)):
-    current_user = get_current_user(user_id)
+async def delete_lost_item(lost_id: str, session: Optional[str] = Cookie(None)):
+    current_user = await get_current_user(session)
     if not current_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not logged in")
 
-    post = get_lost_post(lost_id)
+    post = await get_lost_post(lost_id)
     if not post or (post['user_id'] != current_user['user_id'] and current_user['role'] != 'admin'):
         return RedirectResponse("/error?msg=Unauthorized to delete this post.", status_code=status.HTTP_303_SEE_OTHER)
 
-    delete_lost_post(lost_id)
+    await delete_lost_post(lost_id)
     return RedirectResponse("/", status_code=status.HTTP_303_SEE_OTHER)
 
 
 # --- Found Post Detail/Management (with Claiming support) ---
 
 @app.get("/found/{found_id}", response_class=HTMLResponse)
-async def found_detail(request: Request, found_id: str, user_id: Optional[str] = Cookie(None)):
-    current_user = get_current_user(user_id)
+async def found_detail(request: Request, found_id: str, session: Optional[str] = Cookie(None)):
+    current_user = await get_current_user(session)
     if not current_user:
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    post = get_found_post(found_id)
+    # cheap version lookup first, a browser that already has this page gets a 304
+    version = await get_post_version('found', found_id)
+    if version:
+        etag, last_modified = conditional.validators(current_user, version['version'], version['updated_at'],
+                                                     'found', found_id)
+        cached = conditional.not_modified(request, etag, last_modified)
+        if cached:
+            return cached
+
+    post = await get_found_post(found_id) if version else None
     if not post:
         return templates.TemplateResponse(
             "error.html",
@@ -212,38 +341,42 @@ async def found_detail(request: Request, found_id: str, user_id: Optional[str] =
         )
 
     # Fetch the user's open lost posts for claiming the found item
-    lost_posts_open = get_lost_posts_by_user(current_user['user_id'], status='open')
+    lost_posts_open = await get_lost_posts_by_user(current_user['user_id'], status='open')
+    # Lost reports the match engine thinks this item could belong to
+    suggestions = await get_suggestions_for_found(found_id) if post['status'] == 'available' else []
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "found_detail.html",
         {
             "request": request,
             "post": post,
             "lost_posts_open": lost_posts_open,
+            "suggestions": suggestions,
             **current_user
         }
     )
+    return conditional.add_validators(response, etag, last_modified)
 
 
 @app.post("/delete-found/{found_id}", response_class=RedirectResponse)
-async def delete_found_item(found_id: str, user_id: Optional[str] = Cookie(None)):
-    current_user = get_current_user(user_id)
+async def delete_found_item(found_id: str, session: Optional[str] = Cookie(None)):
+    current_user = await get_current_user(session)
     if not current_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not logged in")
 
-    post = get_found_post(found_id)
+    post = await get_found_post(found_id)
     if not post or (post['user_id'] != current_user['user_id'] and current_user['role'] != 'admin'):
         return RedirectResponse("/error?msg=Unauthorized to delete this post.", status_code=status.HTTP_303_SEE_OTHER)
 
-    delete_found_post(found_id)
+    await delete_found_post(found_id)
     return RedirectResponse("/", status_code=status.HTTP_303_SEE_OTHER)
 
 
 # --- Lost Post Routes (Create) ---
 
 @app.get("/add-lost", response_class=HTMLResponse)
-async def add_lost_post_form(request: Request, user_id: Optional[str] = Cookie(None)):
-    current_user = get_current_user(user_id)
+async def add_lost_post_form(request: Request, session: Optional[str] = Cookie(None)):
+    current_user = await get_current_user(session)
     if not current_user:
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
 
@@ -266,16 +399,16 @@ async def create_lost_post(
         description: str = Form(...),
         date_lost: str = Form(...),
         last_seen_location: str = Form(...),
-        user_id: Optional[str] = Cookie(None)
+        session: Optional[str] = Cookie(None)
 ):
-    current_user = get_current_user(user_id)
+    current_user = await get_current_user(session)
     if not current_user:
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
 
     new_id = "lost" + str(uuid.uuid4().hex[:8])
 
     try:
-        add_lost_post(
+        await add_lost_post(
             lost_id=new_id,
             user_id=current_user['user_id'],
             item_name=item_name,
@@ -300,8 +433,8 @@ async def create_lost_post(
 
 # --- Found Post Routes (Create) ---
 @app.get("/add-found", response_class=HTMLResponse)
-async def add_found_post_form(request: Request, user_id: Optional[str] = Cookie(None)):
-    current_user = get_current_user(user_id)
+async def add_found_post_form(request: Request, session: Optional[str] = Cookie(None)):
+    current_user = await get_current_user(session)
     if not current_user:
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
 
@@ -325,16 +458,16 @@ async def create_found_post(
         date_found: str = Form(...),
         found_location: str = Form(...),
         storage_location: str = Form("Campus Security Office"),
-        user_id: Optional[str] = Cookie(None)
+        session: Optional[str] = Cookie(None)
 ):
-    current_user = get_current_user(user_id)
+    current_user = await get_current_user(session)
     if not current_user:
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
 
     new_id = "found" + str(uuid.uuid4().hex[:8])
 
     try:
-        add_found_post(
+        await add_found_post(
             found_id=new_id,
             user_id=current_user['user_id'],
             item_name=item_name,
@@ -364,14 +497,14 @@ async def create_found_post(
 async def claim_found_item(
         found_id: str,
         lost_id: str = Form(...),
-        user_id: Optional[str] = Cookie(None)
+        session: Optional[str] = Cookie(None)
 ):
     """Route for a user to claim a found item (create a match)"""
-    current_user = get_current_user(user_id)
+    current_user = await get_current_user(session)
     if not current_user:
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    success, message = claim_item(lost_id, found_id, current_user['user_id'])
+    success, message = await claim_item(lost_id, found_id, current_user['user_id'])
 
     if success:
         return RedirectResponse("/matches", status_code=status.HTTP_303_SEE_OTHER)
@@ -381,38 +514,63 @@ async def claim_found_item(
 
 
 @app.get("/matches", response_class=HTMLResponse)
-async def view_matches(request: Request, user_id: Optional[str] = Cookie(None)):
+async def view_matches(
+        request: Request,
+        after: Optional[str] = None,
+        limit: int = PAGE_SIZE,
+        session: Optional[str] = Cookie(None)
+):
     """Display matches relevant to the current user (or all for admin)"""
-    current_user = get_current_user(user_id)
+    current_user = await get_current_user(session)
     if not current_user:
         return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    if current_user['role'] == 'admin':
-        matches = get_all_unresolved_matches()  # Admin sees only unresolved
-    else:
-        matches = get_matches_by_user(current_user['user_id'])  # User sees all of their matches
+    limit = clamp_limit(limit)
+    versions = await get_data_versions()
+    etag, last_modified = conditional.validators(current_user, versions['version'], versions['updated_at'],
+                                                 'matches', after, limit)
+    cached = conditional.not_modified(request, etag, last_modified)
+    if cached:
+        return cached
 
-    return templates.TemplateResponse(
+    try:
+        if current_user['role'] == 'admin':
+            matches = await get_all_unresolved_matches(after=after, limit=limit)  # Admin sees only unresolved
+            next_after = next_cursor(matches, limit, 'date_matched', 'match_id')
+            stats = await get_dashboard_stats()
+        else:
+            matches = await get_matches_by_user(current_user['user_id'], after=after, limit=limit)  # User sees all of their matches
+            next_after = next_cursor(matches, limit, 'resolved', 'date_matched', 'match_id')
+            stats = None
+    except ValueError as e:
+        return RedirectResponse(f"/error?msg={e}", status_code=status.HTTP_303_SEE_OTHER)
+
+    response = templates.TemplateResponse(
         "matches.html",
         {
             "request": request,
             "matches": matches,
+            "stats": stats,
+            "after": after,
+            "next_after": next_after,
+            "limit": limit,
             **current_user
         }
     )
+    return conditional.add_validators(response, etag, last_modified)
 
 
 @app.post("/admin/resolve/{match_id}", response_class=RedirectResponse)
-async def resolve_match(request: Request, match_id: int, user_id: Optional[str] = Cookie(None)):
+async def resolve_match(request: Request, match_id: int, session: Optional[str] = Cookie(None)):
     """Admin route to resolve a match"""
-    current_user = get_current_user(user_id)
+    current_user = await get_current_user(session)
     if not current_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not logged in")
 
     if current_user['role'] != 'admin':
         return RedirectResponse("/error?msg=Unauthorized: Admin access required", status_code=status.HTTP_303_SEE_OTHER)
 
-    success, message = admin_resolve_match(match_id)
+    success, message = await admin_resolve_match(match_id)
 
     if success:
         return RedirectResponse("/matches", status_code=status.HTTP_303_SEE_OTHER)
@@ -420,9 +578,207 @@ async def resolve_match(request: Request, match_id: int, user_id: Optional[str]
         return RedirectResponse(f"/error?msg={message}", status_code=status.HTTP_303_SEE_OTHER)
 
 
+@app.post("/admin/resolve", response_class=RedirectResponse)
+async def resolve_matches(match_ids: list[int] = Form([]), session: Optional[str] = Cookie(None)):
+    """Admin route to resolve every checked match at once"""
+    current_user = await get_current_user(session)
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not logged in")
+
+    if current_user['role'] != 'admin':
+        return RedirectResponse("/error?msg=Unauthorized: Admin access required", status_code=status.HTTP_303_SEE_OTHER)
+
+    try:
+        results = await admin_resolve_matches(match_ids)
+    except ValueError as e:
+        return RedirectResponse(f"/error?msg={e}", status_code=status.HTTP_303_SEE_OTHER)
+
+    failed = [r for r in results if not r['resolved']]
+    if not failed:
+        return RedirectResponse("/matches", status_code=status.HTTP_303_SEE_OTHER)
+    details = "; ".join(f"{r['match_id']}: {r['message']}" for r in failed[:10])
+    msg = f"Resolved {len(results) - len(failed)} of {len(results)} matches. Not resolved: {details}"
+    return RedirectResponse(f"/error?msg={msg}", status_code=status.HTTP_303_SEE_OTHER)
+
+
+@app.post("/admin/rescore-matches", response_class=RedirectResponse)
+async def rescore_matches(session: Optional[str] = Cookie(None)):
+    """Admin route to recompute every match suggestion"""
+    current_user = await get_current_user(session)
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not logged in")
+
+    if current_user['role'] != 'admin':
+        return RedirectResponse("/error?msg=Unauthorized: Admin access required", status_code=status.HTTP_303_SEE_OTHER)
+
+    await async_db.run_db(matching.rescore_all)
+    return RedirectResponse("/matches", status_code=status.HTTP_303_SEE_OTHER)
+
+
+# --- Search ---
+
+@app.get("/search", response_class=HTMLResponse)
+async def search(
+        request: Request,
+        q: str = "",
+        kind: str = "all",
+        category: Optional[str] = None,
+        status_filter: Optional[str] = None,
+        limit: int = PAGE_SIZE,
+        session: Optional[str] = Cookie(None)
+):
+    """Full-text search over lost and found posts, best matches first"""
+    current_user = await get_current_user(session)
+    if not current_user:
+        return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
+
+    if kind not in ('all', 'lost', 'found'):
+        kind = 'all'
+    if category not in VALID_CATEGORIES:
+        category = None
+    results = await search_posts(q, kind=kind, category=category, status=status_filter or None,
+                                 limit=clamp_limit(limit))
+
+    return templates.TemplateResponse(
+        "search.html",
+        {
+            "request": request,
+            "results": results,
+            "q": q,
+            "kind": kind,
+            "category": category,
+            "status_filter": status_filter,
+            "categories": VALID_CATEGORIES,
+            **current_user
+        }
+    )
+
+
+# --- Admin Bulk Import ---
+
+@app.get("/admin/import", response_class=HTMLResponse)
+async def import_form(request: Request, session: Optional[str] = Cookie(None)):
+    current_user = await get_current_user(session)
+    if not current_user:
+        return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
+    if current_user['role'] != 'admin':
+        return RedirectResponse("/error?msg=Unauthorized: Admin access required", status_code=status.HTTP_303_SEE_OTHER)
+
+    return templates.TemplateResponse(
+        "admin_import.html",
+        {"request": request, "categories": VALID_CATEGORIES, "report": None, **current_user}
+    )
+
+
+@app.post("/admin/import", response_class=HTMLResponse)
+async def import_found_items(request: Request, file: UploadFile = File(...), session: Optional[str] = Cookie(None)):
+    """Admin route to bulk import found items (filed under the admin's account)"""
+    current_user = await get_current_user(session)
+    if not current_user:
+        return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
+    if current_user['role'] != 'admin':
+        return RedirectResponse("/error?msg=Unauthorized: Admin access required", status_code=status.HTTP_303_SEE_OTHER)
+
+    # the upload is already spooled to a temp file, the rows are parsed and inserted as they're read
+    records = iter_records(text_stream(file.file), guess_format(file.filename))
+    report = await import_found_posts(records, current_user['user_id'])
+
+    return templates.TemplateResponse(
+        "admin_import.html",
+        {"request": request, "categories": VALID_CATEGORIES, "report": report, **current_user}
+    )
+
+
+# --- Admin Exports ---
+
+@app.get("/admin/export", response_class=HTMLResponse)
+async def export_form(request: Request, session: Optional[str] = Cookie(None)):
+    current_user = await get_current_user(session)
+    if not current_user:
+        return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
+    if current_user['role'] != 'admin':
+        return RedirectResponse("/error?msg=Unauthorized: Admin access required", status_code=status.HTTP_303_SEE_OTHER)
+
+    return templates.TemplateResponse(
+        "admin_export.html",
+        {"request": request, "categories": VALID_CATEGORIES, **current_user}
+    )
+
+
+@app.get("/admin/export/{kind}")
+async def export_rows(
+        kind: str,
+        fmt: str = "csv",
+        status_filter: Optional[str] = None,
+        category: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        session: Optional[str] = Cookie(None)
+):
+    """Admin route to download lost posts, found posts or matches as CSV/JSONL, streamed a batch at a time"""
+    current_user = await get_current_user(session)
+    if not current_user:
+        return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
+    if current_user['role'] != 'admin':
+        return RedirectResponse("/error?msg=Unauthorized: Admin access required", status_code=status.HTTP_303_SEE_OTHER)
+    if kind not in ExportLAF.EXPORT_TABLES or fmt not in ExportLAF.FORMATS:
+        return RedirectResponse("/error?msg=Unknown export", status_code=status.HTTP_303_SEE_OTHER)
+
+    columns = ExportLAF.export_columns(kind)
+    try:
+        batches = stream_export(kind, columns, status=status_filter or None, category=category or None,
+                                date_from=date_from or None, date_to=date_to or None)
+    except ValueError as e:
+        return RedirectResponse(f"/error?msg={e}", status_code=status.HTTP_303_SEE_OTHER)
+
+    async def body():
+        if fmt == 'csv':
+            yield ExportLAF.csv_header(columns)
+        async for batch in async_db.iterate(batches):
+            yield ExportLAF.encode_batch(fmt, columns, batch)
+
+    return StreamingResponse(
+        body(),
+        media_type=ExportLAF.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{fmt}"'}
+    )
+
+
+# --- Admin Reports ---
+
+@app.get("/admin/reports", response_class=HTMLResponse)
+async def reports_page(
+        request: Request,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        session: Optional[str] = Cookie(None)
+):
+    """Admin route for weekly volume, hotspot locations and time to resolution (read from the daily rollups)"""
+    current_user = await get_current_user(session)
+    if not current_user:
+        return RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
+    if current_user['role'] != 'admin':
+        return RedirectResponse("/error?msg=Unauthorized: Admin access required", status_code=status.HTTP_303_SEE_OTHER)
+
+    # default: the last year
+    today = date.today()
+    date_to = date_to or today.isoformat()
+    date_from = date_from or (today - timedelta(days=365)).isoformat()
+    try:
+        report = await get_report(date_from, date_to)
+    except ValueError as e:
+        return RedirectResponse(f"/error?msg={e}", status_code=status.HTTP_303_SEE_OTHER)
+
+    return templates.TemplateResponse(
+        "admin_reports.html",
+        {"request": request, "report": report, "date_from": date_from, "date_to": date_to,
+         "categories": VALID_CATEGORIES, **current_user}
+    )
+
+
 @app.get("/error", response_class=HTMLResponse)
-async def error_page(request: Request, msg: Optional[str] = None, user_id: Optional[str] = Cookie(None)):
-    current_user = get_current_user(user_id)
+async def error_page(request: Request, msg: Optional[str] = None, session: Optional[str] = Cookie(None)):
+    current_user = await get_current_user(session)
     error_message = msg if msg else "An unexpected error occurred."
 
     # Context for layout.html even if user isn't fully logged in (but may have a stale cookie)
@@ -0,0 +1,198 @@
+# imports
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from typing import Optional
+
+from fastapi import APIRouter, Cookie, Header, HTTPException, Response
+from starlette import status
+
+import sessions
+from database import db
+from fragments import fragment_cache
+
+# METRICS
+# What I need: which route is slow, and is it slow because of SQL or waiting for a pooled connection.
+# MetricsMiddleware wraps every request: latency histogram and status counts per route, and a
+# db.QueryStats for the request so the pooled connections can count its SQL statements, SQL time and
+# pool wait (see QUERY METRICS in db.py). GET /metrics shows it all in Prometheus text format, for admins
+# (session cookie) or for a scraper sending "Authorization: Bearer $LAF_METRICS_TOKEN".
+# Routes are labelled by their template (/lost/{lost_id}), never the raw path, so the label count stays small.
+METRICS_TOKEN = os.environ.get("LAF_METRICS_TOKEN")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+router = APIRouter(tags=["metrics"])
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    """Prometheus counter with labels."""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, values: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, values)} {value}" for values, value in items]
+        return lines
+
+
+class Histogram:
+    """Prometheus histogram (cumulative le buckets, _sum and _count) with labels."""
+
+    def __init__(self, name: str, help: str, labels: tuple, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [count per bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, values: tuple, amount: float):
+        i = bisect_left(self.buckets, amount)
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((values, (list(counts), total)) for values, (counts, total) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in items:
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                running += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), values + (bound,))} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {running}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("laf_http_request_duration_seconds", "Time to send the whole response.",
+                            ("method", "route"), LATENCY_BUCKETS)
+RESPONSES = Counter("laf_http_responses_total", "Responses sent, by status code.", ("method", "route", "status"))
+REQUEST_STATEMENTS = Histogram("laf_request_sql_statements", "SQL statements run for one request (triggers included).",
+                               ("method", "route"), STATEMENT_BUCKETS)
+REQUEST_SQL_SECONDS = Histogram("laf_request_sql_seconds", "Time spent executing and fetching SQL for one request.",
+                                ("method", "route"), LATENCY_BUCKETS)
+REQUEST_POOL_WAIT = Histogram("laf_request_pool_wait_seconds", "Time one request waited for pooled connections.",
+                              ("method", "route"), LATENCY_BUCKETS)
+REQUEST_METRICS = (REQUEST_SECONDS, RESPONSES, REQUEST_STATEMENTS, REQUEST_SQL_SECONDS, REQUEST_POOL_WAIT)
+_in_progress = 0
+
+
+def route_label(scope: dict) -> str:
+    # the router leaves the matched route in the scope, static files are a mount, anything else is a 404
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware (no BaseHTTPMiddleware, so streamed responses stay streamed)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_progress
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = db.QueryStats(f"{scope['method']} {scope['path']}")
+        token = db.current_query_stats.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        _in_progress += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_progress -= 1
+            db.current_query_stats.reset(token)
+            labels = (scope["method"], route_label(scope))
+            REQUEST_SECONDS.observe(labels, elapsed)
+            RESPONSES.inc(labels + (status_code,))
+            REQUEST_STATEMENTS.observe(labels, stats.statements)
+            REQUEST_SQL_SECONDS.observe(labels, stats.seconds)
+            REQUEST_POOL_WAIT.observe(labels, stats.pool_wait)
+
+
+def _gauges(prefix: str, help: str, values: dict) -> list:
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines += [f"# HELP {prefix}_{key} {help} ({key}).", f"# TYPE {prefix}_{key} gauge",
+                      f"{prefix}_{key} {value}"]
+    return lines
+
+
+def render() -> str:
+    """Everything in Prometheus text format."""
+    lines = ["# HELP laf_http_requests_in_progress Requests being handled right now.",
+             "# TYPE laf_http_requests_in_progress gauge", f"laf_http_requests_in_progress {_in_progress}"]
+    for metric in REQUEST_METRICS:
+        lines += metric.render()
+
+    totals = sorted(db.query_totals_snapshot().items())
+    for name, help, index in (("laf_sql_executions_total", "Executions of each SQL statement.", 0),
+                              ("laf_sql_seconds_total", "Time spent executing and fetching each SQL statement.", 1),
+                              ("laf_sql_slow_total", f"Executions slower than {db.SLOW_QUERY_MS} ms.", 2)):
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+        lines += [f"{name}{_labels(('query',), (query,))} {values[index]}" for query, values in totals]
+
+    lines += _gauges("laf_db_pool", "Connection pool", db.pool_stats())
+    lines += _gauges("laf_write_batcher", "Group-commit writer", db.write_batcher_stats())
+    lines += _gauges("laf_write_contention", "Claims and resolves waiting on the write lock", db.contention_stats())
+    lines += _gauges("laf_fragment_cache", "Fragment cache", fragment_cache.stats())
+    return "\n".join(lines) + "\n"
+
+
+async def _allowed(session: Optional[str], authorization: Optional[str]) -> bool:
+    if METRICS_TOKEN and authorization and authorization.startswith("Bearer "):
+        return secrets.compare_digest(authorization[7:].encode(), METRICS_TOKEN.encode())
+    user = await sessions.current_user(session)
+    return bool(user) and user['role'] == 'admin'
+
+
+@router.get("/metrics")
+async def metrics(session: Optional[str] = Cookie(None), authorization: Optional[str] = Header(None)):
+    """Prometheus metrics (admins, or the LAF_METRICS_TOKEN bearer token)."""
+    if not await _allowed(session, authorization):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return Response(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
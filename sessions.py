@@ -0,0 +1,187 @@
+# imports
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
+from database import db
+from database.async_db import run_db
+
+# SIGNED SESSION TOKENS
+# The session cookie used to be the raw user_id, so every request had to look the user up in the
+# database to learn their name and role. Now login/register hand out a token that carries
+# user_id, name and role, signed with HMAC-SHA256 and with an expiry. Any worker that has the same
+# secret can check it without touching the Users table.
+#
+# Tokens can't be "un-issued", so logouts and role changes go into the SessionRevocations table.
+# Each worker keeps an in-memory copy of that table and only re-reads new rows every
+# REVOCATION_REFRESH seconds.
+SESSION_COOKIE = "session"
+SESSION_TTL = int(os.environ.get("LAF_SESSION_TTL", str(8 * 60 * 60)))  # 8 hours
+REVOCATION_REFRESH = float(os.environ.get("LAF_REVOCATION_REFRESH", "5"))
+REVOCATION_PURGE = 60 * 60  # seconds between purges of revocations no live token can need
+SECRET_FILE = os.path.join(os.path.dirname(db.DB), ".session_secret")
+
+
+def _load_secret() -> bytes:
+    """
+    LAF_SESSION_SECRET if it's set, otherwise a random key kept in database/.session_secret so every
+    uvicorn worker (and restarts) sign with the same key.
+    """
+    env = os.environ.get("LAF_SESSION_SECRET")
+    if env:
+        return env.encode()
+    try:
+        # O_EXCL so two workers starting at the same time don't both write a different key
+        fd = os.open(SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    # the other worker may still be writing it
+    for _ in range(50):
+        with open(SECRET_FILE) as f:
+            key = f.read().strip()
+        if key:
+            return key.encode()
+        time.sleep(0.01)
+    raise RuntimeError(f"Session secret file {SECRET_FILE} is empty.")
+
+
+SECRET = _load_secret()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SECRET, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(user: dict, ttl: int = SESSION_TTL) -> str:
+    """Make a signed session token for a user dict (needs user_id, name and role)."""
+    now = time.time()
+    claims = {
+        "uid": user["user_id"],
+        "name": user["name"],
+        "role": user["role"],
+        "iat": now,
+        "exp": now + ttl,
+        "jti": secrets.token_urlsafe(12),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def read_token(token: str) -> Optional[dict]:
+    """Return the token's claims if the signature is good and it hasn't expired, otherwise None."""
+    try:
+        payload, signature = token.split(".")
+    except (AttributeError, ValueError):
+        return None
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+
+class RevocationList:
+    """In-memory copy of SessionRevocations, topped up from the database every REVOCATION_REFRESH seconds."""
+
+    def __init__(self, refresh_every: float = REVOCATION_REFRESH):
+        self.refresh_every = refresh_every
+        self.tokens = {}   # jti -> expires_at
+        self.users = {}    # user_id -> revoked_at (tokens issued before this are dead)
+        self._last_seen = 0.0
+        self._next_refresh = 0.0
+        self._next_purge = 0.0
+        self._lock = threading.Lock()
+
+    def _add(self, kind: str, key: str, revoked_at: float, expires_at: float):
+        if kind == "token":
+            self.tokens[key] = expires_at
+        else:
+            self.users[key] = max(revoked_at, self.users.get(key, 0.0))
+
+    def add(self, kind: str, key: str, revoked_at: float, expires_at: float):
+        """Record a revocation this worker just wrote, without waiting for the next refresh."""
+        with self._lock:
+            self._add(kind, key, revoked_at, expires_at)
+
+    def refresh(self):
+        """Pull revocations written since the last refresh (by this worker or any other)."""
+        # >= so a row written in the same instant as the last one we saw isn't skipped (re-adding is harmless)
+        # the table would only ever grow, so every REVOCATION_PURGE seconds the rows that can't match a
+        # live token any more (older than SESSION_TTL) are deleted, by whichever worker gets there first
+        if time.monotonic() >= self._next_purge:
+            db.purge_session_revocations(SESSION_TTL)
+            self._next_purge = time.monotonic() + REVOCATION_PURGE
+        rows = db.get_session_revocations(since=self._last_seen)
+        with self._lock:
+            for row in rows:
+                self._add(row["kind"], row["key"], row["revoked_at"], row["expires_at"])
+                self._last_seen = max(self._last_seen, row["revoked_at"])
+            now = time.time()
+            self.tokens = {k: exp for k, exp in self.tokens.items() if exp > now}
+            self.users = {k: at for k, at in self.users.items() if at > now - SESSION_TTL}
+            self._next_refresh = time.monotonic() + self.refresh_every
+
+    def due(self) -> bool:
+        return time.monotonic() >= self._next_refresh
+
+    def is_revoked(self, claims: dict) -> bool:
+        if claims["jti"] in self.tokens:
+            return True
+        return claims["iat"] <= self.users.get(claims["uid"], 0.0)
+
+    def reset(self):
+        with self._lock:
+            self.tokens.clear()
+            self.users.clear()
+            self._last_seen = 0.0
+            self._next_refresh = 0.0
+            self._next_purge = 0.0
+
+
+revocations = RevocationList()
+
+
+async def current_user(token: Optional[str]) -> Optional[dict]:
+    """
+    The logged in user from a session token, as {user_id, name, role, issued_at}, or None.
+    Only touches the database when the revocation list is due for a refresh.
+    """
+    if not token:
+        return None
+    claims = read_token(token)
+    if not claims:
+        return None
+    if revocations.due():
+        await run_db(revocations.refresh)
+    if revocations.is_revoked(claims):
+        return None
+    return {"user_id": claims["uid"], "name": claims["name"], "role": claims["role"], "issued_at": claims["iat"]}
+
+
+async def revoke_token(token: Optional[str]):
+    """Log a single session out (used by /logout)."""
+    claims = read_token(token) if token else None
+    if not claims:
+        return
+    revoked_at = await run_db(db.add_session_revocation, "token", claims["jti"], claims["exp"])
+    revocations.add("token", claims["jti"], revoked_at, claims["exp"])
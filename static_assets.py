@@ -0,0 +1,194 @@
+# imports
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional, without it only .gz variants are built
+    brotli = None
+
+# STATIC ASSET PIPELINE
+# What I need: the stylesheet shouldn't be re-downloaded uncompressed on every first visit.
+# build() copies every file in static/ to static/dist/<name>.<content hash><ext> and writes .br / .gz
+# next to it (only kept if they're actually smaller), plus a manifest.json of name -> fingerprinted name.
+# Because the name changes whenever the content does, those files can be cached forever (immutable).
+# Templates use static_url('stylesheet.css') to get the fingerprinted URL (or the plain /static/ one if
+# nothing was built). The app rebuilds on startup when a source file is newer than the manifest,
+# it can also be run by hand:
+#
+#   python -m static_assets
+STATIC_DIR = "static"
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST = os.path.join(DIST_DIR, "manifest.json")
+URL_PREFIX = "/static"
+HASH_LENGTH = 12
+COMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+IMMUTABLE = "public, max-age=31536000, immutable"
+# preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _write_atomic(path: str, data: bytes):
+    # temp file + rename so a request (or another worker building at the same time) never sees half a file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.chmod(tmp, 0o644)  # mkstemp makes it owner-only
+    os.replace(tmp, path)
+
+
+def _sources(static_dir: str):
+    dist = os.path.join(static_dir, "dist")
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root).startswith(os.path.abspath(dist)):
+            continue
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, static_dir).replace(os.sep, "/"), path
+
+
+def build(static_dir: str = STATIC_DIR) -> dict:
+    """Fingerprint and precompress everything in static/, returns the manifest."""
+    dist = os.path.join(static_dir, "dist")
+    manifest = {}
+    for rel, path in _sources(static_dir):
+        with open(path, "rb") as f:
+            data = f.read()
+        stem, ext = os.path.splitext(rel)
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+        target = os.path.join(dist, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        manifest[rel] = hashed
+        if os.path.exists(target):
+            continue  # same content, already built
+        _write_atomic(target, data)
+        if ext not in COMPRESS_EXTENSIONS:
+            continue
+        # mtime=0 so the .gz is byte-for-byte the same on every build
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(data):
+                _write_atomic(target + suffix, compressed)
+
+    os.makedirs(dist, exist_ok=True)
+    _write_atomic(os.path.join(dist, "manifest.json"), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def needs_build(static_dir: str = STATIC_DIR) -> bool:
+    manifest = os.path.join(static_dir, "dist", "manifest.json")
+    if not os.path.exists(manifest):
+        return True
+    built = os.path.getmtime(manifest)
+    return any(os.path.getmtime(path) > built for _, path in _sources(static_dir))
+
+
+_manifest = {}
+
+
+def load_manifest(path: str = MANIFEST) -> dict:
+    global _manifest
+    try:
+        with open(path) as f:
+            _manifest = json.load(f)
+    except (OSError, ValueError):
+        _manifest = {}
+    return _manifest
+
+
+def ensure_built():
+    """Build if anything in static/ changed since the last build, then load the manifest (app startup)."""
+    if needs_build():
+        build()
+    load_manifest()
+
+
+def static_url(name: str) -> str:
+    """URL for a file in static/, fingerprinted if it has been built (registered as a Jinja global)."""
+    hashed = _manifest.get(name)
+    if hashed:
+        return f"{URL_PREFIX}/dist/{hashed}"
+    return f"{URL_PREFIX}/{name}"
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class SendfileResponse(FileResponse):
+    """
+    FileResponse that hands the file to the server when it supports one of the ASGI zero-copy extensions
+    (http.response.pathsend / http.response.zerocopysend), so the bytes go out with sendfile() instead of
+    being read into Python in chunks. Falls back to the normal chunked FileResponse otherwise.
+    """
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions") or {}
+        zero_copy = "http.response.pathsend" in extensions or "http.response.zerocopysend" in extensions
+        if scope.get("method") == "HEAD" or not zero_copy:
+            await super().__call__(scope, receive, send)
+            return
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        else:
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f})
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles for static/: fingerprinted files under dist/ are sent as their .br/.gz variant when the
+    browser accepts it, with Cache-Control: immutable. Everything else is served as before.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        dist = os.path.abspath(os.path.join(str(self.directory), "dist"))
+        fingerprinted = os.path.abspath(full_path).startswith(dist + os.sep)
+        if not fingerprinted or full_path.endswith(("manifest.json", ".br", ".gz")):
+            response = SendfileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        else:
+            media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+            headers = {"Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+            path, stat = full_path, stat_result
+            accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+            for coding, suffix in ENCODINGS:
+                if coding in accepted and os.path.exists(full_path + suffix):
+                    path, stat = full_path + suffix, os.stat(full_path + suffix)
+                    headers["Content-Encoding"] = coding
+                    break
+            response = SendfileResponse(path, status_code=status_code, stat_result=stat, media_type=media_type,
+                                        headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    # python -m static_assets
+    built = build()
+    print(f"Built {len(built)} static files into {DIST_DIR}" + ("" if brotli else " (brotli not installed, .gz only)"))
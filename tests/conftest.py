@@ -0,0 +1,20 @@
+import pytest
+
+from database import db
+from database.migrations import migrate
+
+USER_ID = "950000001"
+
+
+@pytest.fixture
+def laf_db(tmp_path):
+    """A fresh, fully migrated database with one user, db.py pointed at it for the test."""
+    path = str(tmp_path / "lost_and_found.db")
+    migrate(path)
+    old = db.DB
+    db.DB = path
+    ok, message = db.add_user(USER_ID, "Test User", "test@uvm.edu", "password123")
+    assert ok, message
+    yield path
+    db.close_pool()
+    db.DB = old
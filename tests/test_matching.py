@@ -0,0 +1,67 @@
+import sqlite3
+
+from database import db, matching
+
+from tests.conftest import USER_ID
+
+
+def _delete_elsewhere(path: str, sql: str, *params):
+    # another worker / the sqlite3 shell, this process's matcher never hears about it
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def _suggestions(path: str) -> list:
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT lost_id, found_id FROM MatchSuggestions ORDER BY 1, 2").fetchall()
+    conn.close()
+    return rows
+
+
+def test_new_post_scored_against_post_deleted_elsewhere(laf_db):
+    matcher = matching.IncrementalMatcher()
+    matcher.start()
+    try:
+        for lost_id in ("lost_gone", "lost_kept"):
+            db.add_lost_post(lost_id, USER_ID, "Black iPhone 13", "Electronics", "black iphone cracked case",
+                             "2024-09-01", "Library")
+        _delete_elsewhere(laf_db, "DELETE FROM LostPosts WHERE lost_id = ?", "lost_gone")
+
+        db.add_found_post("found_new", USER_ID, "Black iPhone", "Electronics", "black iphone cracked case",
+                          "2024-09-02", "Library", "Campus Security Office")
+    finally:
+        matcher.stop()
+
+    assert db.get_found_post("found_new") is not None
+    assert _suggestions(laf_db) == [("lost_kept", "found_new")]
+    # the gone post was noticed while writing the suggestions and dropped from the index
+    assert "lost_gone" not in matcher.posts['lost']
+    assert "lost_kept" in matcher.posts['lost']
+
+
+def test_refresh_syncs_index_with_other_processes(laf_db, monkeypatch):
+    matcher = matching.IncrementalMatcher()
+    matcher.start()
+    try:
+        db.add_lost_post("lost_deleted", USER_ID, "Blue umbrella", "Other", "folding umbrella", "2024-09-01", "Library")
+        db.add_lost_post("lost_open", USER_ID, "Red scarf", "Clothing", "wool scarf", "2024-09-01", "Library")
+        _delete_elsewhere(laf_db, "DELETE FROM LostPosts WHERE lost_id = ?", "lost_deleted")
+        # a post another worker added
+        matcher.stop()
+        db.add_found_post("found_elsewhere", USER_ID, "Umbrella", "Other", "blue umbrella", "2024-09-02",
+                          "Library", "Campus Security Office")
+
+        # posts this process indexed a moment ago may not be committed yet, refresh leaves them alone
+        assert matcher.refresh() == {'dropped': 0, 'added': 1}
+        monkeypatch.setattr(matching, "REFRESH_GRACE", -1)
+        _delete_elsewhere(laf_db, "UPDATE LostPosts SET status = 'closed' WHERE lost_id = ?", "lost_open")
+        assert matcher.refresh() == {'dropped': 2, 'added': 0}
+        assert set(matcher.posts['lost']) == set()
+        assert set(matcher.posts['found']) == {"found_elsewhere"}
+        # nothing changed since, nothing to do
+        assert matcher.refresh() == {'dropped': 0, 'added': 0}
+    finally:
+        matcher.stop()
@@ -0,0 +1,40 @@
+import sqlite3
+
+from database import db
+
+from tests.conftest import USER_ID
+
+
+def _resolved_match(lost_id: str, found_id: str) -> int:
+    db.add_lost_post(lost_id, USER_ID, "Black iPhone", "Electronics", "cracked case", "2024-09-01", "Library")
+    db.add_found_post(found_id, USER_ID, "iPhone", "Electronics", "black", "2024-09-02", "Library",
+                      "Campus Security Office")
+    ok, message = db.claim_item(lost_id, found_id, USER_ID)
+    assert ok, message
+    conn = sqlite3.connect(db.DB)
+    match_id = conn.execute("SELECT match_id FROM Matches WHERE lost_id = ?", (lost_id,)).fetchone()[0]
+    conn.close()
+    ok, message = db.admin_resolve_match(match_id)
+    assert ok, message
+    return match_id
+
+
+def test_resolutions_archived_before_the_rollup_are_counted(laf_db):
+    _resolved_match("lost_a", "found_a")
+    moved = db.archive_resolved(older_than_days=-1, pause=0)
+    assert moved['matches'] == 1
+    # a match archived without its lost post (by hand, foreign keys off like the sqlite3 shell)
+    match_id = _resolved_match("lost_b", "found_b")
+    conn = sqlite3.connect(laf_db)
+    conn.execute("""
+        INSERT INTO ArchivedMatches (match_id, lost_id, found_id, matched_by_user_id, date_matched, resolved, notes,
+                                     date_resolved)
+        SELECT match_id, lost_id, found_id, matched_by_user_id, date_matched, resolved, notes, date_resolved
+        FROM Matches WHERE match_id = ?
+    """, (match_id,))
+    conn.execute("DELETE FROM Matches WHERE match_id = ?", (match_id,))
+    conn.commit()
+
+    assert db.rollup_reports(lag=-1)['resolutions'] == 2
+    assert conn.execute("SELECT category, resolved FROM DailyResolutions").fetchall() == [("Electronics", 2)]
+    conn.close()
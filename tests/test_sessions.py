@@ -0,0 +1,33 @@
+import sqlite3
+import time
+
+import sessions
+from database import db
+
+from tests.conftest import USER_ID
+
+
+def _revocation_keys(path: str) -> set:
+    conn = sqlite3.connect(path)
+    keys = {row[0] for row in conn.execute("SELECT key FROM SessionRevocations")}
+    conn.close()
+    return keys
+
+
+def test_refresh_purges_revocations_no_token_can_need(laf_db):
+    now = time.time()
+    db.add_session_revocation("token", "expired-jti", now - 1)
+    db.add_session_revocation("token", "live-jti", now + 60)
+    db.update_user_role(USER_ID, "staff")  # a fresh 'user' revocation
+    conn = sqlite3.connect(laf_db)
+    conn.execute("""
+        INSERT INTO SessionRevocations (kind, key, revoked_at, expires_at) VALUES ('user', 'old-user', ?, ?)
+    """, (now - sessions.SESSION_TTL - 1, now + 60))
+    conn.commit()
+    conn.close()
+
+    revocations = sessions.RevocationList()
+    revocations.refresh()
+
+    assert _revocation_keys(laf_db) == {"live-jti", USER_ID}
+    assert set(revocations.tokens) == {"live-jti"} and set(revocations.users) == {USER_ID}